@@ -0,0 +1,75 @@
+# Slurs and profanity that are never acceptable on the platform, in any context:
+# a match flags the message without asking the LLM. Matched as whole words on normalized text (lower case,
+# common character substitutions undone, punctuation as spaces).
+blocked_terms = {
+    # Profanity and sexual insults
+    "fuck": "profanity",
+    "fucking": "profanity",
+    "fucker": "profanity",
+    "motherfucker": "profanity",
+    "fuck you": "harassment",
+    "fuck off": "harassment",
+    "stfu": "harassment",
+    "bitch": "harassment",
+    "bastard": "harassment",
+    "asshole": "harassment",
+    "dickhead": "harassment",
+    "cunt": "harassment",
+    "slut": "harassment",
+    "whore": "harassment",
+    "retard": "harassment",
+    "retarded": "harassment",
+    # Hindi / Hinglish abuse
+    "chutiya": "harassment",
+    "madarchod": "harassment",
+    "behenchod": "harassment",
+    "bhenchod": "harassment",
+    "gaandu": "harassment",
+    "harami": "harassment",
+    "kutta kamina": "harassment",
+}
+
+# Words that are often harmless but can be abusive in context: a match sends the
+# message to the LLM check instead of letting heuristics allow it.
+sensitive_terms = [
+    "kill", "die", "dead", "death", "hate", "stupid", "idiot", "dumb", "loser", "ugly",
+    "fat", "shut up", "moron", "trash", "sex", "sexy", "nude", "naked", "drugs", "weed",
+    "suicide", "hurt", "beat", "attack", "threat", "bomb", "gun", "knife", "racist", "slave",
+    "pagal", "bewakoof", "kamina", "saala", "sala", "bc", "mc", "wtf", "damn", "hell", "crap",
+    # Threats, self-harm and sexual content: abusive as an attack, but also how students
+    # ask for help ("don't kill yourself over exams", "how to avoid porn addiction")
+    "kill yourself", "kys", "go die", "i will kill you", "i ll kill you", "hope you die",
+    "send nudes", "nudes", "porn",
+    # Abusive in Hinglish, but also a common given name ("Randi Zuckerberg")
+    "randi",
+]
+
+# Whole messages that are always fine
+benign_messages = [
+    "hi", "hii", "hello", "hey", "hey there", "hi there", "good morning", "good afternoon",
+    "good evening", "good night", "thanks", "thank you", "thank you so much", "thanks a lot",
+    "ok", "okay", "ok thanks", "okay thanks", "ok thank you", "sure", "yes", "no", "yeah", "nope",
+    "cool", "great", "nice", "awesome", "got it", "i see", "alright", "bye", "see you",
+    "see you later", "how are you", "i am fine", "i m fine", "fine", "welcome", "you re welcome",
+    "namaste", "haan", "nahi", "theek hai", "acha", "accha", "dhanyavad", "shukriya",
+]
+
+# Words that are harmless on their own. With MODERATION_SHORT_WORDS set, a short
+# message made only of these (and words from benign_messages) is allowed locally.
+safe_words = [
+    "i", "me", "my", "we", "our", "you", "your", "it", "this", "that", "is", "am", "are", "was",
+    "be", "do", "did", "done", "have", "has", "had", "can", "will", "would", "should", "could",
+    "a", "an", "the", "and", "or", "but", "so", "too", "also", "very", "really", "just", "now",
+    "not", "what", "when", "where", "which", "who", "why", "how", "please", "pls", "plz",
+    "thx", "ty", "np", "yep", "hmm", "oh", "wow", "lol", "haha", "right", "true", "agreed",
+    "done", "noted", "same", "here", "there", "today", "tomorrow", "soon", "later", "again",
+    "morning", "evening", "night", "weekend", "class", "school", "college", "exam", "exams",
+    "test", "result", "results", "marks", "study", "studying", "notes", "course", "courses",
+    "career", "job", "jobs", "internship", "project", "assignment", "homework", "maths", "math",
+    "physics", "chemistry", "biology", "science", "commerce", "arts", "coding", "python",
+    "java", "engineering", "medical", "neet", "jee", "cuet", "boards", "subject", "subjects",
+    "stream", "roadmap", "session", "call", "meet", "meeting", "link", "chat", "talk", "help",
+    "thanks", "thank", "good", "great", "nice", "cool", "awesome", "fine", "ok", "okay",
+    "sure", "yes", "no", "yeah", "hi", "hello", "hey", "bye", "welcome", "congrats",
+    "congratulations", "best", "luck", "all", "well", "happy", "birthday", "see", "soon",
+]
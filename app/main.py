@@ -4,37 +4,28 @@ from typing import List, Optional
 from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from .database import SessionLocal
 import bcrypt
 import re
 import json
 import uuid
+import asyncio
 import datetime
 import shutil
 
 import os
 import json
-import google.generativeai as genai
-from groq import Groq
 from dotenv import load_dotenv
 from starlette.middleware.sessions import SessionMiddleware
 from authlib.integrations.starlette_client import OAuth
 
-from groq import AsyncGroq
 import razorpay
 from . import models, email_utils
 from itsdangerous import URLSafeTimedSerializer
-from .data.career_keywords import career_keywords
 from .utils.resource_aggregator import ResourceAggregator
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-
-groq_client = AsyncGroq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
 
 # OAuth Setup
 oauth = OAuth()
@@ -57,86 +48,35 @@ RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "your_key_secret")
 razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
 
 from .utils.redis_cache import ai_cache
+from .services import llm_gateway
+from .services.prompt_registry import prompt_registry
+from .services import archetype_table
+from .services import assessment_dialogue
+from .services.question_bank import question_bank
+from .services.stream_scoring import stream_scorer
+from .services import roadmap_builder
+from .services import resource_store
+from .services import college_catalog
+from .services import moderation
+from .services.job_queue import job_queue, JobQueueFullError, snapshot as job_snapshot
 
 async def generate_content_with_fallback(prompt):
     """
-    Attempts to generate content using Gemini (Async) with high-tier fallback to Groq.
-    Uses Redis caching to avoid repetitive API calls.
+    Backwards-compatible entry point for JSON-oriented prompts.
+    Delegates to the LLM gateway (cache, coalescing, provider routing, hedging, timeouts).
     """
-    # Check Cache
-    cached_response = ai_cache.get(prompt)
-    if cached_response:
-        print("AI CACHE HIT")
-        return cached_response
-
-    print("AI CACHE MISS")
-    try:
-        # Using 2.0 Flash for better reasoning speed and instruction following
-        model = genai.GenerativeModel("gemini-1.5-flash") # or gemini-2.0-flash if available
-        response = await model.generate_content_async(prompt)
-        text = response.text
-    except Exception as e:
-        print(f"Gemini Error (Switching to Groq): {e}")
-        if not groq_client: raise e
-        
-        try:
-            # Fallback to high-reasoning Llama model
-            chat_completion = await groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama-3.3-70b-versatile",
-            )
-            text = chat_completion.choices[0].message.content
-        except Exception as groq_e:
-            raise Exception(f"Dual API Failure. Gemini: {e}, Groq: {groq_e}")
-
-    # Enhanced JSON Extraction Logic
-    try:
-        # Remove potential markdown wrappers
-        text = re.sub(r'```json\s*|\s*```', '', text).strip()
-        # Find the first { and the last }
-        start_idx = text.find('{')
-        end_idx = text.rfind('}')
-        if start_idx != -1 and end_idx != -1:
-            text = text[start_idx:end_idx + 1]
-        
-        # Clean trailing commas before closing braces/brackets
-        text = re.sub(r",\s*([\]}])", r"\1", text)
-        
-        # Save to Cache
-        ai_cache.set(prompt, text)
-        
-        return text
-    except Exception:
-        # Still cache raw text if extraction fails partially
-        ai_cache.set(prompt, text)
-        return text
+    return await llm_gateway.complete(prompt)
 
 async def check_content_moderation(text_content: str):
     """
-    Checks if the given text contains abusive or inappropriate content using the AI model.
+    Checks if the given text contains abusive or inappropriate content.
+    Clear cases are decided locally; the rest go to the AI model (see services/moderation.py).
     Returns: (is_flagged, reason)
     """
-    moderation_prompt = f"""
-    Analyze the following text for abusive language, hate speech, harassment, or highly inappropriate content for a student career guidance platform.
-    Text: "{text_content}"
-    
-    Respond STRICTLY in JSON format:
-    {{
-      "is_flagged": boolean,
-      "reason": "string describing the violation or 'None'"
-    }}
-    """
-    try:
-        response_json_str = await generate_content_with_fallback(moderation_prompt)
-        data = json.loads(response_json_str)
-        return data.get("is_flagged", False), data.get("reason", "None")
-    except Exception as e:
-        print(f"Moderation Error: {e}")
-        return False, "None"
+    return await moderation.check(text_content)
 
 from . import models
 from .database import SessionLocal, engine, get_db
-from data.questions_data import questions
 from data.questions_12th import questions_12th
 from data.questions_above_12th import questions_above_12th
 
@@ -201,6 +141,25 @@ def run_migrations():
                 migrations.append("ALTER TABLE counsellor_profiles ADD COLUMN razorpay_contact_id VARCHAR")
             if 'razorpay_fund_account_id' not in cp_cols:
                 migrations.append("ALTER TABLE counsellor_profiles ADD COLUMN razorpay_fund_account_id VARCHAR")
+
+        # AssessmentResult table migrations
+        ar_cols = get_columns('assessment_results')
+        if ar_cols and 'archetype_source' not in ar_cols:
+            migrations.append("ALTER TABLE assessment_results ADD COLUMN archetype_source VARCHAR")
+
+        # CollegeRecommendation table migrations
+        cr_cols = get_columns('college_recommendations')
+        if cr_cols and 'catalog_id' not in cr_cols:
+            migrations.append("ALTER TABLE college_recommendations ADD COLUMN catalog_id INTEGER")
+        if cr_cols and 'personal_notes' not in cr_cols:
+            migrations.append("ALTER TABLE college_recommendations ADD COLUMN personal_notes JSON")
+
+        # StudentMessage table migrations
+        sm_cols = get_columns('student_messages')
+        if sm_cols and 'moderation_status' not in sm_cols:
+            migrations.append("ALTER TABLE student_messages ADD COLUMN moderation_status VARCHAR DEFAULT 'approved'")
+        if sm_cols and 'moderated_at' not in sm_cols:
+            migrations.append("ALTER TABLE student_messages ADD COLUMN moderated_at TIMESTAMP")
         
         if migrations:
             with engine.connect() as conn:
@@ -219,7 +178,23 @@ def run_migrations():
 
 run_migrations()
 
-app = FastAPI(title="CareStance")
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the async Redis pool and warm the shared Gemini models before serving
+    await ai_cache.connect()
+    llm_gateway.warm()
+    archetype_table.load()
+    assessment_dialogue.load()
+    job_queue.start()
+    moderation.review_queue.start()
+    yield
+    await moderation.review_queue.stop()
+    await job_queue.stop()
+    await ai_cache.close()
+
+app = FastAPI(title="CareStance", lifespan=lifespan)
 
 # ─── Include Split Payments Router (Razorpay Route) ───────────────────────────
 from .routes.payments import router as payments_router
@@ -684,36 +659,7 @@ async def assessment_page(request: Request, db: Session = Depends(get_db)):
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
     return templates.TemplateResponse("assessment.html", {"request": request, "user": user, "questions": QUESTIONS})
 
-@app.post("/assessment/submit")
-async def assessment_submit(
-    request: Request,
-    db: Session = Depends(get_db)
-):
-    user = get_current_user(request, db)
-    if not user:
-        return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
-
-    # 1. Collect Answers & Map to Text
-    form_data = await request.form()
-    user_answers_data = {}
-    
-    # helper map
-    questions_map = {q["id"]: q for q in questions}
-
-    for key, value in form_data.items():
-        if key in questions_map:
-            q_data = questions_map[key]
-            # Find the selected option text
-            selected_option = next((opt for opt in q_data["options"] if opt["value"] == value), None)
-            if selected_option:
-                user_answers_data[key] = selected_option["text"]
-            else:
-                 user_answers_data[key] = value # Fallback
-        else:
-             user_answers_data[key] = value
-
-    # 2. Construct Prompt
-    prompt = f"""
+ARCHETYPE_PROMPT = prompt_registry.register("phase2_archetype", version=1, ttl=30 * 86400, template="""
     You are an expert student career psychologist.
 
     Your task:
@@ -749,12 +695,38 @@ async def assessment_submit(
     }}
 
     User Answers (Text Descriptions of Visual Choices):
-    {json.dumps(user_answers_data, indent=2)}
-    """
+    {answers}
+    """)
+
+@app.post("/assessment/submit")
+async def assessment_submit(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    user = get_current_user(request, db)
+    if not user:
+        return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+
+    # 1. Collect Answers & Map to Text
+    form_data = await request.form()
+    user_answers_data = {}
+    
+    for key, value in form_data.items():
+        q_data = question_bank.get(key)
+        if q_data and q_data.kind == "binary":
+            # Find the selected option text
+            user_answers_data[key] = q_data.option_text(value, default=value)
+        else:
+             user_answers_data[key] = value
+
+    # 2. Precomputed table: every complete A/B answer vector is classified offline
+    result_data = archetype_table.lookup(archetype_table.answer_vector(form_data))
+    archetype_source = "table"
 
-    # 3. Call Gemini
-    if not GEMINI_API_KEY:
+    # 3. Call Gemini (only for answer vectors the table does not cover)
+    if result_data is None and not GEMINI_API_KEY:
         # Fallback Mock for Demo if Key Missing
+        archetype_source = "default"
         result_data = {
             "personality": "Ambivert",
             "goal_status": "Exploring",
@@ -762,13 +734,16 @@ async def assessment_submit(
             "confidence": 0.85,
             "reasoning": "Demo Mode: API Key missing. You showed balanced traits."
         }
-    else:
+    elif result_data is None:
         # Generate Analysis using Fallback Strategy
         try:
-            clean_text = await generate_content_with_fallback(prompt)
+            prompt = ARCHETYPE_PROMPT.render(answers=user_answers_data)
+            clean_text = await llm_gateway.complete(prompt)
             result_data = json.loads(clean_text)
+            archetype_source = "llm"
         except Exception as e:
             print(f"Analysis Error: {e}")
+            archetype_source = "default"
             result_data = {
                 "phase_2_category": "Focused Specialist",
                 "personality": "Ambivert",
@@ -787,6 +762,7 @@ async def assessment_submit(
         existing_result.goal_status = result_data.get("goal_status")
         existing_result.confidence = result_data.get("confidence")
         existing_result.reasoning = result_data.get("reasoning")
+        existing_result.archetype_source = archetype_source
         existing_result.raw_answers = user_answers_data # This overwrites phase 1 raw answers if any, but selected_class is separate column
     else:
         # Create new
@@ -797,6 +773,7 @@ async def assessment_submit(
             goal_status=result_data.get("goal_status"),
             confidence=result_data.get("confidence"),
             reasoning=result_data.get("reasoning"),
+            archetype_source=archetype_source,
             raw_answers=user_answers_data
         )
         db.add(new_result)
@@ -815,7 +792,29 @@ async def assessment_result(request: Request, db: Session = Depends(get_db)):
     if not result:
         return RedirectResponse(url="/assessment", status_code=status.HTTP_302_FOUND)
 
-    return templates.TemplateResponse("result.html", {"request": request, "user": user, "result": result})
+    # The AI report may still be generating; the page reloads when the job finishes
+    analysis_job = job_queue.active_job(db, user.id, "final_analysis")
+    if analysis_job is None and result.final_analysis is None and result.final_answers and GEMINI_API_KEY:
+        # The report's job failed or was lost (restart, expiry): write it again
+        analysis_job = requeue_final_analysis(db, user.id, result)
+    return templates.TemplateResponse("result.html", {"request": request, "user": user, "result": result, "analysis_job": analysis_job})
+
+def requeue_final_analysis(db, user_id: int, result):
+    """Queues the final report again with the mode of the last attempt; returns the job, or None when the queue is full."""
+    last = db.query(models.GenerationJob).filter(
+        models.GenerationJob.user_id == user_id,
+        models.GenerationJob.job_type == "final_analysis",
+    ).order_by(models.GenerationJob.created_at.desc()).first()
+    if last is not None and last.payload and last.payload.get("mode"):
+        mode = last.payload["mode"]
+    else:
+        mode = {"12th": "12th", "Above 12th": "above"}.get(result.selected_class, "10th")
+    try:
+        job, _ = job_queue.enqueue(db, user_id, "final_analysis", {"mode": mode})
+    except JobQueueFullError as e:
+        print(f"Final analysis not re-queued ({e})")
+        return None
+    return job
 
 @app.get("/share/report/{result_id}", response_class=HTMLResponse)
 async def share_report(result_id: int, request: Request, mode: str = "full", db: Session = Depends(get_db)):
@@ -1058,6 +1057,40 @@ async def handle_flag(flag_id: int, request: Request, action: str = Form(...), d
 
 # --- Counsellor Routes ---
 
+@app.get("/admin/ai-metrics")
+async def ai_metrics(request: Request, db: Session = Depends(get_db)):
+    """JSON snapshot of the LLM gateway: cache tiers, coalescing, hedging and provider health."""
+    user = get_current_user(request, db)
+    admin_email = os.getenv("ADMIN_EMAIL")
+    if not user or (user.role != "admin" and user.email != admin_email):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {**llm_gateway.metrics(), "archetype_table": archetype_table.stats(), "fast_chat": assessment_dialogue.stats(),
+            "jobs": job_queue.stats(), "roadmaps": roadmap_builder.stats(), "resources": resource_store.stats(),
+            "colleges": college_catalog.stats(), "moderation": moderation.stats()}
+
+@app.post("/admin/ai-cache/invalidate")
+async def ai_cache_invalidate(request: Request, template_id: str = Form(...), version: Optional[int] = Form(None), db: Session = Depends(get_db)):
+    """Drops every cached AI answer of one prompt template version (current version by default)."""
+    user = get_current_user(request, db)
+    admin_email = os.getenv("ADMIN_EMAIL")
+    if not user or (user.role != "admin" and user.email != admin_email):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    try:
+        deleted = await prompt_registry.invalidate(template_id, version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown prompt template")
+    return {"template_id": template_id, "deleted": deleted}
+
+@app.post("/admin/assessment/rescore")
+def assessment_rescore(request: Request, dry_run: bool = Form(False), db: Session = Depends(get_db)):
+    """Re-applies the current Class 10 stream weights to every stored final assessment."""
+    user = get_current_user(request, db)
+    admin_email = os.getenv("ADMIN_EMAIL")
+    if not user or (user.role != "admin" and user.email != admin_email):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    # Plain def: FastAPI runs the batch in its threadpool instead of blocking the event loop
+    return stream_scorer.rescore_all(db, dry_run=dry_run)
+
 @app.post("/counsellor/accept-tnc")
 async def accept_tnc(request: Request, db: Session = Depends(get_db)):
     user = get_current_user(request, db)
@@ -1910,6 +1943,22 @@ async def assessment_phase3(request: Request, db: Session = Depends(get_db)):
         "category_name": category
     })
 
+PHASE3_ANALYSIS_PROMPT = prompt_registry.register("phase3_analysis", version=1, ttl=30 * 86400, template="""
+    You are an expert Career Mentor. Deep-dive into the scenario responses for a '{category}' profile.
+
+    SCENARIO RESPONSES:
+    {answers}
+
+    TASK:
+    Write a personal, narrative analysis (no bullet points).
+    1. Acknowledge their specific choice in the most challenging scenario.
+    2. Explain what this reveals about their 'Internal Compass' and leadership style.
+    3. Use warm, sophisticated language that builds the student's confidence.
+
+    STRICT RULE: No quotes, no markdown headers, max 4 sentences. 
+    Start directly with: "It is fascinating to observe how you navigate..."
+    """)
+
 @app.post("/assessment/phase3/submit")
 async def assessment_phase3_submit(
     request: Request, 
@@ -1941,25 +1990,10 @@ async def assessment_phase3_submit(
     
     # Generate Phase 3 Analysis using Gemini
     category = result.phase_2_category
-    # Inside assessment_phase3_submit route
-    prompt_p3 = f"""
-    You are an expert Career Mentor. Deep-dive into the scenario responses for a '{category}' profile.
-
-    SCENARIO RESPONSES:
-    {json.dumps(answers, indent=2)}
-
-    TASK:
-    Write a personal, narrative analysis (no bullet points).
-    1. Acknowledge their specific choice in the most challenging scenario.
-    2. Explain what this reveals about their 'Internal Compass' and leadership style.
-    3. Use warm, sophisticated language that builds the student's confidence.
-
-    STRICT RULE: No quotes, no markdown headers, max 4 sentences. 
-    Start directly with: "It is fascinating to observe how you navigate..."
-    """
+    prompt_p3 = PHASE3_ANALYSIS_PROMPT.render(category=category, answers=answers)
     
     try:
-         raw_text = await generate_content_with_fallback(prompt_p3)
+         raw_text = await llm_gateway.complete(prompt_p3)
          result.phase3_analysis = raw_text.replace('"', '').replace("'", "")
     except Exception as e:
          result.phase3_analysis = f"Analysis unavailable at this time. ({str(e)})"
@@ -1985,40 +2019,45 @@ Your role is to present scenario questions warmly and professionally.
 - Do NOT make up new questions. Only work with the scenario data you are given.
 """
 
-@app.post("/assessment/phase3/chat")
-async def phase3_chat(request: Request, chat_req: Phase3ChatRequest, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    if not user:
-        raise HTTPException(status_code=401, detail="Unauthorized")
+PHASE3_DONE_TEXT = "Thank you for completing all the scenarios! Click **Finish Assessment** below to generate your personalised profile."
 
-    result = db.query(models.AssessmentResult).filter(models.AssessmentResult.user_id == user.id).first()
-    if not result or not result.phase_2_category:
-        return jsonify({"error": "No phase 2 category found"})
-    
-    from fastapi.responses import JSONResponse
-    category = result.phase_2_category
-    question_list = CATEGORY_SCENARIOS_MAP.get(category, [])
-    total = len(question_list)
-    current_idx = chat_req.current_index
+def sse_event(event: str, data) -> str:
+    """One Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    # All done
-    if current_idx >= total:
-        return JSONResponse({
-            "response": "Thank you for completing all the scenarios! Click **Finish Assessment** below to generate your personalised profile.",
-            "current_index": current_idx,
-            "answers": chat_req.answers,
-            "done": True
-        })
+async def _single_chunk(text: str):
+    yield text
 
+async def stream_chat_turn(chunks, final: dict, error_text: str):
+    """
+    SSE body of one assessment chat turn: a `token` event per text chunk as it
+    arrives, then a `final` event carrying `current_index`, `answers` and `done`.
+    """
+    try:
+        async for chunk in chunks:
+            yield sse_event("token", {"text": chunk})
+    except Exception as e:
+        print(f"Assessment chat stream error: {e}")
+        yield sse_event("token", {"text": error_text.format(error=e)})
+    yield sse_event("final", final)
+
+def sse_response(body) -> StreamingResponse:
+    return StreamingResponse(body, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def phase3_turn(question_list, chat_req: Phase3ChatRequest):
+    """Prompt for one LLM-rendered Phase 3 turn. Returns (prompt, demo_text, new_index, done)."""
+    total = len(question_list)
+    current_idx = chat_req.current_index
     current_scenario = question_list[current_idx]
 
     # Build the prompt
     scenario_text = f"""
 Scenario {current_idx + 1} of {total}:
-Title: {current_scenario['title']}
-Story: {current_scenario['story']}
-Option A: {current_scenario['options'][0]['text']}
-Option B: {current_scenario['options'][1]['text']}
+Title: {current_scenario.title}
+Story: {current_scenario.text}
+Option A: {current_scenario.options[0].text}
+Option B: {current_scenario.options[1].text}
 """
 
     if chat_req.message and chat_req.message.strip():
@@ -2035,10 +2074,10 @@ Acknowledge their answer warmly in 1-2 sentences, then let them know they have c
             next_scenario = question_list[next_idx]
             next_scenario_text = f"""
 Scenario {next_idx + 1} of {total}:
-Title: {next_scenario['title']}
-Story: {next_scenario['story']}
-Option A: {next_scenario['options'][0]['text']}
-Option B: {next_scenario['options'][1]['text']}
+Title: {next_scenario.title}
+Story: {next_scenario.text}
+Option A: {next_scenario.options[0].text}
+Option B: {next_scenario.options[1].text}
 """
             prompt = f"""{COUNSELLOR_SYSTEM_PROMPT}
 
@@ -2062,25 +2101,48 @@ Present the scenario story first, then clearly list Option A and Option B on sep
         new_idx = current_idx
         done = False
 
+    return prompt, f"[Demo Mode] {scenario_text}", new_idx, done
+
+@app.post("/assessment/phase3/chat")
+async def phase3_chat(request: Request, chat_req: Phase3ChatRequest, db: Session = Depends(get_db)):
+    user = get_current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    result = db.query(models.AssessmentResult).filter(models.AssessmentResult.user_id == user.id).first()
+    if not result or not result.phase_2_category:
+        return jsonify({"error": "No phase 2 category found"})
+    
+    from fastapi.responses import JSONResponse
+    category = result.phase_2_category
+    question_list = question_bank.scenarios(category)
+    total = len(question_list)
+    current_idx = chat_req.current_index
+
+    # All done
+    if current_idx >= total:
+        return JSONResponse({
+            "response": PHASE3_DONE_TEXT,
+            "current_index": current_idx,
+            "answers": chat_req.answers,
+            "done": True
+        })
+
+    # Fast conversational mode: render the turn locally, LLM only for free-text replies
+    if assessment_dialogue.FAST_CHAT_MODE:
+        ai_text, new_idx, done = await assessment_dialogue.fast_turn(
+            question_list, current_idx, chat_req.message, user.id, COUNSELLOR_SYSTEM_PROMPT, PHASE3_DONE_TEXT,
+        )
+        return JSONResponse({"response": ai_text, "current_index": new_idx, "answers": chat_req.answers, "done": done})
+
+    prompt, demo_text, new_idx, done = phase3_turn(question_list, chat_req)
+
     # Call Gemini (with Groq fallback)
     try:
-        if GEMINI_API_KEY:
-            try:
-                model_ai = genai.GenerativeModel("gemini-2.0-flash")
-                response = await model_ai.generate_content_async(prompt)
-                ai_text = response.text
-            except Exception:
-                model_ai = genai.GenerativeModel("gemini-1.5-flash")
-                response = await model_ai.generate_content_async(prompt)
-                ai_text = response.text
-        elif groq_client:
-            completion = await groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama-3.3-70b-versatile",
-            )
-            ai_text = completion.choices[0].message.content
+        if llm_gateway.is_configured():
+            ai_text = await llm_gateway.complete(prompt, profile="chat", extract_json=False, priority=llm_gateway.PRIORITY_INTERACTIVE)
         else:
-            ai_text = f"[Demo Mode] {scenario_text}"
+            ai_text = demo_text
     except Exception as e:
         ai_text = f"I'm having a moment of reflection. ({str(e)}) Please try again."
 
@@ -2091,10 +2153,40 @@ Present the scenario story first, then clearly list Option A and Option B on sep
         "done": done
     })
 
+@app.post("/assessment/phase3/chat/stream")
+async def phase3_chat_stream(request: Request, chat_req: Phase3ChatRequest, db: Session = Depends(get_db)):
+    """SSE variant of `/assessment/phase3/chat`: the reply streams token by token."""
+    user = get_current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    result = db.query(models.AssessmentResult).filter(models.AssessmentResult.user_id == user.id).first()
+    if not result or not result.phase_2_category:
+        raise HTTPException(status_code=400, detail="No phase 2 category found")
+
+    question_list = question_bank.scenarios(result.phase_2_category)
+    total = len(question_list)
+    current_idx = chat_req.current_index
+    error_text = "I'm having a moment of reflection. ({error}) Please try again."
+
+    if current_idx >= total:
+        chunks, new_idx, done = _single_chunk(PHASE3_DONE_TEXT), current_idx, True
+    elif assessment_dialogue.FAST_CHAT_MODE:
+        chunks = assessment_dialogue.fast_turn_stream(
+            question_list, current_idx, chat_req.message, user.id, COUNSELLOR_SYSTEM_PROMPT, PHASE3_DONE_TEXT,
+        )
+        new_idx, done = assessment_dialogue.turn_position(current_idx, chat_req.message, total)
+    else:
+        prompt, demo_text, new_idx, done = phase3_turn(question_list, chat_req)
+        chunks = llm_gateway.stream(prompt) if llm_gateway.is_configured() else _single_chunk(demo_text)
+
+    final = {"current_index": new_idx, "answers": chat_req.answers, "done": done}
+    return sse_response(stream_chat_turn(chunks, final, error_text))
+
 
 # --- Phase 4 Routes (Final Stream Assessment) ---
 
-from data.questions_final import all_questions, section_a_questions, section_b_questions, section_c_questions, section_d_questions
+from data.questions_final import all_questions
 from data.questions_12th import questions_12th
 from data.questions_above_12th import questions_above_12th
 
@@ -2126,6 +2218,29 @@ async def assessment_final(request: Request, db: Session = Depends(get_db)):
 
     return templates.TemplateResponse("assessment_final.html", context)
 
+FINAL_ANALYSIS_PROMPT = prompt_registry.register("final_analysis", version=1, ttl=30 * 86400, template="""
+    You are a fascinating and expert career counselor mentor. 
+    Analyze this profile for a {mode} grade student with deep curiosity and professional empathy.
+
+    Profile:
+    - Archetype: {phase2_cat}
+    - Insights Table:
+    {answers_summary}
+
+    Task:
+    {task_instruction}
+    
+    CRITICAL ADDITION:
+    In addition to the top 3 recommendations requested above, YOU MUST provide a 4th recommendation directly related to the student's hobbies and extracurricular interests (e.g. {hobbies}, {extracurricular}).
+    
+    Even if it's outside the standard academic path, suggest how their hobbies could lead to a professional career.
+    
+    The 4th recommendation should be returned in the same format as the others, but clearly labeled as "Hobby-based Recommendation" in your reasoning.
+
+    You must speak with authority yet warmth. Output MUST be raw JSON only matching this structure. 
+    {output_format}
+    """)
+
 @app.post("/assessment/final/submit")
 async def assessment_final_submit(request: Request, db: Session = Depends(get_db)):
     user = get_current_user(request, db)
@@ -2148,51 +2263,9 @@ async def assessment_final_submit(request: Request, db: Session = Depends(get_db
     
     if mode == "10th":
         # ... EXISTING LOGIC FOR CLASS 10 (PCM/PCB/COMM/ARTS/VOC) ...
-        # (Keeping the original rule-based scoring for Class 10 reliability)
-        scores = { "PCM": 0, "PCB": 0, "COMM": 0, "ARTS": 0, "VOC": 0 }
-        
-        def add_points(streams, points=1):
-            for s in streams:
-                if s in scores: scores[s] += points
-
-        # 1. Section A
-        for q in section_a_questions:
-            if answers.get(q["id"]) == q["correct_value"]:
-                add_points(q["mapped_streams"], points=2)
-
-        # 2. Preference Sections
-        preference_questions = section_b_questions + section_c_questions + section_d_questions
-        for q in preference_questions:
-            user_ans = answers.get(q["id"])
-            if not user_ans: continue
-            selected_opt = next((opt for opt in q["options"] if opt["value"] == user_ans), None)
-            if selected_opt and "stream" in selected_opt:
-                 add_points([selected_opt["stream"]], points=1)
-            else:
-                if user_ans == "a":
-                    txt = q["question"] + " " + (selected_opt["text"] if selected_opt else "")
-                    if any(x in txt.lower() for x in ["plant", "health", "bio", "nutri", "species", "cures"]):
-                         add_points(["PCB"], points=1)
-                    else:
-                         add_points(["PCM"], points=1)
-                elif user_ans == "b": add_points(["COMM"], points=1)
-                elif user_ans == "c": add_points(["ARTS"], points=1)
-                elif user_ans == "d": add_points(["VOC"], points=1)
-
-        # 3. Phase 2 Influence
-        if result and result.phase_2_category:
-            cat = result.phase_2_category
-            if cat == "Focused Specialist": add_points(["PCM", "PCB"], points=3)
-            elif cat == "Quiet Explorer": add_points(["PCB", "ARTS"], points=3)
-            elif cat == "Visionary Leader": add_points(["COMM", "ARTS"], points=3)
-            elif cat == "Strategic Builder": add_points(["PCM", "COMM"], points=3)
-            elif cat == "Adaptive Explorer": add_points(["ARTS", "VOC"], points=3)
-            elif cat == "Dynamic Generalist": add_points(["COMM", "VOC"], points=3)
-
-        sorted_scores = sorted(scores.items(), key=lambda item: item[1], reverse=True)
-        winner_code = sorted_scores[0][0]
-        code_map = { "PCM": "Science (PCM)", "PCB": "Science (PCB)", "COMM": "Commerce", "ARTS": "Arts & Humanities", "VOC": "Vocational Studies" }
-        winner_name = code_map.get(winner_code, winner_code)
+        # (Keeping the original rule-based scoring for Class 10 reliability, compiled into a weight matrix)
+        scores = stream_scorer.score(answers, result.phase_2_category if result else None)
+        winner_name = stream_scorer.winner(scores)
         
         # Save Score & Result
         if result:
@@ -2214,177 +2287,14 @@ async def assessment_final_submit(request: Request, db: Session = Depends(get_db
         
         # --- AI Analysis (Gemini) ---
         if GEMINI_API_KEY:
+            # The report is written by a job worker; the result page waits for it
+            result.final_analysis = None
+            db.commit()
             try:
-                # Prepare Prompt based on Mode
-                readable_answers = []
-                
-                if mode == "10th":
-                     def get_question_text(q_id):
-                        for section in all_questions.values():
-                            for q in section["questions"]:
-                                if q["id"] == q_id: return q["question"], q["options"]
-                        return None, None
-                     for q_id, ans_value in answers.items():
-                        q_text, options = get_question_text(q_id)
-                        if q_text:
-                            selected_option = next((opt for opt in options if opt["value"] == ans_value), None)
-                            ans_text = selected_option["text"] if selected_option else "Unknown"
-                            readable_answers.append(f"Question: {q_text}\nSelected Answer: {ans_text}")
-                
-                elif mode == "12th":
-                     # Use questions_12th data
-                     q_map = {q["id"]: q for q in questions_12th}
-                     for q_id, ans_text in answers.items():
-                         if q_id in q_map:
-                             readable_answers.append(f"Scenario: {q_map[q_id]['title']}\nInsight: {q_map[q_id]['insight']}\nUser Response: {ans_text}")
-
-                elif mode == "above":
-                     # Use questions_above_12th data
-                     q_map = {q["id"]: q for q in questions_above_12th}
-                     for q_id, ans_text in answers.items():
-                         if q_id in q_map:
-                             readable_answers.append(f"Question: {q_map[q_id]['title']}\nContext: {q_map[q_id]['insight']}\nUser Response: {ans_text}")
-
-                answers_summary = "\n\n".join(readable_answers)
-                phase2_cat = result.phase_2_category or "Unknown"
-                
-                # Dynamic Prompt Construction based on Class
-                if mode == "10th":
-                    task_instruction = f"""
-                    1. The student's calculated best fit based on answers is "{winner_name}". Validate and Analyze this choice.
-                    2. Provide a "Final Analysis" (approx 150 words) explaining WHY {winner_name} is the best fit based on their answers.
-                    3. Provide 3 "Pros" (Why {winner_name} is good for the student).
-                    4. Provide 3 "Cons" (Challenges to consider).
-                    """
-                    output_format = """
-                    {
-                      "recommended_stream": "Exact Stream Name",
-                      "final_analysis": "Detailed explanation...",
-                      "stream_pros": ["Pro 1", "Pro 2", "Pro 3"],
-                      "stream_cons": ["Con 1", "Con 2", "Con 3"]
-                    }
-                    """
-                elif mode == "12th":
-                    task_instruction = """
-                    1. Identify the Top 3 Career Goals / University Majors best suited for this student based on their scenarios.
-                    2. For EACH goal, provide a specific "Reason" why they should go for that.
-                    3. For EACH goal, provide 2 "Pros" (Advantages) and 2 "Cons" (Challenges).
-                    4. Provide a "Final Analysis" (approx 100 words) summarizing their potential.
-                    """
-                    output_format = """
-                    {
-                      "recommended_stream": "Primary Field (e.g. Technology, Healthcare, Creative Arts)",
-                      "final_analysis": "Summary...",
-                      "goal_options": [
-                        {
-                            "title": "Option 1 Title", 
-                            "reason": "Why they should choose this...",
-                            "pros": ["Pro 1", "Pro 2"],
-                            "cons": ["Con 1", "Con 2"]
-                        },
-                        {
-                            "title": "Option 2 Title", 
-                            "reason": "Why they should choose this...",
-                            "pros": ["Pro 1", "Pro 2"],
-                            "cons": ["Con 1", "Con 2"]
-                        },
-                        {
-                            "title": "Option 3 Title", 
-                            "reason": "Why they should choose this...",
-                            "pros": ["Pro 1", "Pro 2"],
-                            "cons": ["Con 1", "Con 2"]
-                        }
-                      ]
-                    }
-                    """
-                else: # Above 12th
-                    task_instruction = """
-                    1. Identify the Top 3 Professional Roles / Niche Career Paths best suited for this student.
-                    2. For EACH goal, provide a specific "Reason" why they should pursue it.
-                    3. For EACH goal, provide 2 "Pros" (Advantages) and 2 "Cons" (Challenges).
-                    4. Provide a "Final Analysis" (approx 100 words) on their professional outlook.
-                    """
-                    output_format = """
-                    {
-                      "recommended_stream": "Primary Field / Industry",
-                      "final_analysis": "Summary...",
-                      "goal_options": [
-                        {
-                            "title": "Role 1 Title", 
-                            "reason": "Why this fits...",
-                            "pros": ["Pro 1", "Pro 2"],
-                            "cons": ["Con 1", "Con 2"]
-                        },
-                        {
-                            "title": "Role 2 Title", 
-                            "reason": "Why this fits...",
-                            "pros": ["Pro 1", "Pro 2"],
-                            "cons": ["Con 1", "Con 2"]
-                        },
-                        {
-                            "title": "Role 3 Title", 
-                            "reason": "Why this fits...",
-                            "pros": ["Pro 1", "Pro 2"],
-                            "cons": ["Con 1", "Con 2"]
-                        }
-                      ]
-                    }
-                    """
-
-                prompt = f"""
-                You are a fascinating and expert career counselor mentor. 
-                Analyze this profile for a {mode} grade student with deep curiosity and professional empathy.
-
-                Profile:
-                - Archetype: {phase2_cat}
-                - Insights Table:
-                {answers_summary}
-
-                Task:
-                {task_instruction}
-                
-                CRITICAL ADDITION:
-                In addition to the top 3 recommendations requested above, YOU MUST provide a 4th recommendation directly related to the student's hobbies and extracurricular interests (e.g. {answers.get('PI1_Hobbies', 'N/A')}, {answers.get('PI2_Extracurricular', 'N/A')}).
-                
-                Even if it's outside the standard academic path, suggest how their hobbies could lead to a professional career.
-                
-                The 4th recommendation should be returned in the same format as the others, but clearly labeled as "Hobby-based Recommendation" in your reasoning.
-
-                You must speak with authority yet warmth. Output MUST be raw JSON only matching this structure. 
-                {output_format}
-                """
-                
-                # Generate Content with Fallback
-                text = await generate_content_with_fallback(prompt)
-                print(f"DEBUG: AI Raw Text: {text}")
-                ai_data = json.loads(text)
-                
-                if mode != "10th" and "recommended_stream" in ai_data: 
-                     result.recommended_stream = ai_data["recommended_stream"]
-                if "final_analysis" in ai_data: result.final_analysis = ai_data["final_analysis"]
-                
-                # Handling Data Mapping
-                if mode == "10th":
-                    if "stream_pros" in ai_data: result.stream_pros = ai_data["stream_pros"]
-                    if "stream_cons" in ai_data: result.stream_cons = ai_data["stream_cons"]
-                    # Add hobby recommendation to analysis text
-                    if "goal_options" in ai_data and len(ai_data["goal_options"]) > 0:
-                        hobby_rec = ai_data["goal_options"][-1]
-                        if isinstance(hobby_rec, dict):
-                            title = hobby_rec.get('title', 'Alternative Path')
-                            reason = hobby_rec.get('reason', '')
-                            # Ensure final_analysis is a string before appending
-                            if not result.final_analysis:
-                                result.final_analysis = ""
-                            result.final_analysis += f"\n\n**Special Interest Recommendation:** Based on your hobbies, you might also consider a career as a {title}. {reason}"
-                else:
-                    # Map 'goal_options' to 'stream_pros' for storage
-                    if "goal_options" in ai_data: result.stream_pros = ai_data["goal_options"]
-                    result.stream_cons = [] # Not used for 12th/Above
-                    
-            except Exception as e:
-                print(f"AI Analysis Failed: {e}")
-                result.final_analysis = f"AI Analysis Unavailable. (Error: {str(e)})"
+                job_queue.enqueue(db, user.id, "final_analysis", {"mode": mode})
+            except JobQueueFullError as e:
+                print(f"Final analysis job not queued ({e}); running it inline")
+                await run_final_analysis(result, mode, answers)
         else:
              result.final_analysis = "AI Analysis Unavailable (API Key missing)."
 
@@ -2392,6 +2302,165 @@ async def assessment_final_submit(request: Request, db: Session = Depends(get_db
 
     return RedirectResponse(url="/assessment/result", status_code=status.HTTP_302_FOUND)
 
+async def run_final_analysis(result, mode: str, answers: dict):
+    """Writes the AI report of a final assessment onto `result` (the caller commits)."""
+    winner_name = result.recommended_stream  # Class 10: the rule-based stream pick
+    try:
+        # Prepare Prompt based on Mode
+        readable_answers = []
+        
+        if mode == "10th":
+             for q_id, ans_value in answers.items():
+                q = question_bank.get(q_id)
+                if q:
+                    ans_text = q.option_text(ans_value, default="Unknown") if q.options else ans_value
+                    readable_answers.append(f"Question: {q.text}\nSelected Answer: {ans_text}")
+        
+        elif mode == "12th":
+             for q_id, ans_text in answers.items():
+                 q = question_bank.get(q_id)
+                 if q:
+                     readable_answers.append(f"Scenario: {q.title or q.text}\nInsight: {q.insight}\nUser Response: {ans_text}")
+
+        elif mode == "above":
+             for q_id, ans_text in answers.items():
+                 q = question_bank.get(q_id)
+                 if q:
+                     readable_answers.append(f"Question: {q.title}\nContext: {q.insight}\nUser Response: {ans_text}")
+
+        answers_summary = "\n\n".join(readable_answers)
+        phase2_cat = result.phase_2_category or "Unknown"
+        
+        # Dynamic Prompt Construction based on Class
+        if mode == "10th":
+            task_instruction = f"""
+            1. The student's calculated best fit based on answers is "{winner_name}". Validate and Analyze this choice.
+            2. Provide a "Final Analysis" (approx 150 words) explaining WHY {winner_name} is the best fit based on their answers.
+            3. Provide 3 "Pros" (Why {winner_name} is good for the student).
+            4. Provide 3 "Cons" (Challenges to consider).
+            """
+            output_format = """
+            {
+              "recommended_stream": "Exact Stream Name",
+              "final_analysis": "Detailed explanation...",
+              "stream_pros": ["Pro 1", "Pro 2", "Pro 3"],
+              "stream_cons": ["Con 1", "Con 2", "Con 3"]
+            }
+            """
+        elif mode == "12th":
+            task_instruction = """
+            1. Identify the Top 3 Career Goals / University Majors best suited for this student based on their scenarios.
+            2. For EACH goal, provide a specific "Reason" why they should go for that.
+            3. For EACH goal, provide 2 "Pros" (Advantages) and 2 "Cons" (Challenges).
+            4. Provide a "Final Analysis" (approx 100 words) summarizing their potential.
+            """
+            output_format = """
+            {
+              "recommended_stream": "Primary Field (e.g. Technology, Healthcare, Creative Arts)",
+              "final_analysis": "Summary...",
+              "goal_options": [
+                {
+                    "title": "Option 1 Title", 
+                    "reason": "Why they should choose this...",
+                    "pros": ["Pro 1", "Pro 2"],
+                    "cons": ["Con 1", "Con 2"]
+                },
+                {
+                    "title": "Option 2 Title", 
+                    "reason": "Why they should choose this...",
+                    "pros": ["Pro 1", "Pro 2"],
+                    "cons": ["Con 1", "Con 2"]
+                },
+                {
+                    "title": "Option 3 Title", 
+                    "reason": "Why they should choose this...",
+                    "pros": ["Pro 1", "Pro 2"],
+                    "cons": ["Con 1", "Con 2"]
+                }
+              ]
+            }
+            """
+        else: # Above 12th
+            task_instruction = """
+            1. Identify the Top 3 Professional Roles / Niche Career Paths best suited for this student.
+            2. For EACH goal, provide a specific "Reason" why they should pursue it.
+            3. For EACH goal, provide 2 "Pros" (Advantages) and 2 "Cons" (Challenges).
+            4. Provide a "Final Analysis" (approx 100 words) on their professional outlook.
+            """
+            output_format = """
+            {
+              "recommended_stream": "Primary Field / Industry",
+              "final_analysis": "Summary...",
+              "goal_options": [
+                {
+                    "title": "Role 1 Title", 
+                    "reason": "Why this fits...",
+                    "pros": ["Pro 1", "Pro 2"],
+                    "cons": ["Con 1", "Con 2"]
+                },
+                {
+                    "title": "Role 2 Title", 
+                    "reason": "Why this fits...",
+                    "pros": ["Pro 1", "Pro 2"],
+                    "cons": ["Con 1", "Con 2"]
+                },
+                {
+                    "title": "Role 3 Title", 
+                    "reason": "Why this fits...",
+                    "pros": ["Pro 1", "Pro 2"],
+                    "cons": ["Con 1", "Con 2"]
+                }
+              ]
+            }
+            """
+
+        prompt = FINAL_ANALYSIS_PROMPT.render(mode=mode, phase2_cat=phase2_cat, answers_summary=answers_summary,
+            task_instruction=task_instruction, output_format=output_format,
+            hobbies=answers.get('PI1_Hobbies', 'N/A'), extracurricular=answers.get('PI2_Extracurricular', 'N/A'),
+        )
+        
+        # Generate Content with Fallback
+        text = await llm_gateway.complete(prompt)
+        print(f"DEBUG: AI Raw Text: {text}")
+        ai_data = json.loads(text)
+        
+        if mode != "10th" and "recommended_stream" in ai_data: 
+             result.recommended_stream = ai_data["recommended_stream"]
+        if "final_analysis" in ai_data: result.final_analysis = ai_data["final_analysis"]
+        
+        # Handling Data Mapping
+        if mode == "10th":
+            if "stream_pros" in ai_data: result.stream_pros = ai_data["stream_pros"]
+            if "stream_cons" in ai_data: result.stream_cons = ai_data["stream_cons"]
+            # Add hobby recommendation to analysis text
+            if "goal_options" in ai_data and len(ai_data["goal_options"]) > 0:
+                hobby_rec = ai_data["goal_options"][-1]
+                if isinstance(hobby_rec, dict):
+                    title = hobby_rec.get('title', 'Alternative Path')
+                    reason = hobby_rec.get('reason', '')
+                    # Ensure final_analysis is a string before appending
+                    if not result.final_analysis:
+                        result.final_analysis = ""
+                    result.final_analysis += f"\n\n**Special Interest Recommendation:** Based on your hobbies, you might also consider a career as a {title}. {reason}"
+        else:
+            # Map 'goal_options' to 'stream_pros' for storage
+            if "goal_options" in ai_data: result.stream_pros = ai_data["goal_options"]
+            result.stream_cons = [] # Not used for 12th/Above
+            
+    except Exception as e:
+        print(f"AI Analysis Failed: {e}")
+        result.final_analysis = f"AI Analysis Unavailable. (Error: {str(e)})"
+
+@job_queue.handler("final_analysis")
+async def final_analysis_job(job, db, progress):
+    result = db.query(models.AssessmentResult).filter(models.AssessmentResult.user_id == job.user_id).first()
+    if not result or not result.final_answers:
+        raise ValueError("No final assessment answers to analyse")
+    await progress("Writing your career report")
+    await run_final_analysis(result, job.payload.get("mode", "10th"), result.final_answers)
+    db.commit()
+    return {"redirect": "/assessment/result"}
+
 
 # --- Final Phase AI Chat Endpoint ---
 
@@ -2411,66 +2480,27 @@ Your tone is encouraging, curious, and professional.
 - Never make up questions. Only use the question data provided to you.
 """
 
-@app.post("/assessment/final/chat")
-async def final_chat(request: Request, chat_req: FinalChatRequest, db: Session = Depends(get_db)):
-    user = get_current_user(request, db)
-    if not user:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    from fastapi.responses import JSONResponse
-    mode = chat_req.mode
-    current_idx = chat_req.current_index
+def format_final_question(q, number: int, total: int) -> str:
+    """Question block handed to the LLM when fast conversational mode is off."""
+    if q.kind == "mcq":
+        options_text = "\n".join([f"  Option {o.value.upper()}: {o.text}" for o in q.options])
+        return f"""Question {number} of {total} [{q.section}]:
+{q.text}
+{options_text}"""
+    return f"""Question {number} of {total}:
+Title: {q.title or q.text}
+Scenario: {q.text}
+(Focus: {q.insight or 'Open answer'})"""
 
-    # Build flat question list based on mode
-    if mode == "10th":
-        flat_questions = []
-        for section_id, section_data in all_questions.items():
-            for q in section_data["questions"]:
-                q_dict = {
-                    "id": q["id"],
-                    "title": q["question"],
-                    "section": section_data["title"]
-                }
-                if q.get("type") == "open":
-                    q_dict["type"] = "open"
-                else:
-                    q_dict["type"] = "mcq"
-                    q_dict["options"] = [{"value": o["value"], "text": o["text"]} for o in q["options"]]
-                flat_questions.append(q_dict)
-    elif mode == "12th":
-        flat_questions = [
-            {"id": q["id"], "title": q["title"], "text": q["text"], "insight": q["insight"], "type": "open"}
-            for q in questions_12th
-        ]
-    else:  # above
-        flat_questions = [
-            {"id": q["id"], "title": q["title"], "text": q["text"], "insight": q["insight"], "type": "open"}
-            for q in questions_above_12th
-        ]
+FINAL_DONE_TEXT = "Wonderful! You've answered all the questions. Click **Get My Career Path** to generate your personalised AI career insights! 🎯"
 
+def final_turn(flat_questions, chat_req: FinalChatRequest):
+    """Prompt for one LLM-rendered final-assessment turn. Returns (prompt, demo_text, new_index, done)."""
     total = len(flat_questions)
-
-    # All done
-    if current_idx >= total:
-        return JSONResponse({
-            "response": "Wonderful! You've answered all the questions. Click **Get My Career Path** to generate your personalised AI career insights! 🎯",
-            "current_index": current_idx,
-            "answers": chat_req.answers,
-            "done": True
-        })
+    current_idx = chat_req.current_index
 
     # Format current question for the prompt
-    q = flat_questions[current_idx]
-    if q["type"] == "mcq":
-        options_text = "\n".join([f"  Option {o['value'].upper()}: {o['text']}" for o in q["options"]])
-        current_q_text = f"""Question {current_idx + 1} of {total} [{q['section']}]:
-{q['title']}
-{options_text}"""
-    else:
-        current_q_text = f"""Question {current_idx + 1} of {total}:
-Title: {q['title']}
-Scenario: {q['text']}
-(Focus: {q['insight']})"""
+    current_q_text = format_final_question(flat_questions[current_idx], current_idx + 1, total)
 
     if chat_req.message and chat_req.message.strip():
         # User replied — move to next
@@ -2483,17 +2513,7 @@ Give a warm 1-sentence acknowledgement, then tell them they've completed all que
             new_idx = next_idx
             done = True
         else:
-            next_q = flat_questions[next_idx]
-            if next_q["type"] == "mcq":
-                next_opts = "\n".join([f"  Option {o['value'].upper()}: {o['text']}" for o in next_q["options"]])
-                next_q_text = f"""Question {next_idx + 1} of {total} [{next_q['section']}]:
-{next_q['title']}
-{next_opts}"""
-            else:
-                next_q_text = f"""Question {next_idx + 1} of {total}:
-Title: {next_q['title']}
-Scenario: {next_q['text']}
-(Focus: {next_q['insight']})"""
+            next_q_text = format_final_question(flat_questions[next_idx], next_idx + 1, total)
             prompt = f"""{FINAL_COUNSELLOR_PROMPT}
 
 The student just answered the previous question. Their response: "{chat_req.message}"
@@ -2512,25 +2532,45 @@ Welcome the student warmly (1 sentence), then present this first question:
         new_idx = current_idx
         done = False
 
+    return prompt, f"[Demo Mode] {current_q_text}", new_idx, done
+
+@app.post("/assessment/final/chat")
+async def final_chat(request: Request, chat_req: FinalChatRequest, db: Session = Depends(get_db)):
+    user = get_current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    from fastapi.responses import JSONResponse
+    mode = chat_req.mode
+    current_idx = chat_req.current_index
+
+    flat_questions = question_bank.flat(mode)
+    total = len(flat_questions)
+
+    # All done
+    if current_idx >= total:
+        return JSONResponse({
+            "response": FINAL_DONE_TEXT,
+            "current_index": current_idx,
+            "answers": chat_req.answers,
+            "done": True
+        })
+
+    # Fast conversational mode: render the turn locally, LLM only for free-text replies
+    if assessment_dialogue.FAST_CHAT_MODE:
+        ai_text, new_idx, done = await assessment_dialogue.fast_turn(
+            flat_questions, current_idx, chat_req.message, user.id, FINAL_COUNSELLOR_PROMPT, FINAL_DONE_TEXT,
+        )
+        return JSONResponse({"response": ai_text, "current_index": new_idx, "answers": chat_req.answers, "done": done})
+
+    prompt, demo_text, new_idx, done = final_turn(flat_questions, chat_req)
+
     # Call Gemini with Groq fallback
     try:
-        if GEMINI_API_KEY:
-            try:
-                model_ai = genai.GenerativeModel("gemini-2.0-flash")
-                response = await model_ai.generate_content_async(prompt)
-                ai_text = response.text
-            except Exception:
-                model_ai = genai.GenerativeModel("gemini-1.5-flash")
-                response = await model_ai.generate_content_async(prompt)
-                ai_text = response.text
-        elif groq_client:
-            completion = await groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama-3.3-70b-versatile",
-            )
-            ai_text = completion.choices[0].message.content
+        if llm_gateway.is_configured():
+            ai_text = await llm_gateway.complete(prompt, profile="chat", extract_json=False, priority=llm_gateway.PRIORITY_INTERACTIVE)
         else:
-            ai_text = f"[Demo Mode] {current_q_text}"
+            ai_text = demo_text
     except Exception as e:
         ai_text = f"I seem to be in deep thought right now. ({str(e)}) Please try again."
 
@@ -2541,6 +2581,32 @@ Welcome the student warmly (1 sentence), then present this first question:
         "done": done
     })
 
+@app.post("/assessment/final/chat/stream")
+async def final_chat_stream(request: Request, chat_req: FinalChatRequest, db: Session = Depends(get_db)):
+    """SSE variant of `/assessment/final/chat`: the reply streams token by token."""
+    user = get_current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    flat_questions = question_bank.flat(chat_req.mode)
+    total = len(flat_questions)
+    current_idx = chat_req.current_index
+    error_text = "I seem to be in deep thought right now. ({error}) Please try again."
+
+    if current_idx >= total:
+        chunks, new_idx, done = _single_chunk(FINAL_DONE_TEXT), current_idx, True
+    elif assessment_dialogue.FAST_CHAT_MODE:
+        chunks = assessment_dialogue.fast_turn_stream(
+            flat_questions, current_idx, chat_req.message, user.id, FINAL_COUNSELLOR_PROMPT, FINAL_DONE_TEXT,
+        )
+        new_idx, done = assessment_dialogue.turn_position(current_idx, chat_req.message, total)
+    else:
+        prompt, demo_text, new_idx, done = final_turn(flat_questions, chat_req)
+        chunks = llm_gateway.stream(prompt) if llm_gateway.is_configured() else _single_chunk(demo_text)
+
+    final = {"current_index": new_idx, "answers": chat_req.answers, "done": done}
+    return sse_response(stream_chat_turn(chunks, final, error_text))
+
 
 # --- Bark TTS Route ---
 
@@ -2605,24 +2671,26 @@ async def chatbot_page(request: Request, db: Session = Depends(get_db)):
     
     return templates.TemplateResponse("chatbot.html", {"request": request, "user": user, "history": history})
 
-@app.post("/assessment/resolve-voice")
-async def resolve_voice(req: ResolveVoiceRequest):
-    """
-    Uses AI to match a voice transcript to one of the provided multiple-choice options.
-    """
-    prompt = f"""
-    The student spoke this answer for a career assessment question: "{req.transcript}"
+RESOLVE_VOICE_PROMPT = prompt_registry.register("resolve_voice", version=1, ttl=7 * 86400, template="""
+    The student spoke this answer for a career assessment question: "{transcript}"
     
     Which of these options best matches what they said?
     Options:
-    {json.dumps(req.options, indent=2)}
+    {options}
     
     Output ONLY valid JSON with the field "best_match" containing the "value" of the matching option.
     If no good match exists, return the most likely one based on interest.
+    """)
+
+@app.post("/assessment/resolve-voice")
+async def resolve_voice(req: ResolveVoiceRequest):
     """
+    Uses AI to match a voice transcript to one of the provided multiple-choice options.
+    """
+    prompt = RESOLVE_VOICE_PROMPT.render(transcript=req.transcript, options=req.options)
     
     try:
-        clean_text = await generate_content_with_fallback(prompt)
+        clean_text = await llm_gateway.complete(prompt)
         result = json.loads(clean_text)
         return result
     except Exception as e:
@@ -2632,6 +2700,19 @@ async def resolve_voice(req: ResolveVoiceRequest):
 
 # --- Chatbot Routes ---
 
+# Replay cache identity for chatbot answers: every profile field the prompt carries
+# except the name (answers that use it are never recorded)
+CHATBOT_REPLAY_KEY = prompt_registry.register("chatbot_reply", version=2, ttl=int(os.getenv("CHAT_REPLAY_TTL", str(7 * 86400))),
+                                              template="{archetype}|{grade}|{stream}|{personality}|{message}")
+# Shorter messages ("tell me more", "why?") depend on the conversation and are never replayed
+CHAT_REPLAY_MIN_WORDS = int(os.getenv("CHAT_REPLAY_MIN_WORDS", "4"))
+# A conversation ends after this many seconds without a message; the next one starts fresh
+CHAT_SESSION_GAP = int(os.getenv("CHAT_SESSION_GAP", "1800"))
+
+def normalize_chat_message(message: str) -> str:
+    """Lower-cased, punctuation-free, whitespace-collapsed form of a chat message."""
+    return " ".join(re.sub(r"[^\w\s]", " ", message.lower()).split())
+
 @app.post("/chatbot/message")
 async def chatbot_message(request: Request, chat_req: ChatRequest, db: Session = Depends(get_db)):
     user = get_current_user(request, db)
@@ -2672,8 +2753,12 @@ async def chatbot_message(request: Request, chat_req: ChatRequest, db: Session =
         if result.phase3_analysis:
              context_str += f"Work Style Analysis: {result.phase3_analysis[:200]}...\n"
 
-    # Fetch recent history for context
-    recent_history = db.query(models.ChatMessage).filter(models.ChatMessage.user_id == user.id).order_by(models.ChatMessage.timestamp.desc()).limit(10).all()
+    # Fetch recent history for context: only the current conversation
+    session_start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=CHAT_SESSION_GAP)
+    recent_history = db.query(models.ChatMessage).filter(
+        models.ChatMessage.user_id == user.id,
+        models.ChatMessage.timestamp >= session_start,
+    ).order_by(models.ChatMessage.timestamp.desc()).limit(10).all()
     recent_history.reverse() # Oldest first
     history_str = "\n".join([f"{msg.sender.upper()}: {msg.content}" for msg in recent_history])
 
@@ -2699,6 +2784,26 @@ CONVERSATION HISTORY: {history_str}
 Response (Concise, Markdown formatted):
 """
     
+    # Repeated opening questions from students with the same profile replay a recorded answer.
+    # Later turns of a conversation depend on its history, so they are never replayed or recorded
+    replay_key = None
+    normalized_message = normalize_chat_message(user_message)
+    first_turn = all(msg.id == user_msg_db.id for msg in recent_history)
+    if first_turn and len(normalized_message.split()) >= CHAT_REPLAY_MIN_WORDS:
+        replay_key = CHATBOT_REPLAY_KEY.render(
+            archetype=result.phase_2_category if result else None,
+            grade=result.selected_class if result else None,
+            stream=result.recommended_stream if result else None,
+            personality=result.personality if result else None,
+            message=normalized_message,
+        )
+    name_parts = (user.full_name or "").split()
+    first_name = name_parts[0].lower() if name_parts else ""
+
+    def is_shareable(text):
+        # Answers that address the student by name are personal and are not recorded
+        return not first_name or first_name not in text.lower()
+
     # 3. Stream AI Response with Fallback
     user_id = user.id
     async def generate():
@@ -2707,37 +2812,15 @@ Response (Concise, Markdown formatted):
         # closes after the response object is returned but before streaming finishes.
         local_db = SessionLocal()
         try:
-            # TRY GEMINI FIRST
-            if GEMINI_API_KEY:
+            if llm_gateway.is_configured():
+                print(f"AI Chat for User {user_id}: Streaming via LLM gateway...")
                 try:
-                    print(f"AI Chat for User {user_id}: Trying Gemini...")
-                    model = genai.GenerativeModel("gemini-1.5-flash")
-                    response = await model.generate_content_async(prompt, stream=True)
-                    async for chunk in response:
-                        if chunk.text:
-                            text_chunk = chunk.text
-                            full_response_text += text_chunk
-                            yield text_chunk
-                except Exception as gemini_e:
-                    print(f"Chatbot Gemini Error: {gemini_e}. Trying Groq fallback.")
-                    # FALLBACK TO GROQ
-                    if groq_client:
-                        try:
-                            stream = await groq_client.chat.completions.create(
-                                messages=[{"role": "user", "content": prompt}],
-                                model="llama-3.3-70b-versatile",
-                                stream=True,
-                            )
-                            async for chunk in stream:
-                                if chunk.choices[0].delta.content:
-                                    text_chunk = chunk.choices[0].delta.content
-                                    full_response_text += text_chunk
-                                    yield text_chunk
-                        except Exception as groq_e:
-                            print(f"Chatbot Groq Error: {groq_e}")
-                            yield f"I'm sorry, both AI services are currently unavailable. (Gemini: {str(gemini_e)}, Groq: {str(groq_e)})"
-                    else:
-                        yield f"AI Service error: {str(gemini_e)}"
+                    async for text_chunk in llm_gateway.stream(prompt, replay_key=replay_key, record_if=is_shareable):
+                        full_response_text += text_chunk
+                        yield text_chunk
+                except llm_gateway.LLMUnavailableError as stream_e:
+                    print(f"Chatbot Stream Error: {stream_e}")
+                    yield f"I'm sorry, the AI services are currently unavailable. ({stream_e})"
             else:
                  # Demo Mode Simulation
                  fake_response = "I'm in demo mode (No API Key). Based on your profile, I'd suggest exploring based on your interests! (Please set GEMINI_API_KEY to get real AI responses)"
@@ -2840,6 +2923,7 @@ class CareerPathRequest(BaseModel):
 
 @app.post("/assessment/generate_path")
 async def generate_career_path(request: Request, path_req: CareerPathRequest, db: Session = Depends(get_db)):
+    """Queues a roadmap generation; the page follows it through `/jobs/{job_id}/events`."""
     user = get_current_user(request, db)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -2848,91 +2932,37 @@ async def generate_career_path(request: Request, path_req: CareerPathRequest, db
     if not result:
         raise HTTPException(status_code=404, detail="Assessment results not found")
 
+    try:
+        job, created = job_queue.enqueue(db, user.id, "career_path", {"career_title": path_req.career_title}, dedupe_key=path_req.career_title)
+    except JobQueueFullError:
+        raise HTTPException(status_code=503, detail="Too many roadmaps are being generated right now. Please try again shortly.")
+    return {"success": True, "job_id": job.id, "status": job.status, "deduplicated": not created}
+
+@job_queue.handler("career_path")
+async def career_path_job(job, db, progress):
+    career_title = job.payload["career_title"]
+    result = db.query(models.AssessmentResult).filter(models.AssessmentResult.user_id == job.user_id).first()
+    if not result:
+        raise ValueError("Assessment results not found")
+
     archetype = result.phase_2_category or "Explorer"
     personality = result.personality or "Ambivert"
     current_class = result.selected_class or "10th"
     phase3_insight = result.phase3_analysis or ""
     final_insight = result.final_analysis or ""
 
-    prompt = f"""
-    You are an expert 'Student Success Architect' and Career Mentor.
-    
-    Student Profile:
-    - Current Stage: {current_class} (Handle this as the starting point)
-    - Archetype: {archetype} (Influences the learning style and interaction)
-    - Personality: {personality} (Determines the type of environment suggested)
-    - Goal Career: {path_req.career_title}
-    - Deep Analysis Context: {phase3_insight[:400]}
-    - Recommendation Engine Notes: {final_insight[:400]}
-
-    TASK:
-    Create a "Zero-to-Hero" Career Roadmap. The journey MUST start from absolute BASICS (Phase 1-2) and evolve into PROFESSIONAL/PRO level (Phase 5-6).
-    
-    Tone: 
-    - Student-friendly, encouraging, and visionary. 
-    - Use "We" and "You" to make it feel like a partnership. 
-    - Avoid dry corporate jargon where simple, inspiring words work better.
-
-    Provide exactly 6 Milestone Steps:
-    - Step 1-2: Foundations (The "Basics" - Learning, early exploration, building mindset). 
-    - Step 3-4: Intermediate (Core skill building, first real projects, networking).
-    - Step 5-6: Professional (Specialization, portfolio polishing, high-level internships, job readiness).
-
-    For EACH step, include:
-    1. Action Name (Catchy & motivating)
-    2. Description (Explain WHY this step matters for their specific profile - 3 sentences)
-    3. Skills to acquire (3 specific skills relevant to {path_req.career_title})
-    4. Resources (MUST provide 2 specific, HIGHLY ACCURATE resources. EACH resource MUST be an object with a "name" and a functional "url". PRIORITIZE DIRECT LINKS to the **most viewed/popular** YouTube videos or verified courses (Coursera, Udemy, Official Docs). Use HIGHLY SPECIFIC search queries ONLY as a secondary fallback if a direct video link is absolutely unavailable for the specific topic. Plain text without URLs is FORBIDDEN.)
-    5. Student Project (1 "cool" project name and brief description that a student would enjoy building)
-    6. Timeline (Realistic estimate, e.g., "Months 1-3")
-
-    Additional Career Insights:
-    - Internships: 2 specific "Dream Internships" or types of roles to hunt for.
-    - Career Outlook:
-        - Salary Journey: Entry-level to Senior potential (in INR or USD as appropriate).
-        - Top 3 Companies: Famous places that hire this role.
-        - Future Scope: Why this career is a "Safe Bet" or "High Growth" path for the next decade.
-
-    OUTPUT FORMAT (VALID JSON ONLY):
-    {{
-      "career_title": "{path_req.career_title}",
-      "path_steps": [
-        {{ 
-          "step": 1, 
-          "action": "...", 
-          "description": "...", 
-          "skills": ["...", "...", "..."],
-          "courses": [
-            {{ "name": "...", "url": "..." }},
-            {{ "name": "...", "url": "..." }}
-          ],
-          "project": "...",
-          "timeline": "...",
-          "completed": false
-        }},
-        ... (Total 6)
-      ],
-      "internships": ["...", "..."],
-      "career_outlook": {{
-        "salary_range": "...",
-        "top_companies": ["...", "...", "..."],
-        "future_scope": "..."
-      }},
-      "reminders": [
-        {{ "milestone": "...", "reminder": "..." }},
-        ...
-      ]
-    }}
-    """
+    profile = dict(current_class=current_class, archetype=archetype, personality=personality,
+        career_title=career_title, phase3_insight=phase3_insight[:400], final_insight=final_insight[:400],
+    )
 
+    await progress("Designing your roadmap")
     try:
-        clean_text = await generate_content_with_fallback(prompt)
-        path_data = json.loads(clean_text)
+        path_data = await roadmap_builder.build(profile, progress=progress)
         
         # Save to DB
         new_path = models.CareerPath(
-            user_id=user.id,
-            career_title=path_data.get("career_title", path_req.career_title),
+            user_id=job.user_id,
+            career_title=path_data.get("career_title", career_title),
             path_data=path_data.get("path_steps", []),
             reminders=path_data.get("reminders", []),
             # We can store the extra info in the path_data or reminders, 
@@ -2956,14 +2986,15 @@ async def generate_career_path(request: Request, path_req: CareerPathRequest, db
         
         new_path.path_data = full_path_data
         
+        await progress("Saving your roadmap")
         db.add(new_path)
         db.commit()
         db.refresh(new_path)
 
-        return {"success": True, "path_id": new_path.id}
+        return {"path_id": new_path.id, "redirect": f"/career/roadmap/{new_path.id}"}
     except Exception as e:
         print(f"Career Path Generation Error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate career path: {str(e)}")
+        raise RuntimeError(f"Failed to generate career path: {str(e)}")
 
 @app.post("/career/roadmap/{path_id}/step/{step_index}/toggle")
 async def toggle_step_completion(path_id: int, step_index: int, request: Request, db: Session = Depends(get_db)):
@@ -3058,17 +3089,12 @@ async def view_roadmap_resources(path_id: int, request: Request, db: Session = D
         raise HTTPException(status_code=404, detail="Roadmap not found")
         
     career_title = path.career_title
-    keywords = career_keywords.get(career_title, [career_title]) # Fallback to title if not in keywords mapping
-    
-    resources = {
-        "ndli": ResourceAggregator.get_ndli_link(keywords),
-        "arxiv": ResourceAggregator.get_arxiv_link(keywords),
-        "youtube": ResourceAggregator.get_youtube_link(keywords),
-        "scholar": ResourceAggregator.get_google_scholar_link(keywords)
-    }
+    # Closest known career's keywords (falls back to the title itself)
+    keywords = ResourceAggregator.resolve_keywords(career_title)
+    resources = ResourceAggregator.links_for(career_title)
     
-    # NEW: Fetch AI recommendations
-    ai_recommendations = await ResourceAggregator.get_ai_recommendations(career_title, generate_content_with_fallback)
+    # Stored per career and refreshed in the background when stale
+    ai_recommendations = await resource_store.recommendations(db, career_title)
     
     return templates.TemplateResponse("resources_dashboard.html", {
         "request": request, 
@@ -3084,83 +3110,74 @@ async def view_roadmap_resources(path_id: int, request: Request, db: Session = D
 class CollegeRecRequest(BaseModel):
     career_title: str
 
+
+def college_profile(db, user_id: int):
+    """
+    (selected_class, archetype, personal): the first two key the student's shared college
+    catalog entry; `personal` feeds the per-student overlay (None without an assessment).
+    """
+    result = db.query(models.AssessmentResult).filter(models.AssessmentResult.user_id == user_id).first()
+    if not result:
+        return college_catalog.DEFAULT_CLASS, college_catalog.DEFAULT_ARCHETYPE, None
+    personal = dict(personality=result.personality or "Ambivert", final_insight=(result.final_analysis or "")[:400])
+    return (result.selected_class or college_catalog.DEFAULT_CLASS,
+            result.phase_2_category or college_catalog.DEFAULT_ARCHETYPE, personal)
+
+def save_college_recommendation(db, user_id: int, career_title: str, catalog):
+    new_rec = models.CollegeRecommendation(user_id=user_id, career_title=career_title, catalog_id=catalog.id)
+    db.add(new_rec)
+    db.commit()
+    db.refresh(new_rec)
+    return new_rec
+
+def college_redirect(rec):
+    return {"rec_id": rec.id, "redirect": f"/career/colleges/{rec.id}"}
+
 @app.post("/career/colleges/generate")
 async def generate_college_recommendations(request: Request, req: CollegeRecRequest, db: Session = Depends(get_db)):
+    """
+    Links the student to the shared college catalog entry for their career, class and
+    archetype. Only when none exists yet is a job queued; the page then follows it
+    through `/jobs/{job_id}/events`.
+    """
     user = get_current_user(request, db)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    result = db.query(models.AssessmentResult).filter(models.AssessmentResult.user_id == user.id).first()
-
-    current_class = result.selected_class if result else "12th"
-    archetype = result.phase_2_category if result else "Explorer"
-    personality = result.personality if result else "Ambivert"
-
-    prompt = f"""
-    You are an expert 'College Admission Strategist' and Academic Mentor for Indian and global students.
-
-    Student Profile:
-    - Current Stage: {current_class}
-    - Archetype: {archetype}
-    - Personality: {personality}
-    - Target Career: {req.career_title}
-
-    TASK:
-    Recommend the Top 5 Colleges/Institutes (mix of Indian and International) that are BEST suited 
-    for a student aiming to become a "{req.career_title}".
-
-    For EACH college, provide:
-    1. "name" — Full official name
-    2. "location" — City, Country
-    3. "ranking" — A short ranking label (e.g. "Top 3 in India", "#12 Globally")
-    4. "admission_criteria" — Detailed admission requirements (exams, cutoffs, key dates, eligibility). 3-4 sentences.
-    5. "courses_offered" — List of 3-5 specific relevant degree programs (e.g. "B.Tech Computer Science", "M.Sc Data Science")
-    6. "placement_rate" — Percentage or descriptor (e.g. "95%", "Near 100%")
-    7. "avg_package" — Average salary package for graduates (in INR or USD)
-    8. "top_recruiters" — List of 3-4 top companies that recruit from this institute
-    9. "highlights" — 2-3 sentence overview of what makes this institute special for this career
-    10. "website" — Official website URL
-
-    Also provide:
-    - "preparation_tips" — 3-4 bullet points of actionable advice for gaining admission to these institutes
-
-    OUTPUT FORMAT (VALID JSON ONLY):
-    {{
-      "colleges": [
-        {{
-          "name": "...",
-          "location": "...",
-          "ranking": "...",
-          "admission_criteria": "...",
-          "courses_offered": ["...", "...", "..."],
-          "placement_rate": "...",
-          "avg_package": "...",
-          "top_recruiters": ["...", "...", "..."],
-          "highlights": "...",
-          "website": "https://..."
-        }}
-      ],
-      "preparation_tips": ["...", "...", "...", "..."]
-    }}
-    """
+    selected_class, archetype, personal = college_profile(db, user.id)
+    catalog = college_catalog.lookup(db, req.career_title, selected_class, archetype)
+    if catalog is not None:
+        rec = save_college_recommendation(db, user.id, req.career_title, catalog)
+        if personal:
+            # The personal notes land on the row after the response
+            college_catalog.personalize_in_background(rec.id, personal)
+        return {"success": True, **college_redirect(rec)}
 
     try:
-        clean_text = await generate_content_with_fallback(prompt)
-        college_data = json.loads(clean_text)
-
-        new_rec = models.CollegeRecommendation(
-            user_id=user.id,
-            career_title=req.career_title,
-            college_data=college_data,
-        )
-        db.add(new_rec)
-        db.commit()
-        db.refresh(new_rec)
-
-        return {"success": True, "rec_id": new_rec.id}
-    except Exception as e:
-        print(f"College Recommendation Error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate college recommendations: {str(e)}")
+        job, created = job_queue.enqueue(db, user.id, "college_recommendations", {"career_title": req.career_title}, dedupe_key=req.career_title)
+    except JobQueueFullError:
+        raise HTTPException(status_code=503, detail="Too many recommendations are being generated right now. Please try again shortly.")
+    return {"success": True, "job_id": job.id, "status": job.status, "deduplicated": not created}
+
+@job_queue.handler("college_recommendations")
+async def college_recommendations_job(job, db, progress):
+    career_title = job.payload["career_title"]
+    selected_class, archetype, personal = college_profile(db, job.user_id)
+
+    catalog = college_catalog.lookup(db, career_title, selected_class, archetype)
+    if catalog is None:
+        await progress("Curating colleges")
+        try:
+            catalog = await college_catalog.refresh(career_title, selected_class, archetype, db=db,
+                                                    priority=llm_gateway.PRIORITY_NORMAL)
+        except Exception as e:
+            print(f"College Recommendation Error: {e}")
+            raise RuntimeError(f"Failed to generate college recommendations: {str(e)}")
+    rec = save_college_recommendation(db, job.user_id, career_title, catalog)
+    if personal:
+        await progress("Personalising your colleges")
+        await college_catalog.personalize(db, rec, personal)
+    return college_redirect(rec)
 
 
 @app.get("/career/colleges", response_class=HTMLResponse)
@@ -3169,7 +3186,7 @@ async def view_college_recommendations(request: Request, db: Session = Depends(g
     if not user:
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
-    recs = db.query(models.CollegeRecommendation).filter(models.CollegeRecommendation.user_id == user.id).order_by(models.CollegeRecommendation.created_at.desc()).all()
+    recs = db.query(models.CollegeRecommendation).options(joinedload(models.CollegeRecommendation.catalog)).filter(models.CollegeRecommendation.user_id == user.id).order_by(models.CollegeRecommendation.created_at.desc()).all()
     return templates.TemplateResponse("college_recommendations.html", {"request": request, "user": user, "recs": recs})
 
 
@@ -3189,6 +3206,68 @@ async def view_college_detail(rec_id: int, request: Request, db: Session = Depen
     return templates.TemplateResponse("college_detail.html", {"request": request, "user": user, "rec": rec})
 
 
+# --- Generation Job Routes ---
+
+JOB_EVENTS_POLL = float(os.getenv("JOB_EVENTS_POLL", "0.5"))
+JOB_EVENTS_TIMEOUT = float(os.getenv("JOB_EVENTS_TIMEOUT", "180"))
+# How often a long-lived event stream checks that its job has not been orphaned
+JOB_EVENTS_RECOVER_EVERY = float(os.getenv("JOB_EVENTS_RECOVER_EVERY", "10"))
+
+def get_user_job(db: Session, job_id: str, user):
+    job = db.query(models.GenerationJob).filter(models.GenerationJob.id == job_id, models.GenerationJob.user_id == user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Picks the job up here if the process that queued it is gone
+    job_queue.resume(db, job)
+    return job
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, request: Request, db: Session = Depends(get_db)):
+    """Poll endpoint: status, progress and (once finished) result or error of a generation job."""
+    user = get_current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return job_snapshot(get_user_job(db, job_id, user))
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, db: Session = Depends(get_db)):
+    """SSE endpoint: a `progress` event whenever the job's stage changes, then a `final` event."""
+    user = get_current_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    get_user_job(db, job_id, user)
+
+    async def events():
+        # The route session closes once the response starts, so the stream polls with its own
+        local_db = SessionLocal()
+        try:
+            last = None
+            waited = 0.0
+            last_recovery = 0.0
+            while True:
+                local_db.expire_all()
+                snap = job_snapshot(local_db.query(models.GenerationJob).filter(models.GenerationJob.id == job_id).first())
+                if snap["done"]:
+                    yield sse_event("final", snap)
+                    return
+                if (snap["status"], snap["progress"]) != last:
+                    last = (snap["status"], snap["progress"])
+                    yield sse_event("progress", snap)
+                if waited >= JOB_EVENTS_TIMEOUT:
+                    # The client can reconnect or fall back to polling /jobs/{job_id}
+                    yield sse_event("timeout", snap)
+                    return
+                await asyncio.sleep(JOB_EVENTS_POLL)
+                waited += JOB_EVENTS_POLL
+                if waited - last_recovery >= JOB_EVENTS_RECOVER_EVERY:
+                    last_recovery = waited
+                    job_queue.recover(local_db, job_id)
+        finally:
+            local_db.close()
+
+    return sse_response(events())
+
+
 # ─── Student Community & Connection Routes ────────────────────────────────────
 
 @app.get("/community", response_class=HTMLResponse)
@@ -3565,10 +3644,11 @@ async def student_chat_page(conn_id: int, request: Request, db: Session = Depend
     other_id = conn.receiver_id if conn.requester_id == user.id else conn.requester_id
     other_user = db.query(models.User).filter(models.User.id == other_id).first()
 
-    # Get message history
+    # Get message history (messages hidden by moderation are left out)
     messages = db.query(models.StudentMessage).filter(
         ((models.StudentMessage.sender_id == user.id) & (models.StudentMessage.receiver_id == other_id)) |
-        ((models.StudentMessage.sender_id == other_id) & (models.StudentMessage.receiver_id == user.id))
+        ((models.StudentMessage.sender_id == other_id) & (models.StudentMessage.receiver_id == user.id)),
+        models.StudentMessage.moderation_status != "hidden"
     ).order_by(models.StudentMessage.timestamp.asc()).all()
 
     # Mark as read
@@ -3623,8 +3703,12 @@ async def send_student_message(
 
     receiver_id = conn.receiver_id if conn.requester_id == user.id else conn.requester_id
 
-    # Moderation Check
-    is_flagged, reason = await check_content_moderation(content)
+    # Moderation Check: clear cases are decided locally. In optimistic mode the rest is
+    # delivered as pending and reviewed in the background (hidden if it gets flagged)
+    verdict = moderation.quick_check(content)
+    if verdict is None and not moderation.MODERATION_P2P_OPTIMISTIC:
+        verdict = await moderation.llm_check(content)
+    is_flagged, reason = verdict if verdict is not None else (False, "None")
     if is_flagged:
         flag = models.ModerationFlag(user_id=user.id, content=content, chat_type="p2p", status="pending_review")
         db.add(flag)
@@ -3637,13 +3721,23 @@ async def send_student_message(
     new_msg = models.StudentMessage(
         sender_id=user.id,
         receiver_id=receiver_id,
-        content=content
+        content=content,
+        moderation_status="approved" if verdict is not None else "pending"
     )
     db.add(new_msg)
     db.commit()
 
+    if new_msg.moderation_status == "pending" and not moderation.review_queue.submit(new_msg.id):
+        # Review backlog is full: fall back to checking before delivery
+        verdict = await moderation.review_queue.review_inline(db, new_msg.id)
+        db.refresh(new_msg)
+        if verdict is not None and verdict[0]:
+            if request.headers.get("content-type") == "application/json":
+                return {"error": "Your message was flagged as inappropriate. Repeated violations will lead to account suspension."}
+            return RedirectResponse(url=f"/connection/{conn_id}/chat?error=flagged", status_code=status.HTTP_302_FOUND)
+
     if request.headers.get("content-type") == "application/json":
-        return {"success": True, "message_id": new_msg.id}
+        return {"success": True, "message_id": new_msg.id, "moderation_status": new_msg.moderation_status}
 
     return RedirectResponse(url=f"/connection/{conn_id}/chat", status_code=status.HTTP_303_SEE_OTHER)
 
@@ -3666,11 +3760,21 @@ async def get_student_messages(conn_id: int, request: Request, after_id: int = 0
 
     other_id = conn.receiver_id if conn.requester_id == user.id else conn.requester_id
 
-    messages = db.query(models.StudentMessage).filter(
+    conversation = (
         ((models.StudentMessage.sender_id == user.id) & (models.StudentMessage.receiver_id == other_id)) |
-        ((models.StudentMessage.sender_id == other_id) & (models.StudentMessage.receiver_id == user.id)),
-        models.StudentMessage.id > after_id
+        ((models.StudentMessage.sender_id == other_id) & (models.StudentMessage.receiver_id == user.id))
+    )
+    messages = db.query(models.StudentMessage).filter(
+        conversation,
+        models.StudentMessage.id > after_id,
+        models.StudentMessage.moderation_status != "hidden"
     ).order_by(models.StudentMessage.timestamp.asc()).all()
+    # Already delivered messages that moderation has since hidden, so the page can retract them
+    hidden_ids = [row.id for row in db.query(models.StudentMessage.id).filter(
+        conversation,
+        models.StudentMessage.id <= after_id,
+        models.StudentMessage.moderation_status == "hidden"
+    ).all()]
 
     return {
         "messages": [
@@ -3678,10 +3782,12 @@ async def get_student_messages(conn_id: int, request: Request, after_id: int = 0
                 "id": m.id,
                 "sender_id": m.sender_id,
                 "content": m.content,
-                "timestamp": m.timestamp.isoformat()
+                "timestamp": m.timestamp.isoformat(),
+                "moderation_status": m.moderation_status
             }
             for m in messages
-        ]
+        ],
+        "hidden_ids": hidden_ids
     }
 
 
@@ -28,6 +28,7 @@ class AssessmentResult(Base):
     confidence = Column(Float)
     reasoning = Column(Text)
     raw_answers = Column(JSON)
+    archetype_source = Column(String, nullable=True) # "table", "llm" or "default"
     
     # Phase 1 (Class Selection)
     selected_class = Column(String, nullable=True) # "10", "12", "Above 12"
@@ -164,10 +165,29 @@ class CollegeRecommendation(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     career_title = Column(String)
-    college_data = Column(JSON)  # AI-generated list of colleges
+    college_data = Column(JSON)  # AI-generated list of colleges (rows created before the shared catalog)
+    catalog_id = Column(Integer, ForeignKey("college_catalogs.id"), nullable=True)
+    personal_notes = Column(JSON, nullable=True)  # One note per catalog college, from the student's profile
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="college_recommendations")
+    catalog = relationship("CollegeCatalog")
+
+    @property
+    def data(self):
+        """
+        The recommended colleges: the shared catalog entry's, or the row's own legacy copy.
+        The student's personal notes are added to a copy as each college's `fit_note`.
+        """
+        if self.catalog is None:
+            return self.college_data
+        data = self.catalog.college_data
+        if not self.personal_notes or not isinstance(data, dict):
+            return data
+        colleges = [dict(college, fit_note=note) if note else college
+                    for college, note in zip(data.get("colleges") or [], self.personal_notes)]
+        colleges += (data.get("colleges") or [])[len(colleges):]
+        return {**data, "colleges": colleges}
 
 User.counsellor_profile = relationship("CounsellorProfile", back_populates="user", uselist=False)
 User.student_appointments = relationship("Appointment", foreign_keys="Appointment.student_id", back_populates="student")
@@ -175,6 +195,47 @@ User.counsellor_appointments = relationship("Appointment", foreign_keys="Appoint
 User.college_recommendations = relationship("CollegeRecommendation", back_populates="user", order_by="CollegeRecommendation.created_at.desc()")
 
 
+class ResourceRecommendation(Base):
+    """AI-curated learning resources per career, shared by every roadmap with that career title."""
+    __tablename__ = "resource_recommendations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    career_key = Column(String, unique=True, index=True)  # Normalized career title
+    career_title = Column(String)
+    resources = Column(JSON)  # [{"title", "description", "link", "type"}, ...]
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CollegeCatalog(Base):
+    """College recommendations per (career title, class, archetype), shared by every student with that key."""
+    __tablename__ = "college_catalogs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    catalog_key = Column(String, unique=True, index=True)  # Normalized "career|class|archetype"
+    career_title = Column(String)
+    selected_class = Column(String)
+    archetype = Column(String)
+    college_data = Column(JSON)  # {"colleges": [...], "preparation_tips": [...]}
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class GenerationJob(Base):
+    """A long AI generation run by the job workers (app/services/job_queue.py)."""
+    __tablename__ = "generation_jobs"
+
+    id = Column(String, primary_key=True, index=True)  # uuid4 hex
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    job_type = Column(String, index=True)  # career_path, college_recommendations, final_analysis
+    dedupe_key = Column(String, default="")  # e.g. the career title; one active job per user/type/key
+    payload = Column(JSON)
+    status = Column(String, default="queued", index=True)  # queued, running, succeeded, failed
+    progress = Column(String, nullable=True)  # Human-readable stage
+    result = Column(JSON, nullable=True)  # e.g. {"path_id": 3, "redirect": "/career/roadmap/3"}
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
 class StudentConnection(Base):
     """LinkedIn-style connections between students sharing similar archetypes."""
     __tablename__ = "student_connections"
@@ -198,6 +259,8 @@ class StudentMessage(Base):
     content = Column(Text)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     is_read = Column(Boolean, default=False)
+    moderation_status = Column(String, default="approved", index=True)  # pending, reviewing, approved, hidden
+    moderated_at = Column(DateTime(timezone=True), nullable=True)  # Review claimed / settled
 
     sender = relationship("User", foreign_keys=[sender_id], backref="sent_student_messages")
     receiver = relationship("User", foreign_keys=[receiver_id], backref="received_student_messages")
@@ -0,0 +1,232 @@
+"""
+AI Call Scheduler
+=================
+Admission control in front of every provider attempt made by the LLM gateway.
+
+Each provider gets a max-concurrency limit plus requests-per-minute and
+tokens-per-minute token buckets. Callers that cannot start right away wait in a
+priority queue, so interactive chat is admitted before regular assessment work, and
+that work before background jobs such as resource recommendations:
+
+    async with ai_scheduler.slot("gemini", PRIORITY_INTERACTIVE, est_tokens):
+        ...  # the provider call
+
+Time spent waiting for a slot is recorded per provider and priority and exposed
+through `stats()`. A caller that waits longer than its queue timeout gets
+`QueueTimeoutError`, which the gateway treats like any other failed attempt and
+fails over to the next provider.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Tokens assumed for the answer when estimating a call's TPM cost up front
+AI_EST_OUTPUT_TOKENS = int(os.getenv("AI_EST_OUTPUT_TOKENS", "512"))
+AI_QUEUE_TIMEOUT = float(os.getenv("AI_QUEUE_TIMEOUT", "30"))
+
+
+class QueueTimeoutError(Exception):
+    """Raised when a call waited longer than its queue timeout for a provider slot."""
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough token cost of a call: ~4 characters per prompt token plus the expected answer."""
+    return len(prompt) // 4 + AI_EST_OUTPUT_TOKENS
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute / 60` units per second up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are available now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+
+class QueueWaitStats:
+    """Count, mean, max and p95 of queue waits over a sliding window."""
+
+    def __init__(self, window: int = 500):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+
+    def record(self, wait: float):
+        self.samples.append(wait)
+        self.count += 1
+        self.total += wait
+        self.max = max(self.max, wait)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0
+        return {
+            "admitted": self.count,
+            "timeouts": self.timeouts,
+            "avg_wait": round(self.total / self.count, 4) if self.count else 0.0,
+            "p95_wait": round(p95, 4),
+            "max_wait": round(self.max, 4),
+        }
+
+
+class ProviderLimiter:
+    """Concurrency cap + RPM/TPM buckets for one provider, admitting waiters in priority order."""
+
+    def __init__(self, name: str, max_concurrency: int, rpm: float, tpm: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.active = 0
+        self._queue = []  # (priority, seq, future, tokens)
+        self._seq = itertools.count()
+        self._timer = None
+        self.waits = {p: QueueWaitStats() for p in PRIORITY_NAMES}
+
+    def _has_capacity(self) -> bool:
+        return self.max_concurrency <= 0 or self.active < self.max_concurrency
+
+    def _pump(self):
+        """Admits queued callers, best priority first, while concurrency and both buckets allow."""
+        self._timer = None
+        while self._queue:
+            priority, _, future, tokens = self._queue[0]
+            if future.done():
+                # Timed out or cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+            if not self._has_capacity():
+                return
+            delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if delay > 0:
+                # The head waits for its buckets; lower priorities must not overtake it
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                return
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.active += 1
+            future.set_result(None)
+
+    async def acquire(self, priority: int, tokens: int, timeout: float) -> float:
+        """Waits for a slot; returns the seconds spent queued."""
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future, tokens))
+        if self._timer is None:
+            self._pump()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Admitted in the same instant we gave up: hand the slot straight back
+                self.release()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.waits[priority].timeouts += 1
+                raise QueueTimeoutError(f"{self.name} queue wait exceeded {timeout:g}s")
+            raise
+        wait = time.monotonic() - started
+        self.waits[priority].record(wait)
+        return wait
+
+    def release(self):
+        self.active -= 1
+        if self._timer is None:
+            self._pump()
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": sum(1 for entry in self._queue if not entry[2].done()),
+            "max_concurrency": self.max_concurrency,
+            "rpm_available": None if self.requests.unlimited else round(self.requests.level, 1),
+            "tpm_available": None if self.tokens.unlimited else round(self.tokens.level),
+            "queue_wait": {PRIORITY_NAMES[p]: s.snapshot() for p, s in self.waits.items()},
+        }
+
+
+# Per-provider defaults, overridable with AI_<PROVIDER>_MAX_CONCURRENCY / _RPM / _TPM (0 = unlimited)
+PROVIDER_LIMITS = {
+    "gemini": {"max_concurrency": 8, "rpm": 300, "tpm": 1_000_000},
+    "groq": {"max_concurrency": 4, "rpm": 30, "tpm": 12_000},
+}
+
+
+class AIScheduler:
+    def __init__(self, queue_timeout: float = AI_QUEUE_TIMEOUT):
+        self.queue_timeout = queue_timeout
+        self.limiters = {}
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        if provider not in self.limiters:
+            defaults = PROVIDER_LIMITS.get(provider, {"max_concurrency": 0, "rpm": 0, "tpm": 0})
+            env = f"AI_{provider.upper()}_"
+            self.limiters[provider] = ProviderLimiter(
+                provider,
+                max_concurrency=int(os.getenv(env + "MAX_CONCURRENCY", str(defaults["max_concurrency"]))),
+                rpm=float(os.getenv(env + "RPM", str(defaults["rpm"]))),
+                tpm=float(os.getenv(env + "TPM", str(defaults["tpm"]))),
+            )
+        return self.limiters[provider]
+
+    @asynccontextmanager
+    async def slot(self, provider: str, priority: int = PRIORITY_NORMAL, tokens: int = 0, timeout: float = None):
+        """Holds one of the provider's slots for the duration of the block."""
+        limiter = self.limiter(provider)
+        wait = await limiter.acquire(priority, tokens, timeout or self.queue_timeout)
+        if wait >= 1.0:
+            print(f"AI QUEUE: {PRIORITY_NAMES[priority]} call waited {wait:.2f}s for {provider}")
+        try:
+            yield wait
+        finally:
+            limiter.release()
+
+    def stats(self) -> dict:
+        return {name: limiter.snapshot() for name, limiter in self.limiters.items()}
+
+
+# Global instance
+ai_scheduler = AIScheduler()
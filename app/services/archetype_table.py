@@ -0,0 +1,152 @@
+"""
+Phase 2 Archetype Table
+=======================
+Phase 2 is 10 binary A/B questions, so there are only 2^10 = 1024 possible answer
+vectors. `scripts/build_archetype_table.py` classifies all of them offline into
+`data/archetype_table.json`; the app loads that file on startup and answers
+`/assessment/submit` with a dict lookup, falling back to the LLM only for vectors
+the table does not cover (missing answers, or a table built for other questions).
+
+    vector = archetype_table.answer_vector(form_data)   # e.g. "AABABAAAAB"
+    verdict = archetype_table.lookup(vector)             # dict or None
+
+`scripts/check_archetype_table.py` compares the table against the verdicts the LLM
+produced for real submissions (rows with `archetype_source = 'llm'`).
+"""
+
+import json
+import os
+
+from data.questions_data import questions
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "archetype_table.json")
+
+QUESTION_IDS = [q["id"] for q in questions]
+# Q1-Q6 measure social energy (B = the outgoing option), Q7-Q10 goal clarity (A = the defined path)
+PERSONALITY_IDS = QUESTION_IDS[:6]
+GOAL_IDS = QUESTION_IDS[6:]
+# Tie-breaker for a 2-2 split on the goal questions: the "Dream Job title" question
+GOAL_TIE_BREAKER = "Q8_GoalVision"
+
+CATEGORIES = {
+    ("Introvert", "Goal Aware"): "Focused Specialist",
+    ("Introvert", "Exploring"): "Quiet Explorer",
+    ("Ambivert", "Goal Aware"): "Strategic Builder",
+    ("Ambivert", "Exploring"): "Adaptive Explorer",
+    ("Extrovert", "Goal Aware"): "Visionary Leader",
+    ("Extrovert", "Exploring"): "Dynamic Generalist",
+}
+
+_table = {}
+_meta = {}
+_loaded = False
+_stats = {"hits": 0, "misses": 0}
+
+
+def answer_vector(answers) -> str:
+    """A/B string in question order, or None unless every Phase 2 question has an A/B answer."""
+    letters = []
+    for qid in QUESTION_IDS:
+        value = answers.get(qid)
+        if value not in ("A", "B"):
+            return None
+        letters.append(value)
+    return "".join(letters)
+
+
+def vector_from_texts(raw_answers: dict) -> str:
+    """Rebuilds the A/B vector from stored `raw_answers`, which hold the option texts."""
+    letters = {}
+    for q in questions:
+        text = (raw_answers or {}).get(q["id"])
+        match = next((opt["value"] for opt in q["options"] if opt["text"] == text or opt["value"] == text), None)
+        if match is None:
+            return None
+        letters[q["id"]] = match
+    return answer_vector(letters)
+
+
+def classify(vector: str) -> dict:
+    """Deterministic Phase 2 verdict for one answer vector (the rules the offline build uses)."""
+    answers = dict(zip(QUESTION_IDS, vector))
+    outgoing = sum(1 for qid in PERSONALITY_IDS if answers[qid] == "B")
+    reserved = len(PERSONALITY_IDS) - outgoing
+    defined = sum(1 for qid in GOAL_IDS if answers[qid] == "A")
+    open_ended = len(GOAL_IDS) - defined
+
+    # A majority (4 of 6) decides Introvert / Extrovert; an even 3-3 split is Ambivert
+    if reserved >= 4:
+        personality, personality_share = "Introvert", reserved / 6
+        personality_reason = f"You chose the quieter, independent option in {reserved} of the 6 work-style questions"
+    elif outgoing >= 4:
+        personality, personality_share = "Extrovert", outgoing / 6
+        personality_reason = f"You chose the social, high-energy option in {outgoing} of the 6 work-style questions"
+    else:
+        personality, personality_share = "Ambivert", 0.6
+        personality_reason = "Your work-style answers were evenly split between independent and social options, so you recharge both alone and with people"
+
+    if defined != open_ended:
+        goal_status = "Goal Aware" if defined > open_ended else "Exploring"
+        goal_share = max(defined, open_ended) / 4
+        goal_reason = (f"{defined} of your 4 goal answers point to a clear destination, so you are Goal Aware."
+                       if goal_status == "Goal Aware" else
+                       f"{open_ended} of your 4 goal answers favour open-ended paths, so you are still Exploring.")
+    else:
+        goal_status = "Goal Aware" if answers[GOAL_TIE_BREAKER] == "A" else "Exploring"
+        goal_share = 0.5
+        goal_reason = ("Your goal answers were evenly split, but you already picture a specific dream job, so you lean Goal Aware."
+                       if goal_status == "Goal Aware" else
+                       "Your goal answers were evenly split, and you care more about the lifestyle than a job title, so you lean towards Exploring.")
+
+    return {
+        "personality": personality,
+        "goal_status": goal_status,
+        "phase_2_category": CATEGORIES[(personality, goal_status)],
+        "confidence": round(min(0.95, (personality_share + goal_share) / 2), 2),
+        "reasoning": f"{personality_reason}. {goal_reason}",
+    }
+
+
+def load(path: str = TABLE_PATH) -> int:
+    """Loads the precomputed table (called on startup); returns the number of entries."""
+    global _table, _meta, _loaded
+    _loaded = True
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"Archetype table not found at {path}; Phase 2 will use the LLM")
+        _table, _meta = {}, {}
+        return 0
+    except Exception as e:
+        print(f"Archetype table load error: {e}")
+        _table, _meta = {}, {}
+        return 0
+
+    if data.get("questions") != QUESTION_IDS:
+        # Built for a different question set: serving it would misclassify everyone
+        print("Archetype table ignored: it was built for a different Phase 2 question set")
+        _table, _meta = {}, {}
+        return 0
+
+    _table = data.get("entries", {})
+    _meta = {k: v for k, v in data.items() if k != "entries"}
+    print(f"Archetype table loaded: {len(_table)} answer vectors")
+    return len(_table)
+
+
+def lookup(vector: str) -> dict:
+    """Verdict for an answer vector, or None when the table does not cover it."""
+    if not _loaded:
+        # Serverless runtimes may skip the lifespan hook
+        load()
+    verdict = _table.get(vector) if vector else None
+    if verdict is None:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    return dict(verdict)
+
+
+def stats() -> dict:
+    return {"entries": len(_table), "version": _meta.get("version"), **_stats}
@@ -0,0 +1,234 @@
+"""
+Assessment Dialogue (fast conversational mode)
+==============================================
+Renders the turns of the Phase 3 and final-assessment chats locally instead of
+asking the LLM to restate each question:
+
+- Question presentations come from per-question lead-in variants generated offline
+  by `scripts/build_question_phrasings.py` (`data/question_phrasings.json`, loaded
+  on startup), followed by the question text and options verbatim.
+- Acknowledgements come from a small local template bank.
+- Only free-text answers that need a real reply (a question back, or a long open
+  answer) go to the LLM, and then just for the 1-2 sentence reply.
+
+Variants are picked deterministically per (user, question) so a page reload shows
+the same wording.
+"""
+
+import json
+import os
+import re
+import zlib
+
+from . import llm_gateway
+
+PHRASINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "question_phrasings.json")
+
+FAST_CHAT_MODE = os.getenv("FAST_CHAT_MODE", "1") == "1"
+# Open answers at least this long get a real LLM reply instead of a template acknowledgement
+FAST_CHAT_LLM_MIN_WORDS = int(os.getenv("FAST_CHAT_LLM_MIN_WORDS", "25"))
+
+# Used for questions without precomputed variants
+GENERIC_LEAD_INS = [
+    "Picture this one.",
+    "Let's look at this one together.",
+    "Imagine yourself in this moment.",
+    "Take a second with this one.",
+    "Here's a situation for you.",
+]
+
+WELCOMES = [
+    "Welcome! I'm glad you're here, so let's get started.",
+    "Hi there! Let's explore how you think, one question at a time.",
+    "Great to have you here. There are no wrong answers, so just go with your instinct.",
+]
+
+CHOICE_ACKS = [
+    "Got it, you went with Option {choice}.",
+    "Option {choice}, noted. That tells me a lot about how you like to work.",
+    "Thanks! Option {choice} it is.",
+    "Nice, Option {choice}. Let's keep going.",
+    "Interesting pick with Option {choice}.",
+]
+
+OPEN_ACKS = [
+    "Thanks for sharing that, it really helps me understand you.",
+    "That's a thoughtful answer, thank you.",
+    "Love that. Every detail helps build your profile.",
+    "Thanks! That gives me a clearer picture of you.",
+]
+
+_phrasings = {}
+_loaded = False
+_stats = {"template_turns": 0, "llm_turns": 0}
+
+
+def load(path: str = PHRASINGS_PATH) -> int:
+    """Loads the offline phrasing variants (called on startup); returns the number of questions covered."""
+    global _phrasings, _loaded
+    _loaded = True
+    try:
+        with open(path, encoding="utf-8") as f:
+            _phrasings = json.load(f).get("questions", {})
+    except FileNotFoundError:
+        _phrasings = {}
+    except Exception as e:
+        print(f"Question phrasings load error: {e}")
+        _phrasings = {}
+    return len(_phrasings)
+
+
+def _pick(options: list, *seed) -> str:
+    return options[zlib.crc32(":".join(str(s) for s in seed).encode("utf-8")) % len(options)]
+
+
+def lead_in(question_id: str, user_id) -> str:
+    if not _loaded:
+        # Serverless runtimes may skip the lifespan hook
+        load()
+    return _pick(_phrasings.get(question_id) or GENERIC_LEAD_INS, user_id, question_id)
+
+
+def welcome(user_id) -> str:
+    return _pick(WELCOMES, user_id)
+
+
+def present(question, number: int, total: int, user_id) -> str:
+    """Lead-in plus the question and its options, verbatim from the question bank record."""
+    label = "Scenario" if question.kind == "scenario" else "Question"
+    heading = f"**{label} {number} of {total}"
+    if question.title:
+        heading += f": {question.title}"
+    heading += "**"
+    if question.section:
+        heading += f" _{question.section}_"
+
+    lines = [lead_in(question.id, user_id), "", heading]
+    if question.text and question.text != question.title:
+        lines.append(question.text)
+    if question.options:
+        lines.append("")
+        lines.extend(f"**Option {o.value.upper()}:** {o.text}" for o in question.options)
+    else:
+        lines += ["", "Take your time and tell me in your own words."]
+    return "\n".join(lines)
+
+
+_CHOICE_RE = re.compile(r"^\s*(?:option\s*)?\(?([a-d])\)?\s*[.):]?\s*$", re.IGNORECASE)
+
+
+def parse_choice(message: str, question) -> str:
+    """Option letter the message picks ("B", "option b", "(b)" or the option text), or None."""
+    if not question.options:
+        return None
+    match = _CHOICE_RE.match(message)
+    if match:
+        letter = match.group(1)
+        if question.option(letter.lower()) or question.option(letter.upper()):
+            return letter.upper()
+    normalized = " ".join(message.lower().split())
+    for o in question.options:
+        if normalized == " ".join(o.text.lower().split()):
+            return o.value.upper()
+    return None
+
+
+def needs_llm_reply(message: str, question) -> bool:
+    """True for free-text answers that deserve a real reply rather than a template acknowledgement."""
+    if parse_choice(message, question):
+        return False
+    if "?" in message:
+        return True
+    return len(message.split()) >= FAST_CHAT_LLM_MIN_WORDS
+
+
+def acknowledge(message: str, question, user_id) -> str:
+    choice = parse_choice(message, question)
+    if choice:
+        return _pick(CHOICE_ACKS, user_id, question.id).format(choice=choice)
+    return _pick(OPEN_ACKS, user_id, question.id)
+
+
+def reply_prompt(system_prompt: str, question, message: str) -> str:
+    """Prompt for the LLM reply to a free-text answer; the next question is appended locally."""
+    return f"""{system_prompt}
+
+The student was answering this question: "{question.title or ''}" {question.text}
+Their response: "{message}"
+Reply warmly in 1-2 sentences (answer briefly if they asked something). Do NOT present another question."""
+
+
+def record_turn(used_llm: bool):
+    _stats["llm_turns" if used_llm else "template_turns"] += 1
+
+
+def stats() -> dict:
+    return {"enabled": FAST_CHAT_MODE, "phrasings": len(_phrasings), **_stats}
+
+
+def turn_position(current_idx: int, message: str, total: int):
+    """(new_index, done) after a turn: a first load stays on the question, an answer moves on."""
+    if not (message and message.strip()):
+        return current_idx, False
+    return current_idx + 1, current_idx + 1 >= total
+
+
+def _next_text(questions, next_idx: int, user_id, done_text: str) -> str:
+    if next_idx >= len(questions):
+        return done_text
+    return present(questions[next_idx], next_idx + 1, len(questions), user_id)
+
+
+async def fast_turn(questions, current_idx: int, message: str, user_id, system_prompt: str, done_text: str):
+    """
+    One chat turn rendered locally. Returns (response_text, new_index, done).
+    The LLM is only called to reply to a free-text answer that needs it.
+    """
+    total = len(questions)
+    new_idx, done = turn_position(current_idx, message, total)
+    if not (message and message.strip()):
+        # First load: welcome + first question
+        return f"{welcome(user_id)}\n\n{present(questions[current_idx], current_idx + 1, total, user_id)}", new_idx, done
+
+    answered = questions[current_idx]
+    used_llm = False
+    ack = None
+    if needs_llm_reply(message, answered) and llm_gateway.is_configured():
+        try:
+            ack = await llm_gateway.complete(
+                reply_prompt(system_prompt, answered, message),
+                profile="chat", extract_json=False, priority=llm_gateway.PRIORITY_INTERACTIVE,
+            )
+            used_llm = True
+        except Exception as e:
+            print(f"Fast chat reply error (using template): {e}")
+    if not ack:
+        ack = acknowledge(message, answered, user_id)
+    record_turn(used_llm)
+    return f"{ack.strip()}\n\n{_next_text(questions, new_idx, user_id, done_text)}", new_idx, done
+
+
+async def fast_turn_stream(questions, current_idx: int, message: str, user_id, system_prompt: str, done_text: str):
+    """
+    Streaming variant of `fast_turn`: yields the turn's text in chunks (the LLM reply,
+    when one is needed, token by token). The outcome is `turn_position()`.
+    """
+    total = len(questions)
+    if not (message and message.strip()):
+        yield f"{welcome(user_id)}\n\n{present(questions[current_idx], current_idx + 1, total, user_id)}"
+        return
+
+    answered = questions[current_idx]
+    streamed = False
+    if needs_llm_reply(message, answered) and llm_gateway.is_configured():
+        try:
+            async for chunk in llm_gateway.stream(reply_prompt(system_prompt, answered, message)):
+                streamed = True
+                yield chunk
+        except Exception as e:
+            # Only raised before any output, so the template acknowledgement can stand in
+            print(f"Fast chat reply error (using template): {e}")
+    if not streamed:
+        yield acknowledge(message, answered, user_id)
+    record_turn(streamed)
+    yield f"\n\n{_next_text(questions, current_idx + 1, user_id, done_text)}"
@@ -0,0 +1,276 @@
+"""
+College Catalog
+===============
+College recommendations are stored once per (normalized career title, class,
+archetype) in the `college_catalogs` table. Each student's
+`CollegeRecommendation` row references the shared entry instead of holding its
+own copy of the list:
+
+    catalog = college_catalog.lookup(db, "Data Scientist", "12th", "Strategic Builder")
+    if catalog is None:
+        catalog = await college_catalog.refresh("Data Scientist", "12th", "Strategic Builder", db=db)
+
+- fresh entry: served as is, so the request needs no LLM call.
+- stale entry (older than `COLLEGE_REFRESH_AFTER` seconds): served as is, and a
+  background refresh is started (at most one per key at a time).
+- no entry: generated once (by the college recommendation job), then stored.
+
+Only the key's fields reach the prompt, so the list is the same for every
+student sharing it. A refresh that fails keeps the previous list. The catalog row
+is the durable cache, so the list is never read from or parked in the AI response
+cache: a rejected answer cannot outlive the request that produced it.
+
+A small per-student overlay (`college_overlay`) then adds one note per college from
+the student's personality and assessment insights. It is stored on the student's
+`CollegeRecommendation.personal_notes`; if it fails, the shared list is shown as is.
+"""
+
+import asyncio
+import datetime
+import json
+import os
+
+from sqlalchemy.exc import IntegrityError
+
+from .. import models
+from ..database import SessionLocal
+from . import llm_gateway
+from .prompt_registry import prompt_registry
+from .resource_store import normalize_career
+
+COLLEGE_REFRESH_AFTER = int(os.getenv("COLLEGE_REFRESH_AFTER", str(30 * 86400)))
+
+DEFAULT_CLASS = "12th"
+DEFAULT_ARCHETYPE = "Explorer"
+
+_refreshing = {}  # catalog_key -> background task
+_personalizing = set()  # background overlay tasks, kept referenced until done
+_stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0,
+          "personalized": 0, "overlay_failures": 0}
+
+COLLEGE_RECOMMENDATION_PROMPT = prompt_registry.register("college_recommendations", version=2, ttl=30 * 86400, template="""
+    You are an expert 'College Admission Strategist' and Academic Mentor for Indian and global students.
+
+    Student Profile:
+    - Current Stage: {current_class}
+    - Archetype: {archetype}
+    - Target Career: {career_title}
+
+    TASK:
+    Recommend the Top 5 Colleges/Institutes (mix of Indian and International) that are BEST suited 
+    for a student aiming to become a "{career_title}".
+
+    For EACH college, provide:
+    1. "name" — Full official name
+    2. "location" — City, Country
+    3. "ranking" — A short ranking label (e.g. "Top 3 in India", "#12 Globally")
+    4. "admission_criteria" — Detailed admission requirements (exams, cutoffs, key dates, eligibility). 3-4 sentences.
+    5. "courses_offered" — List of 3-5 specific relevant degree programs (e.g. "B.Tech Computer Science", "M.Sc Data Science")
+    6. "placement_rate" — Percentage or descriptor (e.g. "95%", "Near 100%")
+    7. "avg_package" — Average salary package for graduates (in INR or USD)
+    8. "top_recruiters" — List of 3-4 top companies that recruit from this institute
+    9. "highlights" — 2-3 sentence overview of what makes this institute special for this career
+    10. "website" — Official website URL
+
+    Also provide:
+    - "preparation_tips" — 3-4 bullet points of actionable advice for gaining admission to these institutes
+
+    OUTPUT FORMAT (VALID JSON ONLY):
+    {{
+      "colleges": [
+        {{
+          "name": "...",
+          "location": "...",
+          "ranking": "...",
+          "admission_criteria": "...",
+          "courses_offered": ["...", "...", "..."],
+          "placement_rate": "...",
+          "avg_package": "...",
+          "top_recruiters": ["...", "...", "..."],
+          "highlights": "...",
+          "website": "https://..."
+        }}
+      ],
+      "preparation_tips": ["...", "...", "...", "..."]
+    }}
+    """)
+
+
+COLLEGE_OVERLAY_PROMPT = prompt_registry.register("college_overlay", version=1, ttl=7 * 86400, template="""
+    You are a warm College Admission Mentor personalising a shared list of colleges for one
+    student who wants to become a "{career_title}".
+
+    Student Profile:
+    - Current Stage: {current_class}
+    - Archetype: {archetype}
+    - Personality: {personality}
+    - Recommendation Engine Notes: {final_insight}
+
+    Colleges:
+    {colleges}
+
+    For EACH college, write ONE sentence (max 30 words) telling this student, in the "You" voice,
+    why its culture and programs suit their personality, or what to watch out for.
+
+    OUTPUT FORMAT (VALID JSON ONLY):
+    {{ "fit_notes": ["...", "...", "...", "...", "..."] }}
+    """)
+
+
+def catalog_key(career_title: str, selected_class: str, archetype: str) -> str:
+    return "|".join(normalize_career(v) for v in (career_title, selected_class or DEFAULT_CLASS, archetype or DEFAULT_ARCHETYPE))
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def is_stale(row) -> bool:
+    refreshed = row.refreshed_at
+    if refreshed is None:
+        return True
+    if refreshed.tzinfo is None:
+        # SQLite drops the timezone
+        refreshed = refreshed.replace(tzinfo=datetime.timezone.utc)
+    return _utcnow() - refreshed > datetime.timedelta(seconds=COLLEGE_REFRESH_AFTER)
+
+
+async def _generate(career_title: str, selected_class: str, archetype: str, priority: int) -> dict:
+    prompt = COLLEGE_RECOMMENDATION_PROMPT.render(
+        current_class=selected_class or DEFAULT_CLASS,
+        archetype=archetype or DEFAULT_ARCHETYPE,
+        career_title=career_title,
+    )
+    data = json.loads(await llm_gateway.complete(prompt, use_cache=False, priority=priority))
+    if not isinstance(data, dict) or not data.get("colleges"):
+        raise ValueError("College recommendation response has no colleges")
+    return data
+
+
+def _save(db, career_title: str, selected_class: str, archetype: str, college_data: dict):
+    key = catalog_key(career_title, selected_class, archetype)
+    row = db.query(models.CollegeCatalog).filter(models.CollegeCatalog.catalog_key == key).first()
+    if row is None:
+        row = models.CollegeCatalog(catalog_key=key, career_title=career_title,
+                                    selected_class=selected_class or DEFAULT_CLASS,
+                                    archetype=archetype or DEFAULT_ARCHETYPE)
+        db.add(row)
+    row.college_data = college_data
+    row.refreshed_at = _utcnow()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request stored the same key first; its list is just as good
+        db.rollback()
+    return db.query(models.CollegeCatalog).filter(models.CollegeCatalog.catalog_key == key).first()
+
+
+async def refresh(career_title: str, selected_class: str, archetype: str, db=None,
+                  priority: int = llm_gateway.PRIORITY_BACKGROUND):
+    """
+    Regenerates and stores one catalog entry; returns the row. Raises when
+    generation fails (the stored entry, if any, is kept).
+    """
+    try:
+        college_data = await _generate(career_title, selected_class, archetype, priority)
+    except Exception:
+        _stats["refresh_failures"] += 1
+        raise
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        row = _save(db, career_title, selected_class, archetype, college_data)
+    finally:
+        if own_session:
+            db.close()
+    _stats["refreshes"] += 1
+    return row
+
+
+async def _refresh_quietly(career_title: str, selected_class: str, archetype: str):
+    try:
+        await refresh(career_title, selected_class, archetype)
+    except Exception as e:
+        print(f"College catalog refresh error for {career_title}: {e}")
+
+
+def refresh_in_background(career_title: str, selected_class: str, archetype: str):
+    key = catalog_key(career_title, selected_class, archetype)
+    if key in _refreshing:
+        return
+    task = asyncio.get_running_loop().create_task(_refresh_quietly(career_title, selected_class, archetype))
+    _refreshing[key] = task
+    task.add_done_callback(lambda _: _refreshing.pop(key, None))
+
+
+def lookup(db, career_title: str, selected_class: str, archetype: str):
+    """The stored entry for this key, or None. A stale entry is returned and refreshed in the background."""
+    row = db.query(models.CollegeCatalog).filter(
+        models.CollegeCatalog.catalog_key == catalog_key(career_title, selected_class, archetype)
+    ).first()
+    if row is None:
+        _stats["misses"] += 1
+        return None
+    if is_stale(row):
+        _stats["stale_hits"] += 1
+        refresh_in_background(career_title, selected_class, archetype)
+    else:
+        _stats["hits"] += 1
+    return row
+
+
+def _parse_overlay(text: str) -> list:
+    data = json.loads(text)
+    notes = data.get("fit_notes") if isinstance(data, dict) else None
+    if not isinstance(notes, list):
+        raise ValueError("College overlay response has no fit_notes")
+    return notes
+
+
+async def personalize(db, rec, profile: dict) -> bool:
+    """
+    Stores the student's per-college notes on `rec.personal_notes`. `profile` holds
+    personality and final_insight. Returns False (keeping the shared list) on failure.
+    """
+    data = rec.catalog.college_data if rec.catalog else None
+    colleges = data.get("colleges") if isinstance(data, dict) else None
+    if not colleges:
+        return False
+    outline = "\n".join(f"{n}. {c.get('name', '')} ({c.get('location', '')})" for n, c in enumerate(colleges, 1))
+    prompt = COLLEGE_OVERLAY_PROMPT.render(
+        career_title=rec.catalog.career_title, current_class=rec.catalog.selected_class,
+        archetype=rec.catalog.archetype, colleges=outline, **profile,
+    )
+    try:
+        notes = _parse_overlay(await llm_gateway.complete(prompt, validate=_parse_overlay))
+    except Exception as e:
+        _stats["overlay_failures"] += 1
+        print(f"College personalization failed ({e}); serving the shared list")
+        return False
+    rec.personal_notes = [n.strip() if isinstance(n, str) else "" for n in notes[:len(colleges)]]
+    db.commit()
+    _stats["personalized"] += 1
+    return True
+
+
+async def _personalize_quietly(rec_id: int, profile: dict):
+    db = SessionLocal()
+    try:
+        rec = db.query(models.CollegeRecommendation).filter(models.CollegeRecommendation.id == rec_id).first()
+        if rec is not None:
+            await personalize(db, rec, profile)
+    except Exception as e:
+        print(f"College personalization error for recommendation {rec_id}: {e}")
+    finally:
+        db.close()
+
+
+def personalize_in_background(rec_id: int, profile: dict):
+    """Runs the overlay after the response, so a catalog hit still answers without an LLM call."""
+    task = asyncio.get_running_loop().create_task(_personalize_quietly(rec_id, profile))
+    _personalizing.add(task)
+    task.add_done_callback(_personalizing.discard)
+
+
+def stats() -> dict:
+    return {"refreshing": len(_refreshing), "personalizing": len(_personalizing), **_stats}
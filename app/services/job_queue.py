@@ -0,0 +1,292 @@
+"""
+Generation Job Queue
+====================
+Runs long AI generations (career roadmaps, college recommendations, the final
+assessment analysis) outside the HTTP request:
+
+    job, created = job_queue.enqueue(db, user.id, "career_path", {"career_title": title}, dedupe_key=title)
+    return {"success": True, "job_id": job.id}
+
+Jobs are persisted as `GenerationJob` rows, so `/jobs/{id}` (poll) and
+`/jobs/{id}/events` (SSE) can report status and progress from any instance. A
+bounded pool of `JOB_WORKERS` asyncio workers picks job ids off an in-process
+queue of at most `JOB_MAX_PENDING` entries and calls the handler registered for
+the job type:
+
+    @job_queue.handler("career_path")
+    async def run_career_path(job, db, progress):
+        await progress("Designing your roadmap")
+        ...
+        return {"path_id": path.id, "redirect": f"/career/roadmap/{path.id}"}
+
+A user gets at most one active (queued or running) job per job type and dedupe
+key: enqueueing again returns the existing job. Jobs that stay active longer
+than `JOB_STALE_AFTER` stop blocking new ones.
+
+A job runs in the process that queued it, so the process can exit (a restart, a
+serverless instance frozen after its response) with jobs still queued or running.
+Workers claim a job with a conditional `queued -> running` update and keep a
+heartbeat on `updated_at` while it runs, so `recover()` can pick up the pieces
+safely. It runs on `start()` and whenever a job's status is polled:
+
+- a job still `queued` after `JOB_RESUME_AFTER` seconds is queued again here
+  (if another process gets to it first, this claim simply fails);
+- a `running` job without a heartbeat for `JOB_ORPHAN_AFTER` seconds lost its
+  process and is marked `failed`, so the page can offer a retry.
+"""
+
+import asyncio
+import datetime
+import os
+import uuid
+
+from sqlalchemy import and_, or_
+
+from .. import models
+from ..database import SessionLocal
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "200"))
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "600"))
+JOB_HEARTBEAT = int(os.getenv("JOB_HEARTBEAT", "15"))
+JOB_ORPHAN_AFTER = int(os.getenv("JOB_ORPHAN_AFTER", "60"))
+JOB_RESUME_AFTER = int(os.getenv("JOB_RESUME_AFTER", "5"))
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("succeeded", "failed")
+
+
+class JobQueueFullError(Exception):
+    """Raised when JOB_MAX_PENDING jobs are already waiting for a worker."""
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def snapshot(job) -> dict:
+    """Public view of a job row, as returned by the status endpoints."""
+    return {
+        "job_id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error,
+        "done": job.status in FINISHED_STATUSES,
+    }
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.handlers = {}
+        self._queue = None
+        self._tasks = []
+        self._loop = None
+        self._local = set()  # job ids in this process's queue or running here
+        self._stats = {"enqueued": 0, "deduplicated": 0, "rejected": 0, "succeeded": 0, "failed": 0,
+                       "resumed": 0, "orphaned": 0}
+
+    def handler(self, job_type: str):
+        """Registers the coroutine that runs jobs of this type."""
+        def register(fn):
+            self.handlers[job_type] = fn
+            return fn
+        return register
+
+    def start(self):
+        """Starts the worker pool on the running loop (called on startup, and lazily on first enqueue)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._local = set()
+        self._tasks = [loop.create_task(self._worker(i)) for i in range(self.workers)]
+
+        db = SessionLocal()
+        try:
+            self.recover(db)
+        except Exception as e:
+            print(f"Job recovery error: {e}")
+        finally:
+            db.close()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def active_job(self, db, user_id: int, job_type: str, dedupe_key: str = ""):
+        """The user's queued/running job of this type and key, ignoring stale ones."""
+        cutoff = _utcnow() - datetime.timedelta(seconds=JOB_STALE_AFTER)
+        job = db.query(models.GenerationJob).filter(
+            models.GenerationJob.user_id == user_id,
+            models.GenerationJob.job_type == job_type,
+            models.GenerationJob.dedupe_key == dedupe_key,
+            models.GenerationJob.status.in_(ACTIVE_STATUSES),
+        ).order_by(models.GenerationJob.created_at.desc()).first()
+        if job is None:
+            return None
+        created = job.created_at
+        if created is not None and created.tzinfo is None:
+            # SQLite drops the timezone
+            created = created.replace(tzinfo=datetime.timezone.utc)
+        if created is not None and created < cutoff:
+            return None
+        return job
+
+    def enqueue(self, db, user_id: int, job_type: str, payload: dict = None, dedupe_key: str = ""):
+        """
+        Persists and queues a job, or returns the user's identical active job.
+        Returns (job, created). Raises JobQueueFullError when the queue is full.
+        """
+        if job_type not in self.handlers:
+            raise KeyError(f"No handler registered for job type '{job_type}'")
+        dedupe_key = (dedupe_key or "").strip().lower()[:200]
+        existing = self.active_job(db, user_id, job_type, dedupe_key)
+        if existing is not None:
+            self._stats["deduplicated"] += 1
+            return existing, False
+
+        self.start()
+        if self._queue.full():
+            self._stats["rejected"] += 1
+            raise JobQueueFullError(f"{self.max_pending} generation jobs are already pending")
+
+        job = models.GenerationJob(
+            id=uuid.uuid4().hex, user_id=user_id, job_type=job_type, dedupe_key=dedupe_key,
+            payload=payload or {}, status="queued", progress="Waiting for a worker",
+        )
+        db.add(job)
+        db.commit()
+        self._queue.put_nowait(job.id)
+        self._local.add(job.id)
+        self._stats["enqueued"] += 1
+        return job, True
+
+    def recover(self, db, job_id: str = None):
+        """
+        Re-queues jobs left `queued` by another (or an earlier) process and fails
+        `running` jobs whose heartbeat stopped. Limited to one job when `job_id` is given.
+        """
+        if self._queue is None:
+            return
+        now = _utcnow()
+        query = db.query(models.GenerationJob)
+        if job_id is not None:
+            query = query.filter(models.GenerationJob.id == job_id)
+
+        orphan_cutoff = now - datetime.timedelta(seconds=JOB_ORPHAN_AFTER)
+        orphaned = query.filter(
+            models.GenerationJob.status == "running",
+            or_(models.GenerationJob.updated_at < orphan_cutoff,
+                and_(models.GenerationJob.updated_at.is_(None), models.GenerationJob.created_at < orphan_cutoff)),
+        ).update({models.GenerationJob.status: "failed", models.GenerationJob.progress: "Interrupted",
+                  models.GenerationJob.error: "The generation was interrupted. Please try again.",
+                  models.GenerationJob.updated_at: now}, synchronize_session=False)
+        # Queued too long to be worth running now: the user has long moved on
+        expired = query.filter(
+            models.GenerationJob.status == "queued",
+            models.GenerationJob.created_at < now - datetime.timedelta(seconds=JOB_STALE_AFTER),
+        ).update({models.GenerationJob.status: "failed", models.GenerationJob.progress: "Expired",
+                  models.GenerationJob.error: "The generation did not start in time. Please try again.",
+                  models.GenerationJob.updated_at: now}, synchronize_session=False)
+        db.commit()
+        self._stats["orphaned"] += orphaned + expired
+
+        waiting = query.filter(
+            models.GenerationJob.status == "queued",
+            models.GenerationJob.created_at < now - datetime.timedelta(seconds=JOB_RESUME_AFTER),
+        ).order_by(models.GenerationJob.created_at).limit(self.max_pending).all()
+        for job in waiting:
+            if job.id in self._local or job.job_type not in self.handlers or self._queue.full():
+                continue
+            self._queue.put_nowait(job.id)
+            self._local.add(job.id)
+            self._stats["resumed"] += 1
+
+    def resume(self, db, job):
+        """Called when a job's status is read: makes sure an unfinished job is still being worked on."""
+        if job.status not in ACTIVE_STATUSES:
+            return
+        self.start()
+        self.recover(db, job.id)
+        db.refresh(job)
+
+    async def _worker(self, number: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Job worker {number} error on {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT)
+            db = SessionLocal()
+            try:
+                db.query(models.GenerationJob).filter(
+                    models.GenerationJob.id == job_id, models.GenerationJob.status == "running"
+                ).update({models.GenerationJob.updated_at: _utcnow()}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                print(f"Job heartbeat error on {job_id}: {e}")
+            finally:
+                db.close()
+
+    async def _run(self, job_id: str):
+        db = SessionLocal()
+        heartbeat = None
+        try:
+            # Claim: only one process moves a job out of `queued`
+            claimed = db.query(models.GenerationJob).filter(
+                models.GenerationJob.id == job_id, models.GenerationJob.status == "queued"
+            ).update({models.GenerationJob.status: "running", models.GenerationJob.progress: "Starting",
+                      models.GenerationJob.updated_at: _utcnow()}, synchronize_session=False)
+            db.commit()
+            if claimed != 1:
+                return
+            job = db.query(models.GenerationJob).filter(models.GenerationJob.id == job_id).first()
+            heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(job_id))
+
+            async def progress(stage: str):
+                job.progress = stage
+                db.commit()
+
+            try:
+                job.result = await self.handlers[job.job_type](job, db, progress)
+                job.status = "succeeded"
+                job.progress = "Done"
+                self._stats["succeeded"] += 1
+            except Exception as e:
+                db.rollback()
+                print(f"Job {job.job_type} {job_id} failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+                self._stats["failed"] += 1
+            db.commit()
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            self._local.discard(job_id)
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "pending": self._queue.qsize() if self._queue else 0,
+            "max_pending": self.max_pending,
+            **self._stats,
+        }
+
+
+# Global instance
+job_queue = JobQueue()
@@ -0,0 +1,399 @@
+"""
+LLM Gateway
+===========
+Single entry point for every Gemini / Groq call in the app.
+
+    text = await llm_gateway.complete(prompt)                                   # JSON-oriented
+    text = await llm_gateway.complete(prompt, profile="chat", extract_json=False)
+    async for chunk in llm_gateway.stream(prompt):
+        ...
+
+Streams can also be recorded and replayed from the cache by passing a `replay_key`.
+
+Behind these sit the tiered response cache, single-flight coalescing of identical
+prompts, the provider health router (circuit breakers + EWMA latency), hedging,
+the per-provider concurrency / quota scheduler and per-attempt timeouts, plus
+counters exposed through `metrics()`.
+"""
+
+import asyncio
+import json
+import os
+import re
+
+import google.generativeai as genai
+from groq import AsyncGroq
+from dotenv import load_dotenv
+
+from ..utils.redis_cache import ai_cache
+from ..utils.single_flight import SingleFlight
+from ..utils.hedging import HedgeTracker, hedged_call
+from .provider_health import provider_health
+from . import model_registry
+from .prompt_registry import prompt_registry
+from .ai_scheduler import ai_scheduler, estimate_tokens, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BACKGROUND
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+groq_client = AsyncGroq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+# Per-attempt timeout for completions, and max silence between chunks for streams
+AI_CALL_TIMEOUT = float(os.getenv("AI_CALL_TIMEOUT", "30"))
+AI_STREAM_IDLE_TIMEOUT = float(os.getenv("AI_STREAM_IDLE_TIMEOUT", "20"))
+# Optional cross-worker coalescing through a short Redis lock (0 disables it)
+AI_COALESCE_LOCK_MS = int(os.getenv("AI_COALESCE_LOCK_MS", "0"))
+# Hedge slow calls with the runner-up provider after a p95-derived delay (AI_HEDGE_DELAY is the cold-start delay).
+# Opt-in: a fired hedge pays for a second provider call
+AI_HEDGING_ENABLED = os.getenv("AI_HEDGING_ENABLED", "0") == "1"
+
+DEFAULT_TTL = 86400
+
+
+class LLMUnavailableError(Exception):
+    """Raised when no provider could produce a response."""
+
+
+# Identical prompts that miss the cache at the same time share one upstream call
+single_flight = SingleFlight()
+# One hedge tracker per primary provider, since the router may promote Groq to primary
+hedge_trackers = {}
+
+_counters = {
+    "complete_requests": 0,
+    "stream_requests": 0,
+    "stream_replays": 0,
+    "stream_recordings": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "timeouts": 0,
+    "failures": 0,
+    "rejected_answers": 0,
+}
+
+
+def _hedge_tracker(primary):
+    if primary not in hedge_trackers:
+        hedge_trackers[primary] = HedgeTracker(
+            quantile=float(os.getenv("AI_HEDGE_QUANTILE", "0.95")),
+            default_delay=float(os.getenv("AI_HEDGE_DELAY", "4.0")),
+        )
+    return hedge_trackers[primary]
+
+
+# ─── Provider Calls ───────────────────────────────────────────────────────────
+
+async def _gemini_default(prompt):
+    model = model_registry.get_model("gemini-1.5-flash")
+    response = await model.generate_content_async(prompt)
+    return response.text
+
+async def _gemini_chat(prompt):
+    # Conversational turns prefer 2.0 Flash and drop to 1.5 Flash within the same provider
+    try:
+        model = model_registry.get_model("gemini-2.0-flash")
+        response = await model.generate_content_async(prompt)
+    except Exception:
+        model = model_registry.get_model("gemini-1.5-flash")
+        response = await model.generate_content_async(prompt)
+    return response.text
+
+async def _groq_complete(prompt):
+    chat_completion = await groq_client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=GROQ_MODEL,
+    )
+    return chat_completion.choices[0].message.content
+
+async def _gemini_stream(prompt):
+    model = model_registry.get_model("gemini-1.5-flash")
+    response = await model.generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+async def _groq_stream(prompt):
+    stream = await groq_client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=GROQ_MODEL,
+        stream=True,
+    )
+    async for chunk in stream:
+        if chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+# Profile -> (gemini call, groq call)
+COMPLETION_PROFILES = {
+    "default": (_gemini_default, _groq_complete),
+    "chat": (_gemini_chat, _groq_complete),
+}
+
+
+def warm():
+    """Startup hook: build the shared Gemini models so the first request skips construction."""
+    if GEMINI_API_KEY:
+        model_registry.warm()
+
+def is_configured() -> bool:
+    """True when at least one provider has credentials (otherwise callers use their demo mode)."""
+    return bool(GEMINI_API_KEY or groq_client)
+
+def _providers(gemini_call, groq_call):
+    """Provider name -> callable, in preference order, for the providers that have credentials."""
+    providers = {}
+    if GEMINI_API_KEY:
+        providers["gemini"] = gemini_call
+    if groq_client:
+        providers["groq"] = groq_call
+    return providers
+
+
+def extract_json_text(text: str) -> str:
+    """Strips markdown fences, keeps the outermost {...} and drops trailing commas."""
+    try:
+        text = re.sub(r'```json\s*|\s*```', '', text).strip()
+        start_idx = text.find('{')
+        end_idx = text.rfind('}')
+        if start_idx != -1 and end_idx != -1:
+            text = text[start_idx:end_idx + 1]
+        return re.sub(r",\s*([\]}])", r"\1", text)
+    except Exception:
+        return text
+
+
+# ─── Completion ───────────────────────────────────────────────────────────────
+
+async def _attempt(name, fn, prompt, timeout, priority):
+    # Queue time is spent outside provider_health.call so it never counts as provider latency
+    async with ai_scheduler.slot(name, priority, estimate_tokens(prompt)):
+        try:
+            return await provider_health.call(name, lambda: asyncio.wait_for(fn(prompt), timeout))
+        except asyncio.TimeoutError:
+            _counters["timeouts"] += 1
+            raise TimeoutError(f"{name} timed out after {timeout:.0f}s")
+
+async def _route(prompt, providers, timeout, priority):
+    """
+    Calls the fastest healthy provider (skipping tripped circuits), hedging with the
+    runner-up when enabled, or failing over down the list otherwise.
+    """
+    order = provider_health.order(list(providers))
+    if not order:
+        raise LLMUnavailableError("No AI provider available (all circuits open or none configured)")
+
+    if AI_HEDGING_ENABLED and len(order) > 1:
+        primary, secondary = order[0], order[1]
+        text, winner = await hedged_call(
+            lambda: _attempt(primary, providers[primary], prompt, timeout, priority),
+            lambda: _attempt(secondary, providers[secondary], prompt, timeout, priority),
+            _hedge_tracker(primary), primary_name=primary, secondary_name=secondary,
+        )
+        print(f"AI HEDGE: {winner} answered (delay {_hedge_tracker(primary).delay():.2f}s)")
+        return text
+
+    errors = []
+    for name in order:
+        try:
+            return await _attempt(name, providers[name], prompt, timeout, priority)
+        except Exception as e:
+            print(f"{name} Error (trying next provider): {e}")
+            errors.append(f"{name}: {e}")
+    raise LLMUnavailableError(f"AI Failure. {'; '.join(errors)}")
+
+def _is_valid(text, validate) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(text)
+        return True
+    except Exception:
+        return False
+
+async def _generate(prompt, cache_prompt, profile, extract_json, ttl, timeout, priority, validate=None):
+    try:
+        text = await _route(prompt, _providers(*COMPLETION_PROFILES[profile]), timeout, priority)
+    except Exception:
+        _counters["failures"] += 1
+        raise
+    if extract_json:
+        text = extract_json_text(text)
+    if validate is not None:
+        try:
+            validate(text)
+        except Exception:
+            # Never cache an answer the caller cannot use
+            _counters["rejected_answers"] += 1
+            raise
+    await ai_cache.set(cache_prompt, text, ttl)
+    return text
+
+async def _generate_coalesced(prompt, cache_prompt, cache_key, profile, extract_json, ttl, timeout, priority, validate=None):
+    """Runs the upstream call, optionally waiting on another worker that already holds the prompt lock."""
+    if not AI_COALESCE_LOCK_MS:
+        return await _generate(prompt, cache_prompt, profile, extract_json, ttl, timeout, priority, validate)
+
+    token = await ai_cache.acquire_lock(cache_key, AI_COALESCE_LOCK_MS)
+    if token is None:
+        # Another worker is generating this prompt: poll the cache until it lands or the lock lapses
+        deadline = asyncio.get_running_loop().time() + AI_COALESCE_LOCK_MS / 1000
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.2)
+            cached_response = await ai_cache.get(cache_prompt)
+            if cached_response and _is_valid(cached_response, validate):
+                print("AI CACHE HIT (coalesced across workers)")
+                return cached_response
+            if not await ai_cache.is_locked(cache_key):
+                break
+        return await _generate(prompt, cache_prompt, profile, extract_json, ttl, timeout, priority, validate)
+
+    try:
+        return await _generate(prompt, cache_prompt, profile, extract_json, ttl, timeout, priority, validate)
+    finally:
+        await ai_cache.release_lock(cache_key, token)
+
+async def complete(prompt: str, profile: str = "default", extract_json: bool = True,
+                   use_cache: bool = True, ttl: int = DEFAULT_TTL, timeout: float = None,
+                   priority: int = PRIORITY_NORMAL, validate=None) -> str:
+    """
+    Returns the model's answer for `prompt`.
+    `profile` picks the model chain ("default" or "chat"); `extract_json` applies the
+    JSON clean-up used by structured prompts. Cached answers are returned without a call,
+    and concurrent identical prompts share one upstream call. `priority` orders the call
+    in the per-provider scheduler queue (PRIORITY_INTERACTIVE / NORMAL / BACKGROUND).
+    `validate(text)` raises on an unusable answer: such answers are not cached (the error
+    reaches the caller), and a cached answer that fails it is regenerated and overwritten.
+    """
+    _counters["complete_requests"] += 1
+    timeout = timeout or AI_CALL_TIMEOUT
+    # Template-rendered prompts bring their own structured key and TTL
+    ttl = getattr(prompt, "ttl", None) or ttl
+    # Keep the historic cache keys for default JSON prompts; namespace everything else
+    if getattr(prompt, "cache_key", None) or (profile == "default" and extract_json):
+        cache_prompt = prompt
+    else:
+        cache_prompt = f"[{profile}:{'json' if extract_json else 'text'}]\n{prompt}"
+
+    if not use_cache:
+        _counters["cache_misses"] += 1
+        return await _generate(prompt, cache_prompt, profile, extract_json, ttl, timeout, priority, validate)
+
+    cached_response = await ai_cache.get(cache_prompt)
+    if cached_response and _is_valid(cached_response, validate):
+        _counters["cache_hits"] += 1
+        print("AI CACHE HIT")
+        return cached_response
+
+    _counters["cache_misses"] += 1
+    print("AI CACHE MISS")
+    cache_key = ai_cache.key_for(cache_prompt)
+    return await single_flight.do(
+        cache_key,
+        lambda: _generate_coalesced(prompt, cache_prompt, cache_key, profile, extract_json, ttl, timeout, priority, validate),
+    )
+
+
+# ─── Streaming ────────────────────────────────────────────────────────────────
+
+async def _with_idle_timeout(agen, timeout):
+    iterator = agen.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        await agen.aclose()
+
+async def _scheduled_stream(name, fn, prompt, idle_timeout, priority):
+    # Holds the provider slot for the whole stream
+    async with ai_scheduler.slot(name, priority, estimate_tokens(prompt)):
+        async for chunk in provider_health.stream(name, lambda: _with_idle_timeout(fn(prompt), idle_timeout)):
+            yield chunk
+
+async def _stream_live(prompt, idle_timeout, outcome, priority):
+    """Provider failover loop behind `stream()`; sets outcome["complete"] when a provider finished cleanly."""
+    providers = _providers(_gemini_stream, _groq_stream)
+    errors = []
+    for name in provider_health.order(list(providers)):
+        streamed_any = False
+        try:
+            async for chunk in _scheduled_stream(name, providers[name], prompt, idle_timeout, priority):
+                streamed_any = True
+                yield chunk
+            outcome["complete"] = True
+            return
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                _counters["timeouts"] += 1
+            print(f"Stream {name} Error: {e}")
+            errors.append(f"{name}: {e}")
+            if streamed_any:
+                return
+
+    _counters["failures"] += 1
+    raise LLMUnavailableError(f"AI Failure. {'; '.join(errors) or 'no healthy provider'}")
+
+async def stream(prompt: str, idle_timeout: float = None, replay_key=None, record_if=None,
+                 priority: int = PRIORITY_INTERACTIVE):
+    """
+    Yields text chunks from the fastest healthy provider.
+    Fails over to the next provider only if nothing has been streamed yet; a failure
+    after partial output ends the stream with what was already sent.
+    Raises LLMUnavailableError when no provider produced anything.
+
+    With a `replay_key` (a rendered template carrying `cache_key`/`ttl`), a completed
+    stream's chunk sequence is recorded under that key and later requests with the same
+    key replay it chunk by chunk without calling a provider. `record_if(full_text)` can
+    veto recording, e.g. for answers that turned out to be personal.
+    """
+    _counters["stream_requests"] += 1
+    idle_timeout = idle_timeout or AI_STREAM_IDLE_TIMEOUT
+
+    if replay_key is not None:
+        cached_chunks = await ai_cache.get(replay_key)
+        if cached_chunks:
+            _counters["stream_replays"] += 1
+            print("AI STREAM REPLAY")
+            for chunk in json.loads(cached_chunks):
+                yield chunk
+                # Hand control back to the loop so each chunk is flushed like a live one
+                await asyncio.sleep(0)
+            return
+
+    outcome = {"complete": False}
+    chunks = []
+    async for chunk in _stream_live(prompt, idle_timeout, outcome, priority):
+        chunks.append(chunk)
+        yield chunk
+
+    if replay_key is not None and outcome["complete"] and chunks:
+        if record_if is None or record_if("".join(chunks)):
+            ttl = getattr(replay_key, "ttl", None) or DEFAULT_TTL
+            await ai_cache.set(replay_key, json.dumps(chunks), ttl)
+            _counters["stream_recordings"] += 1
+
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+
+def metrics() -> dict:
+    """Snapshot of gateway counters, cache tiers, coalescing, hedging and provider health."""
+    return {
+        "gateway": dict(_counters),
+        "cache": ai_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "hedging": {name: tracker.stats() for name, tracker in hedge_trackers.items()},
+        "providers": provider_health.snapshot(),
+        "model_registry": model_registry.stats(),
+        "prompt_templates": prompt_registry.describe(),
+        "scheduler": ai_scheduler.stats(),
+    }
@@ -0,0 +1,71 @@
+"""
+Gemini Model Registry
+=====================
+Builds each `genai.GenerativeModel` (model name + generation config + system
+instruction) once per process and hands the same instance to every request, so
+the per-request construction cost disappears and the underlying async transport
+stays warm between calls.
+"""
+
+import json
+import threading
+
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+# Models the gateway uses; built and attached to the transport on startup
+DEFAULT_MODELS = ("gemini-1.5-flash", "gemini-2.0-flash")
+
+_models = {}
+_lock = threading.Lock()
+_stats = {"built": 0, "reused": 0}
+
+
+def _freeze(value):
+    """Stable, hashable form of a config dict for use in the registry key."""
+    if value is None:
+        return None
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def get_model(model_name: str, generation_config: dict = None, system_instruction: str = None):
+    """Returns the shared GenerativeModel for this combination, building it on first use."""
+    key = (model_name, _freeze(generation_config), system_instruction)
+    model = _models.get(key)
+    if model is not None:
+        _stats["reused"] += 1
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(
+                model_name,
+                generation_config=generation_config,
+                system_instruction=system_instruction,
+            )
+            _models[key] = model
+            _stats["built"] += 1
+        return model
+
+
+def warm(model_names=DEFAULT_MODELS):
+    """
+    Pre-builds the default models and attaches the shared async client so the first
+    request does not pay for channel setup. Must run inside the event loop (lifespan startup).
+    """
+    try:
+        async_client = genai_client.get_default_generative_async_client()
+    except Exception as e:
+        print(f"Model warm-up skipped: {e}")
+        return
+
+    for name in model_names:
+        model = get_model(name)
+        if getattr(model, "_async_client", None) is None:
+            model._async_client = async_client
+    print(f"Model registry warmed: {', '.join(model_names)}")
+
+
+def stats() -> dict:
+    return {"models": len(_models), **_stats}
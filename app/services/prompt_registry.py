@@ -0,0 +1,103 @@
+"""
+Prompt Template Registry
+========================
+Versioned prompt templates with structured cache keys.
+
+    ARCHETYPE_PROMPT = prompt_registry.register("phase2_archetype", 1, '''... {answers} ...''', ttl=7 * 86400)
+    text = await llm_gateway.complete(ARCHETYPE_PROMPT.render(answers=answers))
+
+`render()` returns a `RenderedPrompt`: a plain string (so it can go anywhere a prompt
+string goes) that also carries `cache_key = "<template_id>:v<version>:<params hash>"`
+and the template's TTL. The key depends on the normalized parameters only, so
+whitespace or wording edits to a template do not silently invalidate the cache;
+bump the version when the output should change. `invalidate()` purges every cached
+answer of one template version in bulk.
+"""
+
+import hashlib
+import json
+
+from ..utils.redis_cache import ai_cache
+
+DEFAULT_TTL = 86400
+
+
+class RenderedPrompt(str):
+    """Prompt text plus the structured cache key and TTL of the template it came from."""
+
+    def __new__(cls, text: str, template_id: str, version: int, cache_key: str, ttl: int):
+        obj = super().__new__(cls, text)
+        obj.template_id = template_id
+        obj.version = version
+        obj.cache_key = cache_key
+        obj.ttl = ttl
+        return obj
+
+
+def _normalize(value):
+    """Canonical form of a parameter: whitespace-collapsed strings, key-sorted dicts."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _format_value(value):
+    # Structured parameters are shown to the model as indented JSON
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, indent=2)
+    return value
+
+
+class PromptTemplate:
+    def __init__(self, template_id: str, version: int, template: str, ttl: int = DEFAULT_TTL):
+        self.template_id = template_id
+        self.version = version
+        self.template = template
+        self.ttl = ttl
+
+    @property
+    def key_prefix(self) -> str:
+        return f"{self.template_id}:v{self.version}:"
+
+    def params_hash(self, params: dict) -> str:
+        canonical = json.dumps(_normalize(params), sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def render(self, **params) -> RenderedPrompt:
+        text = self.template.format(**{k: _format_value(v) for k, v in params.items()})
+        cache_key = f"{self.key_prefix}{self.params_hash(params)}"
+        return RenderedPrompt(text, self.template_id, self.version, cache_key, self.ttl)
+
+
+class PromptRegistry:
+    def __init__(self):
+        self.templates = {}
+
+    def register(self, template_id: str, version: int, template: str, ttl: int = DEFAULT_TTL) -> PromptTemplate:
+        if template_id in self.templates:
+            raise ValueError(f"Prompt template '{template_id}' is already registered")
+        tpl = PromptTemplate(template_id, version, template, ttl)
+        self.templates[template_id] = tpl
+        return tpl
+
+    def get(self, template_id: str) -> PromptTemplate:
+        return self.templates[template_id]
+
+    async def invalidate(self, template_id: str, version: int = None) -> int:
+        """Drops every cached answer for one template version (the current one by default)."""
+        if template_id not in self.templates:
+            raise KeyError(template_id)
+        if version is None:
+            version = self.templates[template_id].version
+        return await ai_cache.invalidate_prefix(f"{template_id}:v{version}:")
+
+    def describe(self) -> dict:
+        return {tid: {"version": t.version, "ttl": t.ttl} for tid, t in self.templates.items()}
+
+
+# Global instance
+prompt_registry = PromptRegistry()
@@ -0,0 +1,198 @@
+"""
+AI Provider Health
+==================
+Per-provider circuit breakers plus EWMA latency / error-rate tracking.
+
+Callers ask `provider_health.order([...])` for the providers worth trying, fastest
+healthy one first, and run each attempt through `provider_health.call(...)` so the
+outcome feeds back into the breaker and the averages. A tripped provider is skipped
+until its cool-down expires; then a single half-open probe decides whether it closes
+again or stays open.
+"""
+
+import asyncio
+import os
+import random
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Classic three-state breaker: trips after N consecutive failures, probes after a cool-down."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def is_open(self) -> bool:
+        """True while the provider should be skipped (open and still cooling down, or probe already running)."""
+        if self.state == CLOSED:
+            return False
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at < self.reset_timeout
+        return self.probe_in_flight
+
+    def before_call(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = True
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Called when a probe is cancelled without an outcome."""
+        self.probe_in_flight = False
+
+
+class ProviderStats:
+    """Exponentially weighted moving averages of latency and error rate for one provider."""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.ewma_latency = None
+        self.ewma_error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+
+    def record(self, ok: bool, latency: float = None):
+        self.calls += 1
+        if not ok:
+            self.failures += 1
+        self.ewma_error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * self.ewma_error_rate
+        if ok and latency is not None:
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+
+
+class ProviderHealth:
+    """Registry of breakers and stats, and the router that orders providers by expected cost."""
+
+    def __init__(self, alpha: float = 0.2, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 error_penalty: float = 4.0, explore_ratio: float = 0.05):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # Weight of the error rate when ranking: score = latency * (1 + penalty * error_rate)
+        self.error_penalty = error_penalty
+        # Share of calls routed to a non-leading healthy provider so its averages stay fresh
+        self.explore_ratio = explore_ratio
+        self.breakers = {}
+        self.stats = {}
+
+    def _ensure(self, name: str):
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            self.stats[name] = ProviderStats(self.alpha)
+
+    def _observed_score(self, name: str):
+        stats = self.stats[name]
+        if stats.ewma_latency is None:
+            # Providers that only ever failed rank last
+            return None if stats.calls == 0 else float("inf")
+        return stats.ewma_latency * (1 + self.error_penalty * stats.ewma_error_rate)
+
+    def score(self, name: str) -> float:
+        self._ensure(name)
+        observed = self._observed_score(name)
+        if observed is not None:
+            return observed
+        # Untried providers get the mean of the measured ones as a prior, so they neither
+        # lead on zero data nor starve (exploration still samples them)
+        measured = [score for score in (self._observed_score(n) for n in self.stats)
+                    if score is not None and score != float("inf")]
+        return sum(measured) / len(measured) if measured else 0.0
+
+    def order(self, names: list) -> list:
+        """Healthy providers, fastest first; ties keep the caller's preference order."""
+        healthy = []
+        for name in names:
+            self._ensure(name)
+            if not self.breakers[name].is_open():
+                healthy.append(name)
+        ranked = sorted(healthy, key=lambda n: (self.score(n), names.index(n)))
+        if len(ranked) > 1 and random.random() < self.explore_ratio:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def record(self, name: str, ok: bool, latency: float = None):
+        self._ensure(name)
+        self.stats[name].record(ok, latency)
+        if ok:
+            self.breakers[name].record_success()
+        else:
+            self.breakers[name].record_failure()
+
+    async def call(self, name: str, fn, record_latency: bool = True):
+        """Runs `fn()` as an attempt against `name`, feeding the outcome back into its health."""
+        self._ensure(name)
+        breaker = self.breakers[name]
+        breaker.before_call()
+        started = time.monotonic()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Losing a hedged race is not a provider failure
+            breaker.release_probe()
+            raise
+        except Exception:
+            self.record(name, ok=False)
+            raise
+        self.record(name, ok=True, latency=(time.monotonic() - started) if record_latency else None)
+        return result
+
+    async def stream(self, name: str, fn):
+        """Streaming counterpart of `call`: re-yields chunks from `fn()` and records the outcome (no latency)."""
+        self._ensure(name)
+        breaker = self.breakers[name]
+        breaker.before_call()
+        try:
+            async for chunk in fn():
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            breaker.release_probe()
+            raise
+        except Exception:
+            self.record(name, ok=False)
+            raise
+        self.record(name, ok=True)
+
+    def snapshot(self) -> dict:
+        return {
+            name: {
+                "state": self.breakers[name].state,
+                "ewma_latency": round(self.stats[name].ewma_latency, 3) if self.stats[name].ewma_latency is not None else None,
+                "ewma_error_rate": round(self.stats[name].ewma_error_rate, 3),
+                "calls": self.stats[name].calls,
+                "failures": self.stats[name].failures,
+            }
+            for name in self.breakers
+        }
+
+
+# Global instance
+provider_health = ProviderHealth(
+    alpha=float(os.getenv("AI_HEALTH_EWMA_ALPHA", "0.2")),
+    failure_threshold=int(os.getenv("AI_BREAKER_FAILURES", "3")),
+    reset_timeout=float(os.getenv("AI_BREAKER_RESET_SECONDS", "30")),
+    explore_ratio=float(os.getenv("AI_ROUTER_EXPLORE_RATIO", "0.05")),
+)
@@ -0,0 +1,183 @@
+"""
+Question Bank
+=============
+Compiles the static `data/questions_*` modules once, at import time, into
+immutable `__slots__` records shared by every route:
+
+    q = question_bank.get("AE5_Social_Economics")    # O(1) lookup by id
+    q.option("b").text, q.stream_for("b")            # O(1) option / stream lookup
+    question_bank.flat("12th")                       # precomputed chat sequence per mode
+    question_bank.scenarios("Focused Specialist")    # Phase 3 scenarios per category
+
+Records are read-only: the raw dicts stay the source of truth (templates still
+render them), and the bank is rebuilt from them on every process start.
+"""
+
+from types import MappingProxyType
+
+from data.questions_data import questions as phase2_questions
+from data.questions_final import all_questions, section_a_questions, section_b_questions, section_c_questions, section_d_questions
+from data.questions_12th import questions_12th
+from data.questions_above_12th import questions_above_12th
+from data.questions_phase3 import CATEGORY_SCENARIOS_MAP
+
+FINAL_MODES = ("10th", "12th", "above")
+
+
+class _Frozen:
+    """Base for read-only records: attributes are set once in __init__ via object.__setattr__."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def _init(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+
+class Option(_Frozen):
+    __slots__ = ("value", "text", "stream", "image", "outcome_hint")
+
+    def __init__(self, raw: dict):
+        self._init(
+            value=raw["value"],
+            text=raw["text"],
+            stream=raw.get("stream"),
+            image=raw.get("image"),
+            outcome_hint=raw.get("outcome_hint"),
+        )
+
+    def __repr__(self):
+        return f"Option({self.value!r}, {self.text[:30]!r})"
+
+
+class Question(_Frozen):
+    """
+    One question of any phase. `kind` is "binary" (Phase 2 A/B), "scenario" (Phase 3),
+    "mcq" or "open" (final assessment). `text` is the full question / story and
+    `title` the short heading, when the source has one.
+    """
+    __slots__ = ("id", "kind", "title", "text", "section", "insight", "placeholder",
+                 "options", "correct_value", "mapped_streams", "_options_by_value", "_stream_by_value")
+
+    def __init__(self, id, kind, text, options=(), title=None, section=None, insight=None,
+                 placeholder=None, correct_value=None, mapped_streams=()):
+        options = tuple(Option(o) for o in options)
+        self._init(
+            id=id,
+            kind=kind,
+            title=title,
+            text=text,
+            section=section,
+            insight=insight,
+            placeholder=placeholder,
+            options=options,
+            correct_value=correct_value,
+            mapped_streams=tuple(mapped_streams or ()),
+            _options_by_value=MappingProxyType({o.value: o for o in options}),
+            _stream_by_value=MappingProxyType({o.value: o.stream for o in options if o.stream}),
+        )
+
+    def option(self, value):
+        """The Option with this value, or None."""
+        return self._options_by_value.get(value)
+
+    def option_text(self, value, default=None):
+        opt = self._options_by_value.get(value)
+        return opt.text if opt else default
+
+    def stream_for(self, value):
+        """Stream code ("PCM", "COMM", ...) the chosen option points to, or None."""
+        return self._stream_by_value.get(value)
+
+    @property
+    def stream_map(self):
+        return self._stream_by_value
+
+    def __repr__(self):
+        return f"Question({self.id!r}, {self.kind!r})"
+
+
+class QuestionBank:
+    def __init__(self):
+        self._by_id = {}
+        self._flat = {}
+        self._scenarios = {}
+        self.phase2 = ()
+        self.section_a = ()
+        self.preference = ()
+
+    def _add(self, question: Question) -> Question:
+        if question.id in self._by_id:
+            raise ValueError(f"Duplicate question id '{question.id}' in the question bank")
+        self._by_id[question.id] = question
+        return question
+
+    @classmethod
+    def compile(cls) -> "QuestionBank":
+        bank = cls()
+
+        bank.phase2 = tuple(
+            bank._add(Question(q["id"], "binary", q["title"], q["options"], title=q["title"]))
+            for q in phase2_questions
+        )
+
+        for category, scenarios in CATEGORY_SCENARIOS_MAP.items():
+            bank._scenarios[category] = tuple(
+                bank._add(Question(s["id"], "scenario", s["story"], s["options"], title=s["title"]))
+                for s in scenarios
+            )
+
+        class10 = []
+        for section in all_questions.values():
+            for q in section["questions"]:
+                class10.append(bank._add(Question(
+                    q["id"], "open" if q.get("type") == "open" else "mcq", q["question"], q.get("options", ()),
+                    section=section["title"], placeholder=q.get("placeholder"),
+                    correct_value=q.get("correct_value"), mapped_streams=q.get("mapped_streams"),
+                )))
+        bank._flat["10th"] = tuple(class10)
+        # Class 10 scoring groups: Section A is marked against correct answers, B-D count stream preferences
+        bank.section_a = tuple(bank._by_id[q["id"]] for q in section_a_questions)
+        bank.preference = tuple(bank._by_id[q["id"]] for q in section_b_questions + section_c_questions + section_d_questions)
+
+        # Answered in free text (the options are only suggestions). Class 12 records carry the
+        # whole prompt in "question"; above-12th ones have title + text
+        bank._flat["12th"] = tuple(
+            bank._add(Question(q["id"], "open", q.get("text") or q["question"], q.get("options", ()),
+                               title=q.get("title"), insight=q.get("insight")))
+            for q in questions_12th
+        )
+        bank._flat["above"] = tuple(
+            bank._add(Question(q["id"], "open", q.get("text") or q.get("question"), q.get("options", ()),
+                               title=q.get("title"), insight=q.get("insight")))
+            for q in questions_above_12th
+        )
+        return bank
+
+    def get(self, question_id: str) -> Question:
+        """Question by id across every phase, or None."""
+        return self._by_id.get(question_id)
+
+    def flat(self, mode: str) -> tuple:
+        """Final-assessment questions for a class mode in presentation order (unknown modes count as "above")."""
+        return self._flat.get(mode, self._flat["above"])
+
+    def scenarios(self, category: str) -> tuple:
+        """Phase 3 scenarios for a Phase 2 category (empty tuple if none)."""
+        return self._scenarios.get(category, ())
+
+    def stats(self) -> dict:
+        return {
+            "questions": len(self._by_id),
+            "modes": {mode: len(qs) for mode, qs in self._flat.items()},
+            "categories": len(self._scenarios),
+        }
+
+
+# Global instance
+question_bank = QuestionBank.compile()
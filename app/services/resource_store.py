@@ -0,0 +1,123 @@
+"""
+Resource Recommendation Store
+=============================
+AI resource recommendations are stored per normalized career title in the
+`resource_recommendations` table, so the roadmap resources page reads them from
+the database instead of calling the LLM on every view:
+
+    resources = await resource_store.recommendations(db, "Data Scientist")
+
+- fresh row: served as is.
+- stale row (older than `RESOURCE_REFRESH_AFTER` seconds): served as is, and a
+  background refresh is started (at most one per career at a time).
+- no row: generated once inline, then stored.
+
+A refresh that produces nothing keeps the previous resources.
+`scripts/warm_resources.py` precomputes every career in `app/data/career_keywords.py`.
+"""
+
+import asyncio
+import datetime
+import functools
+import os
+
+from sqlalchemy.exc import IntegrityError
+
+from .. import models
+from ..database import SessionLocal
+from ..utils.resource_aggregator import ResourceAggregator
+from . import llm_gateway
+
+RESOURCE_REFRESH_AFTER = int(os.getenv("RESOURCE_REFRESH_AFTER", str(14 * 86400)))
+
+_refreshing = {}  # career_key -> background task
+_stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+
+
+def normalize_career(career_title: str) -> str:
+    return " ".join((career_title or "").split()).casefold()
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def is_stale(row) -> bool:
+    refreshed = row.refreshed_at
+    if refreshed is None:
+        return True
+    if refreshed.tzinfo is None:
+        # SQLite drops the timezone
+        refreshed = refreshed.replace(tzinfo=datetime.timezone.utc)
+    return _utcnow() - refreshed > datetime.timedelta(seconds=RESOURCE_REFRESH_AFTER)
+
+
+async def _generate(career_title: str, bypass_cache: bool) -> list:
+    # Recommendations are nice-to-have, so they queue behind interactive and assessment calls
+    complete = functools.partial(llm_gateway.complete, priority=llm_gateway.PRIORITY_BACKGROUND,
+                                 use_cache=not bypass_cache)
+    return await ResourceAggregator.get_ai_recommendations(career_title, complete)
+
+
+def _save(db, career_title: str, resources: list):
+    key = normalize_career(career_title)
+    row = db.query(models.ResourceRecommendation).filter(models.ResourceRecommendation.career_key == key).first()
+    if row is None:
+        row = models.ResourceRecommendation(career_key=key, career_title=career_title)
+        db.add(row)
+    row.resources = resources
+    row.refreshed_at = _utcnow()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request stored the same career first; its resources are just as good
+        db.rollback()
+
+
+async def refresh(career_title: str, db=None, bypass_cache: bool = True) -> list:
+    """
+    Regenerates and stores one career's resources; returns them ([] if generation
+    failed, in which case the stored ones are kept).
+    """
+    resources = await _generate(career_title, bypass_cache)
+    if not resources:
+        _stats["refresh_failures"] += 1
+        return []
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        _save(db, career_title, resources)
+    finally:
+        if own_session:
+            db.close()
+    _stats["refreshes"] += 1
+    return resources
+
+
+def refresh_in_background(career_title: str):
+    key = normalize_career(career_title)
+    if key in _refreshing:
+        return
+    task = asyncio.get_running_loop().create_task(refresh(career_title))
+    _refreshing[key] = task
+    task.add_done_callback(lambda _: _refreshing.pop(key, None))
+
+
+async def recommendations(db, career_title: str) -> list:
+    """Stored resources for a career (generating them on the first request only)."""
+    row = db.query(models.ResourceRecommendation).filter(
+        models.ResourceRecommendation.career_key == normalize_career(career_title)
+    ).first()
+    if row is None:
+        _stats["misses"] += 1
+        return await refresh(career_title, db=db, bypass_cache=False)
+    if is_stale(row):
+        _stats["stale_hits"] += 1
+        refresh_in_background(career_title)
+    else:
+        _stats["hits"] += 1
+    return row.resources or []
+
+
+def stats() -> dict:
+    return {"refreshing": len(_refreshing), **_stats}
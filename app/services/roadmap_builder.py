@@ -0,0 +1,347 @@
+"""
+Career Roadmap Builder
+======================
+Generates the 6-step career roadmap stored in `CareerPath.path_data` in two parts:
+
+- a shared base roadmap per (career_title, current_class, archetype). Its prompts
+  carry nothing student-specific, so the gateway cache serves it to every student
+  with the same key after the first one;
+- a small personalization overlay (`roadmap_overlay`) that adds a note per step
+  from the student's personality and assessment insights, appended to each step's
+  description. If the overlay fails, the base roadmap is returned as is.
+
+The base is built in one of two modes:
+
+- single call (default): one `career_path` prompt returns the whole roadmap.
+- fan-out (`ROADMAP_FANOUT=1`): a short `roadmap_skeleton` call names the 6 steps,
+  then each step's details (`roadmap_step`) and the internships / outlook /
+  reminders (`roadmap_insights`) are generated concurrently, at most
+  `ROADMAP_FANOUT_CONCURRENCY` calls at a time, and merged into the same shape.
+
+    data = await roadmap_builder.build(profile)   # {"career_title", "path_steps", "internships", ...}
+
+`profile` holds current_class, archetype, personality, career_title,
+phase3_insight and final_insight; only career_title, current_class and archetype
+reach the base prompts. A failed fan-out falls back to the single call. Every
+answer is validated before the gateway caches it (`validate=`), so a malformed
+or short roadmap is never served to the other students sharing its key.
+`scripts/benchmark_roadmap.py` compares the wall time of both base modes.
+"""
+
+import asyncio
+import json
+import os
+
+from . import llm_gateway
+from .prompt_registry import prompt_registry
+
+ROADMAP_FANOUT = os.getenv("ROADMAP_FANOUT", "0") == "1"
+ROADMAP_FANOUT_CONCURRENCY = int(os.getenv("ROADMAP_FANOUT_CONCURRENCY", "4"))
+ROADMAP_STEPS = 6
+
+_stats = {"personalized": 0, "overlay_failures": 0}
+
+# Shared across students: only (career_title, current_class, archetype) go into the base prompts
+BASE_KEYS = ("career_title", "current_class", "archetype")
+
+CAREER_PATH_PROMPT = prompt_registry.register("career_path", version=2, ttl=30 * 86400, template="""
+    You are an expert 'Student Success Architect' and Career Mentor.
+    
+    Student Profile:
+    - Current Stage: {current_class} (Handle this as the starting point)
+    - Archetype: {archetype} (Influences the learning style and interaction)
+    - Goal Career: {career_title}
+
+    TASK:
+    Create a "Zero-to-Hero" Career Roadmap. The journey MUST start from absolute BASICS (Phase 1-2) and evolve into PROFESSIONAL/PRO level (Phase 5-6).
+    
+    Tone: 
+    - Student-friendly, encouraging, and visionary. 
+    - Use "We" and "You" to make it feel like a partnership. 
+    - Avoid dry corporate jargon where simple, inspiring words work better.
+
+    Provide exactly 6 Milestone Steps:
+    - Step 1-2: Foundations (The "Basics" - Learning, early exploration, building mindset). 
+    - Step 3-4: Intermediate (Core skill building, first real projects, networking).
+    - Step 5-6: Professional (Specialization, portfolio polishing, high-level internships, job readiness).
+
+    For EACH step, include:
+    1. Action Name (Catchy & motivating)
+    2. Description (Explain WHY this step matters for a {archetype} at this stage - 3 sentences)
+    3. Skills to acquire (3 specific skills relevant to {career_title})
+    4. Resources (MUST provide 2 specific, HIGHLY ACCURATE resources. EACH resource MUST be an object with a "name" and a functional "url". PRIORITIZE DIRECT LINKS to the **most viewed/popular** YouTube videos or verified courses (Coursera, Udemy, Official Docs). Use HIGHLY SPECIFIC search queries ONLY as a secondary fallback if a direct video link is absolutely unavailable for the specific topic. Plain text without URLs is FORBIDDEN.)
+    5. Student Project (1 "cool" project name and brief description that a student would enjoy building)
+    6. Timeline (Realistic estimate, e.g., "Months 1-3")
+
+    Additional Career Insights:
+    - Internships: 2 specific "Dream Internships" or types of roles to hunt for.
+    - Career Outlook:
+        - Salary Journey: Entry-level to Senior potential (in INR or USD as appropriate).
+        - Top 3 Companies: Famous places that hire this role.
+        - Future Scope: Why this career is a "Safe Bet" or "High Growth" path for the next decade.
+
+    OUTPUT FORMAT (VALID JSON ONLY):
+    {{
+      "career_title": "{career_title}",
+      "path_steps": [
+        {{ 
+          "step": 1, 
+          "action": "...", 
+          "description": "...", 
+          "skills": ["...", "...", "..."],
+          "courses": [
+            {{ "name": "...", "url": "..." }},
+            {{ "name": "...", "url": "..." }}
+          ],
+          "project": "...",
+          "timeline": "...",
+          "completed": false
+        }},
+        ... (Total 6)
+      ],
+      "internships": ["...", "..."],
+      "career_outlook": {{
+        "salary_range": "...",
+        "top_companies": ["...", "...", "..."],
+        "future_scope": "..."
+      }},
+      "reminders": [
+        {{ "milestone": "...", "reminder": "..." }},
+        ...
+      ]
+    }}
+    """)
+
+ROADMAP_SKELETON_PROMPT = prompt_registry.register("roadmap_skeleton", version=2, ttl=30 * 86400, template="""
+    You are an expert 'Student Success Architect' and Career Mentor.
+
+    Student Profile:
+    - Current Stage: {current_class} (Handle this as the starting point)
+    - Archetype: {archetype} (Influences the learning style and interaction)
+    - Goal Career: {career_title}
+
+    TASK:
+    Outline a "Zero-to-Hero" Career Roadmap of exactly 6 Milestone Steps. The journey MUST start from absolute BASICS and evolve into PROFESSIONAL/PRO level:
+    - Step 1-2: Foundations (The "Basics" - Learning, early exploration, building mindset).
+    - Step 3-4: Intermediate (Core skill building, first real projects, networking).
+    - Step 5-6: Professional (Specialization, portfolio polishing, high-level internships, job readiness).
+
+    Only name each step (catchy & motivating), give its focus in one line and a realistic timeline.
+    The details of every step are written separately.
+
+    OUTPUT FORMAT (VALID JSON ONLY):
+    {{
+      "career_title": "{career_title}",
+      "path_steps": [
+        {{ "step": 1, "action": "...", "focus": "...", "timeline": "Months 1-3" }},
+        ... (Total 6)
+      ]
+    }}
+    """)
+
+ROADMAP_STEP_PROMPT = prompt_registry.register("roadmap_step", version=2, ttl=30 * 86400, template="""
+    You are an expert 'Student Success Architect' and Career Mentor, writing ONE milestone of a
+    6-step "Zero-to-Hero" Career Roadmap towards becoming a {career_title}.
+
+    Student Profile:
+    - Current Stage: {current_class}
+    - Archetype: {archetype}
+
+    Roadmap outline:
+    {outline}
+
+    Write Step {step}: "{action}" (Focus: {focus}; Timeline: {timeline}).
+
+    Tone: Student-friendly, encouraging, and visionary. Use "We" and "You" to make it feel like a partnership.
+
+    Include:
+    1. Description (Explain WHY this step matters for a {archetype} at this stage - 3 sentences)
+    2. Skills to acquire (3 specific skills relevant to {career_title})
+    3. Resources (MUST provide 2 specific, HIGHLY ACCURATE resources. EACH resource MUST be an object with a "name" and a functional "url". PRIORITIZE DIRECT LINKS to the **most viewed/popular** YouTube videos or verified courses (Coursera, Udemy, Official Docs). Plain text without URLs is FORBIDDEN.)
+    4. Student Project (1 "cool" project name and brief description that a student would enjoy building)
+
+    OUTPUT FORMAT (VALID JSON ONLY):
+    {{
+      "description": "...",
+      "skills": ["...", "...", "..."],
+      "courses": [
+        {{ "name": "...", "url": "..." }},
+        {{ "name": "...", "url": "..." }}
+      ],
+      "project": "..."
+    }}
+    """)
+
+ROADMAP_INSIGHTS_PROMPT = prompt_registry.register("roadmap_insights", version=2, ttl=30 * 86400, template="""
+    You are an expert Career Mentor. A {current_class} student ({archetype}) is following
+    this 6-step roadmap towards becoming a {career_title}:
+    {outline}
+
+    Provide:
+    - Internships: 2 specific "Dream Internships" or types of roles to hunt for.
+    - Career Outlook:
+        - Salary Journey: Entry-level to Senior potential (in INR or USD as appropriate).
+        - Top 3 Companies: Famous places that hire this role.
+        - Future Scope: Why this career is a "Safe Bet" or "High Growth" path for the next decade.
+    - Reminders: one short, motivating reminder per milestone.
+
+    OUTPUT FORMAT (VALID JSON ONLY):
+    {{
+      "internships": ["...", "..."],
+      "career_outlook": {{
+        "salary_range": "...",
+        "top_companies": ["...", "...", "..."],
+        "future_scope": "..."
+      }},
+      "reminders": [
+        {{ "milestone": "...", "reminder": "..." }},
+        ...
+      ]
+    }}
+    """)
+
+ROADMAP_OVERLAY_PROMPT = prompt_registry.register("roadmap_overlay", version=1, ttl=7 * 86400, template="""
+    You are a warm Career Mentor personalising a shared "{career_title}" roadmap for one student.
+
+    Student Profile:
+    - Current Stage: {current_class}
+    - Archetype: {archetype}
+    - Personality: {personality}
+    - Deep Analysis Context: {phase3_insight}
+    - Recommendation Engine Notes: {final_insight}
+
+    Roadmap steps:
+    {outline}
+
+    For EACH step, write ONE sentence (max 30 words) telling this student, in the "You" voice,
+    how the step plays to their personality and what they revealed in the assessment.
+
+    OUTPUT FORMAT (VALID JSON ONLY):
+    {{ "step_notes": ["...", "...", "...", "...", "...", "..."] }}
+    """)
+
+
+def _parse_object(text: str) -> dict:
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    return data
+
+
+def _parse_roadmap(text: str) -> dict:
+    """A roadmap or skeleton answer with exactly ROADMAP_STEPS steps; raises otherwise."""
+    data = _parse_object(text)
+    steps = data.get("path_steps")
+    if not isinstance(steps, list) or len(steps) != ROADMAP_STEPS:
+        raise ValueError(f"Roadmap has {len(steps) if isinstance(steps, list) else 0} steps instead of {ROADMAP_STEPS}")
+    if not all(isinstance(step, dict) for step in steps):
+        raise ValueError("Roadmap steps must be objects")
+    return data
+
+
+def _outline(steps) -> str:
+    return "\n".join(f"Step {s.get('step', n)}: {s.get('action', '')} ({s.get('timeline', '')})"
+                      for n, s in enumerate(steps, 1))
+
+
+async def build_single(profile: dict, complete=None) -> dict:
+    """The whole roadmap from one `career_path` call."""
+    complete = complete or llm_gateway.complete
+    # The answer is shared for 30 days: a malformed one must never reach the cache
+    prompt = CAREER_PATH_PROMPT.render(**{k: profile[k] for k in BASE_KEYS})
+    try:
+        return _parse_roadmap(await complete(prompt, validate=_parse_roadmap))
+    except ValueError as e:
+        # A malformed answer (JSON errors are ValueErrors too) is worth one more try
+        print(f"Roadmap answer rejected ({e}); asking again")
+        return _parse_roadmap(await complete(prompt, use_cache=False, validate=_parse_roadmap))
+
+
+async def build_fanout(profile: dict, complete=None, concurrency: int = None, progress=None) -> dict:
+    """Skeleton first, then every step's details and the insights concurrently."""
+    complete = complete or llm_gateway.complete
+    base = {k: profile[k] for k in BASE_KEYS}
+    skeleton = _parse_roadmap(await complete(ROADMAP_SKELETON_PROMPT.render(**base), validate=_parse_roadmap))
+    steps = skeleton["path_steps"]
+    if progress:
+        await progress(f"Detailing {len(steps)} milestones")
+
+    outline = _outline(steps)
+    limit = asyncio.Semaphore(concurrency or ROADMAP_FANOUT_CONCURRENCY)
+
+    async def bounded(prompt):
+        async with limit:
+            return _parse_object(await complete(prompt, validate=_parse_object))
+
+    calls = [
+        bounded(ROADMAP_STEP_PROMPT.render(
+            **base, outline=outline, step=s.get("step", n), action=s.get("action", ""),
+            focus=s.get("focus", ""), timeline=s.get("timeline", ""),
+        ))
+        for n, s in enumerate(steps, 1)
+    ]
+    calls.append(bounded(ROADMAP_INSIGHTS_PROMPT.render(**base, outline=outline)))
+    *details, insights = await asyncio.gather(*calls)
+
+    path_steps = []
+    for n, (s, detail) in enumerate(zip(steps, details), 1):
+        path_steps.append({
+            "step": s.get("step", n),
+            "action": s.get("action", ""),
+            "description": detail.get("description", s.get("focus", "")),
+            "skills": detail.get("skills", []),
+            "courses": detail.get("courses", []),
+            "project": detail.get("project", ""),
+            "timeline": s.get("timeline", ""),
+            "completed": False,
+        })
+    return {
+        "career_title": skeleton.get("career_title", profile["career_title"]),
+        "path_steps": path_steps,
+        "internships": insights.get("internships", []),
+        "career_outlook": insights.get("career_outlook", {}),
+        "reminders": insights.get("reminders", []),
+    }
+
+
+async def build_base(profile: dict, progress=None) -> dict:
+    """The shared roadmap for the profile's (career_title, current_class, archetype)."""
+    if ROADMAP_FANOUT:
+        try:
+            return await build_fanout(profile, progress=progress)
+        except Exception as e:
+            print(f"Roadmap fan-out failed ({e}); using the single-call prompt")
+    return await build_single(profile)
+
+
+async def personalize(roadmap: dict, profile: dict, complete=None) -> dict:
+    """Appends the student's overlay note to each step description (in place); returns the roadmap."""
+    complete = complete or llm_gateway.complete
+    steps = roadmap.get("path_steps") or []
+    if not steps:
+        return roadmap
+    prompt = ROADMAP_OVERLAY_PROMPT.render(**profile, outline=_outline(steps))
+    overlay = _parse_object(await complete(prompt, validate=_parse_object))
+    for step, note in zip(steps, overlay.get("step_notes") or []):
+        if isinstance(note, str) and note.strip():
+            step["description"] = f"{step.get('description', '').rstrip()} {note.strip()}".strip()
+    _stats["personalized"] += 1
+    return roadmap
+
+
+async def build(profile: dict, progress=None) -> dict:
+    """Shared base roadmap plus the student's personalization overlay."""
+    roadmap = await build_base(profile, progress=progress)
+    if progress:
+        await progress("Personalising your roadmap")
+    try:
+        await personalize(roadmap, profile)
+    except Exception as e:
+        # The shared roadmap is still a complete answer
+        _stats["overlay_failures"] += 1
+        print(f"Roadmap personalization failed ({e}); serving the shared roadmap")
+    return roadmap
+
+
+def stats() -> dict:
+    return {"fanout": ROADMAP_FANOUT, **_stats}
@@ -0,0 +1,177 @@
+"""
+Class 10 Stream Scoring
+=======================
+The rule-based Class 10 stream scoring compiled into a NumPy weight matrix.
+
+Every (question, option) pair of the scored sections and every Phase 2 category is
+one feature column; `WEIGHTS[feature, stream]` holds the points that answer earns:
+
+- Section A: +2 to each mapped stream for the correct option
+- Sections B-D: +1 to the option's stream (options without one use the keyword
+  heuristic, resolved once here instead of on every submission)
+- Phase 2 category: +3 to its two affinity streams
+
+A submission is then one-hot encoded and scored with a single matrix product:
+
+    scores = stream_scorer.score(answers, result.phase_2_category)    # {"PCM": 15, ...}
+    stream_scorer.winner(scores)                                      # "Science (PCM)"
+
+`rescore_all(db)` re-applies the current weights to every stored Class 10
+submission in batches (one product per batch) and writes the changed rows back
+with bulk updates; run it after editing question weights.
+"""
+
+import hashlib
+
+import numpy as np
+
+from .. import models
+from .question_bank import question_bank
+
+STREAMS = ("PCM", "PCB", "COMM", "ARTS", "VOC")
+
+STREAM_NAMES = {
+    "PCM": "Science (PCM)",
+    "PCB": "Science (PCB)",
+    "COMM": "Commerce",
+    "ARTS": "Arts & Humanities",
+    "VOC": "Vocational Studies",
+}
+
+SECTION_A_POINTS = 2
+PREFERENCE_POINTS = 1
+CATEGORY_POINTS = 3
+
+CATEGORY_STREAMS = {
+    "Focused Specialist": ("PCM", "PCB"),
+    "Quiet Explorer": ("PCB", "ARTS"),
+    "Visionary Leader": ("COMM", "ARTS"),
+    "Strategic Builder": ("PCM", "COMM"),
+    "Adaptive Explorer": ("ARTS", "VOC"),
+    "Dynamic Generalist": ("COMM", "VOC"),
+}
+
+# Fallback for preference options without an explicit stream
+_BIO_KEYWORDS = ("plant", "health", "bio", "nutri", "species", "cures")
+_LETTER_STREAMS = {"b": "COMM", "c": "ARTS", "d": "VOC"}
+
+
+def _heuristic_stream(question, option):
+    if option.value == "a":
+        text = f"{question.text} {option.text}".lower()
+        return "PCB" if any(k in text for k in _BIO_KEYWORDS) else "PCM"
+    return _LETTER_STREAMS.get(option.value)
+
+
+class StreamScorer:
+    def __init__(self, bank=question_bank):
+        self.streams = STREAMS
+        self._stream_col = {s: i for i, s in enumerate(STREAMS)}
+        self.features = {}  # (question_id, option_value) or ("category", name) -> row of WEIGHTS
+        rows = []
+
+        def add_feature(key, streams, points):
+            weights = np.zeros(len(STREAMS), dtype=np.int32)
+            for s in streams:
+                if s in self._stream_col:
+                    weights[self._stream_col[s]] += points
+            self.features[key] = len(rows)
+            rows.append(weights)
+
+        for q in bank.section_a:
+            add_feature((q.id, q.correct_value), q.mapped_streams, SECTION_A_POINTS)
+        for q in bank.preference:
+            for o in q.options:
+                stream = q.stream_for(o.value) or _heuristic_stream(q, o)
+                add_feature((q.id, o.value), [stream] if stream else [], PREFERENCE_POINTS)
+        for category, streams in CATEGORY_STREAMS.items():
+            add_feature(("category", category), streams, CATEGORY_POINTS)
+
+        self.weights = np.vstack(rows) if rows else np.zeros((0, len(STREAMS)), dtype=np.int32)
+        self.weights.setflags(write=False)
+        # Changes whenever a question's options, streams or points change
+        self.version = hashlib.sha256(
+            repr(sorted(self.features.items())).encode("utf-8") + self.weights.tobytes()
+        ).hexdigest()[:12]
+
+    def encode(self, answers: dict, category: str = None, out=None) -> np.ndarray:
+        """One-hot feature vector for a submission (answers that earn no points are ignored)."""
+        x = out if out is not None else np.zeros(len(self.features), dtype=np.int32)
+        for qid, value in (answers or {}).items():
+            col = self.features.get((qid, value))
+            if col is not None:
+                x[col] = 1
+        if category:
+            col = self.features.get(("category", category))
+            if col is not None:
+                x[col] = 1
+        return x
+
+    def _as_dict(self, row) -> dict:
+        return {s: int(v) for s, v in zip(STREAMS, row)}
+
+    def score(self, answers: dict, category: str = None) -> dict:
+        """Stream scores for one submission: a single vector-matrix product."""
+        return self._as_dict(self.encode(answers, category) @ self.weights)
+
+    def score_many(self, submissions) -> np.ndarray:
+        """(n, streams) score matrix for a list of (answers, category) pairs."""
+        X = np.zeros((len(submissions), len(self.features)), dtype=np.int32)
+        for i, (answers, category) in enumerate(submissions):
+            self.encode(answers, category, out=X[i])
+        return X @ self.weights
+
+    def winner(self, scores: dict) -> str:
+        """Display name of the top stream; ties go to the earlier stream in STREAMS."""
+        code = max(STREAMS, key=lambda s: scores.get(s, 0))
+        return STREAM_NAMES.get(code, code)
+
+    def rescore_all(self, db, batch_size: int = 500, dry_run: bool = False) -> dict:
+        """
+        Recomputes `stream_scores` / `recommended_stream` for every stored Class 10
+        submission and bulk-updates the rows whose result changed.
+        Class 12 / above submissions (empty `stream_scores`) are left alone.
+        """
+        summary = {"weights_version": self.version, "scanned": 0, "rescored": 0, "changed": 0, "winner_changed": 0}
+        query = (
+            db.query(models.AssessmentResult.id, models.AssessmentResult.final_answers,
+                     models.AssessmentResult.phase_2_category, models.AssessmentResult.stream_scores,
+                     models.AssessmentResult.recommended_stream)
+            .filter(models.AssessmentResult.final_answers.isnot(None))
+            .order_by(models.AssessmentResult.id)
+        )
+
+        last_id = 0
+        while True:
+            # Keyset pagination: the bulk updates below never shift the next page
+            rows = query.filter(models.AssessmentResult.id > last_id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            summary["scanned"] += len(rows)
+
+            rows = [r for r in rows if r.stream_scores]
+            if not rows:
+                continue
+            matrix = self.score_many([(r.final_answers, r.phase_2_category) for r in rows])
+            updates = []
+            for row, new_row in zip(rows, matrix):
+                scores = self._as_dict(new_row)
+                winner = self.winner(scores)
+                if scores != row.stream_scores or winner != row.recommended_stream:
+                    updates.append({"id": row.id, "stream_scores": scores, "recommended_stream": winner})
+                    if winner != row.recommended_stream:
+                        summary["winner_changed"] += 1
+            summary["rescored"] += len(rows)
+            summary["changed"] += len(updates)
+            if updates and not dry_run:
+                db.bulk_update_mappings(models.AssessmentResult, updates)
+                db.commit()
+        return summary
+
+    def stats(self) -> dict:
+        return {"features": len(self.features), "streams": len(STREAMS), "weights_version": self.version}
+
+
+# Global instance
+stream_scorer = StreamScorer()
@@ -0,0 +1,74 @@
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: every pattern is found in one left-to-right pass over
+    the text, however many patterns there are. Build once, match many times.
+
+        matcher = AhoCorasick({"shut up": "insult", "idiot": "insult"})
+        matcher.find_all("oh shut up, idiot")   # [(3, "shut up", "insult"), (12, "idiot", "insult")]
+
+    With `whole_words` (default) a match only counts when it is not part of a
+    longer word, so "class" does not match "ass".
+    """
+
+    def __init__(self, patterns: dict, whole_words: bool = True):
+        self.whole_words = whole_words
+        self._goto = [{}]     # state -> {char: next state}
+        self._fail = [0]
+        self._out = [()]      # state -> ((pattern, value), ...) ending here
+
+        for pattern, value in patterns.items():
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += ((pattern, value),)
+
+        # Breadth-first, so every failure link points at an already finished state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def __len__(self):
+        return len(self._goto)
+
+    def _iter(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern, value in out[state]:
+                start = i - len(pattern) + 1
+                if self.whole_words and not (
+                    (start == 0 or not text[start - 1].isalnum())
+                    and (i + 1 == len(text) or not text[i + 1].isalnum())
+                ):
+                    continue
+                yield start, pattern, value
+
+    def find_all(self, text: str) -> list:
+        """Every (start, pattern, value) occurrence in the text."""
+        return list(self._iter(text))
+
+    def search(self, text: str):
+        """The first occurrence (by end position), or None."""
+        return next(self._iter(text), None)
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from collections import deque
+
+
+class HedgeTracker:
+    """
+    Tracks primary-provider latencies and hedge outcomes to derive the hedge delay.
+    The delay is the p-th percentile of recent primary latencies, scaled up when the
+    primary keeps winning hedged races (hedge fired too early) and down when the
+    secondary keeps winning (primary is slow).
+    """
+    def __init__(self, window: int = 200, quantile: float = 0.95, default_delay: float = 4.0,
+                 min_delay: float = 0.5, max_delay: float = 15.0):
+        self.latencies = deque(maxlen=window)
+        self.quantile = quantile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.scale = 1.0
+        self.wins = {}
+        self.hedges_fired = 0
+
+    def record_latency(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def record_win(self, provider: str, hedged: bool, primary: str):
+        self.wins[provider] = self.wins.get(provider, 0) + 1
+        if not hedged:
+            return
+        if provider == primary:
+            self.scale = min(self.scale * 1.05, 2.0)
+        else:
+            self.scale = max(self.scale * 0.95, 0.5)
+
+    def delay(self) -> float:
+        """Seconds to wait for the primary before firing the secondary."""
+        if len(self.latencies) < 10:
+            base = self.default_delay
+        else:
+            ordered = sorted(self.latencies)
+            base = ordered[min(int(len(ordered) * self.quantile), len(ordered) - 1)]
+        return max(self.min_delay, min(base * self.scale, self.max_delay))
+
+    def stats(self) -> dict:
+        return {
+            "delay_seconds": round(self.delay(), 3),
+            "scale": round(self.scale, 3),
+            "samples": len(self.latencies),
+            "hedges_fired": self.hedges_fired,
+            "wins": dict(self.wins),
+        }
+
+
+async def hedged_call(primary, secondary, tracker: HedgeTracker, primary_name: str = "primary",
+                      secondary_name: str = "secondary"):
+    """
+    Runs `primary()`; if it has not finished after `tracker.delay()` seconds, also runs
+    `secondary()` and returns whichever succeeds first, cancelling the other.
+    A primary that fails fast falls straight through to the secondary.
+    Returns (result, winner_name).
+    """
+    started = time.monotonic()
+    primary_task = asyncio.ensure_future(primary())
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=tracker.delay())
+    except asyncio.CancelledError:
+        primary_task.cancel()
+        raise
+
+    if done:
+        if primary_task.exception() is None:
+            tracker.record_latency(time.monotonic() - started)
+            tracker.record_win(primary_name, hedged=False, primary=primary_name)
+            return primary_task.result(), primary_name
+        primary_error = primary_task.exception()
+        try:
+            result = await secondary()
+        except Exception as secondary_error:
+            raise Exception(f"Dual API Failure. {primary_name}: {primary_error}, {secondary_name}: {secondary_error}")
+        tracker.record_win(secondary_name, hedged=False, primary=primary_name)
+        return result, secondary_name
+
+    tracker.hedges_fired += 1
+    secondary_task = asyncio.ensure_future(secondary())
+    names = {primary_task: primary_name, secondary_task: secondary_name}
+    pending = {primary_task, secondary_task}
+    errors = {}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = names[task]
+                    # When the secondary wins, the primary's elapsed time is a lower bound on its
+                    # latency; leaving it out would bias the percentile towards fast calls
+                    tracker.record_latency(time.monotonic() - started)
+                    tracker.record_win(winner, hedged=True, primary=primary_name)
+                    return task.result(), winner
+                errors[names[task]] = task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise Exception(f"Dual API Failure. {primary_name}: {errors.get(primary_name)}, {secondary_name}: {errors.get(secondary_name)}")
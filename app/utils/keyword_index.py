@@ -0,0 +1,112 @@
+import math
+import re
+from collections import defaultdict
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {"a", "an", "and", "at", "for", "in", "of", "on", "or", "the", "to", "with", "senior", "junior", "lead"}
+
+# Job nouns shared by many titles say little about the field, so they count for less than domain words
+ROLE_WORDS = {"engineer", "developer", "analyst", "manager", "designer", "researcher", "architect",
+              "scientist", "specialist", "consultant", "officer", "associate", "expert"}
+
+# Abbreviations expanded before matching ("NLP Engineer" -> natural language processing engineer)
+ALIASES = {
+    "ai": ["artificial", "intelligence"],
+    "ml": ["machine", "learning"],
+    "nlp": ["natural", "language", "processing"],
+    "cv": ["computer", "vision"],
+    "ux": ["user", "experience"],
+    "ui": ["user", "interface"],
+    "pm": ["product", "management"],
+    "sde": ["software", "engineering"],
+    "swe": ["software", "engineering"],
+    "gcp": ["google", "cloud"],
+    "infosec": ["information", "security"],
+    "web3": ["blockchain"],
+}
+
+TITLE_WEIGHT = 3.0
+ROLE_WEIGHT = 0.5
+KEYWORD_WEIGHT = 1.0
+
+
+def _stem(token: str) -> str:
+    # Plurals collapse onto the singular: "contracts" -> "contract", "technologies" -> "technology"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list:
+    """Lower-cased, alias-expanded, lightly stemmed word tokens without stopwords."""
+    tokens = []
+    for raw in _TOKEN_RE.findall((text or "").lower()):
+        if raw in STOPWORDS:
+            continue
+        for token in ALIASES.get(raw, [raw]):
+            tokens.append(_stem(token))
+    return tokens
+
+
+class KeywordIndex:
+    """
+    Token-level inverted index from words to careers, built once from a
+    {career title: [keyword phrases]} mapping. `resolve(title)` scores every
+    career sharing a token with the title (IDF-weighted, title words counting
+    more than keyword words) and returns the best one above `min_score`.
+    Results are memoized per title.
+    """
+
+    def __init__(self, entries: dict, min_score: float = 2.0, memo_size: int = 4096):
+        self.entries = entries
+        self.min_score = min_score
+        self.memo_size = memo_size
+        self._memo = {}
+
+        weights = defaultdict(dict)  # token -> {career: weight}
+        for career, keywords in entries.items():
+            for token in tokenize(career):
+                weight = ROLE_WEIGHT if token in ROLE_WORDS else TITLE_WEIGHT
+                weights[token][career] = max(weights[token].get(career, 0.0), weight)
+            for phrase in keywords:
+                for token in tokenize(phrase):
+                    weights[token][career] = max(weights[token].get(career, 0.0), KEYWORD_WEIGHT)
+
+        total = len(entries)
+        # Posting lists carry the IDF-scaled weight, so scoring is a sum over the title's tokens
+        self.postings = {
+            token: tuple((career, weight * math.log(1 + total / len(careers))) for career, weight in careers.items())
+            for token, careers in weights.items()
+        }
+
+    def scores(self, title: str) -> dict:
+        totals = defaultdict(float)
+        for token in set(tokenize(title)):
+            for career, weight in self.postings.get(token, ()):
+                totals[career] += weight
+        return dict(totals)
+
+    def resolve(self, title: str):
+        """Best matching career for a free-form title, or None when nothing scores above min_score."""
+        key = " ".join((title or "").split()).lower()
+        if key in self._memo:
+            return self._memo[key]
+        if title in self.entries:
+            career = title
+        else:
+            totals = self.scores(title)
+            # Ties go to the career listed first
+            best = max(self.entries, key=lambda c: totals.get(c, 0.0)) if totals else None
+            career = best if best is not None and totals.get(best, 0.0) >= self.min_score else None
+        if len(self._memo) >= self.memo_size:
+            self._memo.clear()
+        self._memo[key] = career
+        return career
+
+    def keywords_for(self, title: str) -> list:
+        """Keyword set of the best matching career, or the title itself when none matches."""
+        career = self.resolve(title)
+        return list(self.entries[career]) if career else [title]
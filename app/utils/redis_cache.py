@@ -1,51 +1,272 @@
-import redis
+import redis.asyncio as aioredis
 import hashlib
 import json
 import os
+import time
+import uuid
 from dotenv import load_dotenv
+from .memory_cache import MemoryLRUCache
 
 load_dotenv()
 
 class RedisCache:
     """
-    A simple Redis cache utility for AI responses.
+    An asyncio Redis cache utility for AI responses.
+    All round trips go through a shared connection pool and are awaited,
+    so a slow Redis never blocks the event loop.
     """
-    def __init__(self):
+    def __init__(self, prefix: str = "ai_cache"):
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+        self.prefix = prefix
+        # After a failure, skip Redis for this many seconds instead of paying a timeout per request
+        self.retry_after = float(os.getenv("REDIS_RETRY_AFTER", "30"))
+        self._down_until = 0.0
         try:
-            self.client = redis.from_url(self.redis_url, decode_responses=True)
-            self.client.ping()
+            self.pool = aioredis.ConnectionPool.from_url(
+                self.redis_url,
+                decode_responses=True,
+                max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "20")),
+                socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5")),
+                socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5")),
+            )
+            self.client = aioredis.Redis(connection_pool=self.pool)
             self.is_available = True
         except Exception as e:
-            print(f"REDIS ERROR: Connection failed. {e}")
+            print(f"REDIS ERROR: Invalid configuration. {e}")
+            self.pool = None
+            self.client = None
             self.is_available = False
 
+    async def connect(self):
+        """Pings Redis once (called on app startup) so an unreachable server is skipped early."""
+        if not self.client:
+            return
+        try:
+            await self.client.ping()
+            self.is_available = True
+            self._down_until = 0.0
+        except Exception as e:
+            print(f"REDIS ERROR: Connection failed. {e}")
+            self._mark_down()
+
+    async def close(self):
+        """Releases pooled connections (called on app shutdown)."""
+        if self.pool:
+            await self.pool.disconnect()
+
+    def _mark_down(self):
+        self._down_until = time.monotonic() + self.retry_after
+
+    def _usable(self) -> bool:
+        return self.is_available and self.client is not None and time.monotonic() >= self._down_until
+
     def _get_hash(self, text: str) -> str:
         """Generates a SHA-256 hash of the input text."""
         return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
-    def get(self, prompt: str) -> str:
+    def _key(self, prompt: str) -> str:
+        # Prompts rendered from a registered template carry a structured (template, version, params) key
+        structured = getattr(prompt, "cache_key", None)
+        if structured:
+            return f"{self.prefix}:tpl:{structured}"
+        return f"{self.prefix}:{self._get_hash(prompt)}"
+
+    async def get(self, prompt: str) -> str:
         """Retrieves cached content for a prompt."""
-        if not self.is_available:
+        if not self._usable():
             return None
-        
+
         try:
-            key = f"ai_cache:{self._get_hash(prompt)}"
-            return self.client.get(key)
+            return await self.client.get(self._key(prompt))
         except Exception as e:
             print(f"REDIS GET ERROR: {e}")
+            self._mark_down()
             return None
 
-    def set(self, prompt: str, response: str, ttl: int = 86400):
+    async def set(self, prompt: str, response: str, ttl: int = 86400):
         """Caches a response for a prompt (default TTL 24h)."""
-        if not self.is_available:
+        if not self._usable():
             return
-        
+
         try:
-            key = f"ai_cache:{self._get_hash(prompt)}"
-            self.client.setex(key, ttl, response)
+            await self.client.setex(self._key(prompt), ttl, response)
         except Exception as e:
             print(f"REDIS SET ERROR: {e}")
+            self._mark_down()
+
+    async def get_many(self, prompts: list) -> dict:
+        """Retrieves cached content for several prompts in one round trip. Misses are omitted."""
+        if not prompts or not self._usable():
+            return {}
+
+        try:
+            values = await self.client.mget([self._key(p) for p in prompts])
+            return {p: v for p, v in zip(prompts, values) if v is not None}
+        except Exception as e:
+            print(f"REDIS MGET ERROR: {e}")
+            self._mark_down()
+            return {}
+
+    async def set_many(self, items: dict, ttl: int = 86400):
+        """Caches several prompt -> response pairs in one pipelined round trip."""
+        if not items or not self._usable():
+            return
+
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for prompt, response in items.items():
+                    pipe.setex(self._key(prompt), ttl, response)
+                await pipe.execute()
+        except Exception as e:
+            print(f"REDIS MSET ERROR: {e}")
+            self._mark_down()
+
+    async def invalidate_prefix(self, key_prefix: str) -> int:
+        """Deletes every template-keyed entry starting with `key_prefix` (e.g. "phase2_archetype:v1:")."""
+        if not self._usable():
+            return 0
+        deleted = 0
+        try:
+            batch = []
+            async for key in self.client.scan_iter(match=f"{self.prefix}:tpl:{key_prefix}*", count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted += await self.client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await self.client.unlink(*batch)
+        except Exception as e:
+            print(f"REDIS INVALIDATE ERROR: {e}")
+        return deleted
+
+    async def acquire_lock(self, name: str, ttl_ms: int):
+        """
+        Best-effort distributed lock (SET NX PX).
+        Returns a token if the lock was taken (or Redis is unavailable), None if another worker holds it.
+        """
+        token = uuid.uuid4().hex
+        if not self._usable():
+            return token
+        try:
+            acquired = await self.client.set(f"lock:{name}", token, nx=True, px=ttl_ms)
+            return token if acquired else None
+        except Exception as e:
+            print(f"REDIS LOCK ERROR: {e}")
+            self._mark_down()
+            return token
+
+    async def release_lock(self, name: str, token: str):
+        """Releases the lock only if it is still ours."""
+        if not self._usable():
+            return
+        try:
+            await self.client.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{name}", token)
+        except Exception as e:
+            print(f"REDIS UNLOCK ERROR: {e}")
+
+    async def is_locked(self, name: str) -> bool:
+        if not self._usable():
+            return False
+        try:
+            return bool(await self.client.exists(f"lock:{name}"))
+        except Exception:
+            return False
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+class TieredCache:
+    """
+    Two-tier cache: an in-process LRU in front of Redis.
+    Reads check memory first and fall through to Redis on a miss (filling memory on the way back);
+    writes go to both tiers. Redis is only needed to share entries across workers.
+    """
+    def __init__(self, memory: MemoryLRUCache, remote: RedisCache, memory_ttl: int = 600):
+        self.memory = memory
+        self.remote = remote
+        # Memory entries live shorter than Redis ones so workers converge after a Redis update
+        self.memory_ttl = memory_ttl
+
+    @property
+    def is_available(self) -> bool:
+        return self.remote.is_available
+
+    async def connect(self):
+        await self.remote.connect()
+
+    async def close(self):
+        await self.remote.close()
+
+    def _key(self, prompt: str) -> str:
+        return self.remote._key(prompt)
+
+    def key_for(self, prompt: str) -> str:
+        """Public cache key for a prompt, used to coalesce identical in-flight requests."""
+        return self._key(prompt)
+
+    async def invalidate_prefix(self, key_prefix: str) -> int:
+        """Drops a whole template version from both tiers; returns the number of Redis keys removed."""
+        self.memory.delete_prefix(f"{self.remote.prefix}:tpl:{key_prefix}")
+        return await self.remote.invalidate_prefix(key_prefix)
+
+    async def acquire_lock(self, name: str, ttl_ms: int):
+        return await self.remote.acquire_lock(name, ttl_ms)
+
+    async def release_lock(self, name: str, token: str):
+        await self.remote.release_lock(name, token)
+
+    async def is_locked(self, name: str) -> bool:
+        return await self.remote.is_locked(name)
+
+    async def get(self, prompt: str) -> str:
+        key = self._key(prompt)
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        value = await self.remote.get(prompt)
+        if value is not None:
+            self.memory.set(key, value, ttl=self.memory_ttl)
+        return value
+
+    async def set(self, prompt: str, response: str, ttl: int = 86400):
+        self.memory.set(self._key(prompt), response, ttl=min(ttl, self.memory_ttl))
+        await self.remote.set(prompt, response, ttl)
+
+    async def get_many(self, prompts: list) -> dict:
+        found = {}
+        missing = []
+        for prompt in prompts:
+            value = self.memory.get(self._key(prompt))
+            if value is not None:
+                found[prompt] = value
+            else:
+                missing.append(prompt)
+
+        remote_found = await self.remote.get_many(missing)
+        for prompt, value in remote_found.items():
+            self.memory.set(self._key(prompt), value, ttl=self.memory_ttl)
+        found.update(remote_found)
+        return found
+
+    async def set_many(self, items: dict, ttl: int = 86400):
+        for prompt, response in items.items():
+            self.memory.set(self._key(prompt), response, ttl=min(ttl, self.memory_ttl))
+        await self.remote.set_many(items, ttl)
+
+    def stats(self) -> dict:
+        return {"memory": self.memory.stats(), "redis_available": self.remote._usable()}
 
 # Global instance
-ai_cache = RedisCache()
+ai_cache = TieredCache(
+    MemoryLRUCache(
+        max_items=int(os.getenv("AI_CACHE_MAX_ITEMS", "2048")),
+        max_bytes=int(os.getenv("AI_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ),
+    RedisCache(),
+    memory_ttl=int(os.getenv("AI_CACHE_MEMORY_TTL", "600")),
+)
@@ -1,7 +1,61 @@
 
 import urllib.parse
 
+from ..data.career_keywords import career_keywords
+from ..services.prompt_registry import prompt_registry
+from .keyword_index import KeywordIndex
+
+# Resolves free-form (often AI-generated) career titles to the closest known keyword set
+keyword_index = KeywordIndex(career_keywords)
+
+AI_RESOURCES_PROMPT = prompt_registry.register("ai_resources", version=1, ttl=30 * 86400, template="""
+    Act as an elite career counselor and resource curator. 
+    For the career path "{career_title}", suggest 4 highly specific, high-quality learning resources.
+    These could be specific online courses, seminal papers, influential books, or specialized documentation.
+
+    Provide the response STRICTLY in JSON format with this structure:
+    {{
+        "resources": [
+            {{
+                "title": "Resource Name",
+                "description": "Short description of what makes it great",
+                "link": "Direct link or search link",
+                "type": "Course/Paper/Book/Docs"
+            }},
+            ...
+        ]
+    }}
+    """)
+
+
 class ResourceAggregator:
+    # Search links per resolved career (unmatched titles are keyed by their own text)
+    _links = {}
+
+    @staticmethod
+    def resolve_keywords(career_title):
+        """Keyword set of the closest known career, or [career_title] when none matches."""
+        return keyword_index.keywords_for(career_title)
+
+    @staticmethod
+    def links_for(career_title):
+        """The four library search links for a career title, built once per resolved career."""
+        career = keyword_index.resolve(career_title)
+        key = career or " ".join((career_title or "").split()).lower()
+        links = ResourceAggregator._links.get(key)
+        if links is None:
+            keywords = list(career_keywords[career]) if career else [career_title]
+            links = {
+                "ndli": ResourceAggregator.get_ndli_link(keywords),
+                "arxiv": ResourceAggregator.get_arxiv_link(keywords),
+                "youtube": ResourceAggregator.get_youtube_link(keywords),
+                "scholar": ResourceAggregator.get_google_scholar_link(keywords),
+            }
+            if len(ResourceAggregator._links) >= keyword_index.memo_size:
+                ResourceAggregator._links.clear()
+            ResourceAggregator._links[key] = links
+        return dict(links)
+
     @staticmethod
     def get_ndli_link(keywords):
         """Generates a search link for National Digital Library of India."""
@@ -34,24 +88,7 @@ class ResourceAggregator:
     @staticmethod
     async def get_ai_recommendations(career_title, generate_content_func):
         """Uses AI (Groq/Gemini) to suggest specific high-quality resources."""
-        prompt = f"""
-        Act as an elite career counselor and resource curator. 
-        For the career path "{career_title}", suggest 4 highly specific, high-quality learning resources.
-        These could be specific online courses, seminal papers, influential books, or specialized documentation.
-
-        Provide the response STRICTLY in JSON format with this structure:
-        {{
-            "resources": [
-                {{
-                    "title": "Resource Name",
-                    "description": "Short description of what makes it great",
-                    "link": "Direct link or search link",
-                    "type": "Course/Paper/Book/Docs"
-                }},
-                ...
-            ]
-        }}
-        """
+        prompt = AI_RESOURCES_PROMPT.render(career_title=career_title)
         try:
             response_json = await generate_content_func(prompt)
             import json
@@ -60,3 +97,8 @@ class ResourceAggregator:
         except Exception as e:
             print(f"AI Resource Error: {e}")
             return []
+
+
+# Precompute the links of every known career
+for _career in career_keywords:
+    ResourceAggregator.links_for(_career)
@@ -0,0 +1,109 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import functools
+import json
+import re
+import statistics
+import time
+
+from app.services import llm_gateway
+from app.services import moderation
+
+MESSAGES = [
+    "Can you tell me which entrance exams I need for a B.Des at NID?",
+    "I think you are being really stupid about this whole thing honestly",
+    "My parents want me to take PCB but I am more interested in economics",
+    "Is it worth doing a diploma in animation after 10th or should I wait?",
+    "Shut up already, nobody asked for your opinion on my career",
+    "I finished the Python course you suggested, what should I learn next?",
+    "Do colleges in Germany accept students without IELTS scores?",
+    "You will regret talking to me like that, watch what happens tomorrow",
+]
+
+# --simulate: time to first token plus output-bound generation, with a cap on concurrent calls
+SIM_FIRST_TOKEN = 0.35
+SIM_TOKENS_PER_SECOND = 120
+SIM_TOKENS_PER_VERDICT = 25
+SIM_MAX_CONCURRENCY = 8
+
+_ID_RE = re.compile(r'"id":\s*(\d+)')
+
+
+def simulated(max_concurrency):
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def complete(prompt, **kwargs):
+        ids = []
+        if getattr(prompt, "template_id", "") == "moderation_batch":
+            # Only the message list, not the example in the output format
+            ids = [int(i) for i in _ID_RE.findall(str(prompt).split("Messages (JSON):")[1].split("Respond STRICTLY")[0])]
+        async with slots:
+            await asyncio.sleep(SIM_FIRST_TOKEN + SIM_TOKENS_PER_VERDICT * max(1, len(ids)) / SIM_TOKENS_PER_SECOND)
+        if ids:
+            return json.dumps({"results": [{"id": i, "is_flagged": False, "reason": "None"} for i in ids]})
+        return json.dumps({"is_flagged": False, "reason": "None"})
+    return complete
+
+
+def counting(complete, counter):
+    async def wrapper(prompt, **kwargs):
+        counter[0] += 1
+        return await complete(prompt, **kwargs)
+    return wrapper
+
+
+async def run_load(check, count, rate):
+    """Sends `count` checks at `rate` per second; returns (wall seconds, per-check latencies)."""
+    latencies = []
+
+    async def one(n):
+        started = time.perf_counter()
+        # Distinct texts, so neither mode profits from identical messages
+        await check(f"{MESSAGES[n % len(MESSAGES)]} (#{n})")
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    tasks = []
+    for n in range(count):
+        tasks.append(asyncio.create_task(one(n)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started, latencies
+
+
+async def benchmark(count, rate, window_ms, max_items, simulate, max_concurrency):
+    # Bypass the response cache so every check measures a real call
+    base = simulated(max_concurrency) if simulate else functools.partial(llm_gateway.complete, use_cache=False)
+    print(f"{count} checks at {rate}/s ({'simulated' if simulate else 'live'} provider), "
+          f"batch window {window_ms} ms, up to {max_items} per batch\n")
+    for name in ("single", "batched"):
+        calls = [0]
+        complete = counting(base, calls)
+        if name == "single":
+            check = functools.partial(moderation.classify, complete=complete)
+        else:
+            check = moderation.ModerationBatcher(window_ms, max_items, complete=complete).check
+        wall, latencies = await run_load(check, count, rate)
+        latencies.sort()
+        print(f"{name:>8}: throughput {count / wall:6.1f}/s  p50 {statistics.median(latencies) * 1000:7.0f} ms  "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.0f} ms  calls {calls[0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare one-call-per-message and micro-batched moderation.")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50, help="checks per second")
+    parser.add_argument("--window-ms", type=int, default=moderation.MODERATION_BATCH_WINDOW_MS)
+    parser.add_argument("--max-items", type=int, default=moderation.MODERATION_BATCH_MAX)
+    parser.add_argument("--simulate", action="store_true", help="use a latency model instead of the real providers")
+    parser.add_argument("--max-concurrency", type=int, default=SIM_MAX_CONCURRENCY,
+                        help="concurrent calls the simulated provider serves")
+    args = parser.parse_args()
+    if not args.simulate and not llm_gateway.is_configured():
+        print("No AI provider configured (set GEMINI_API_KEY or GROQ_API_KEY), or run with --simulate")
+        sys.exit(1)
+    asyncio.run(benchmark(args.count, args.rate, args.window_ms, args.max_items, args.simulate, args.max_concurrency))
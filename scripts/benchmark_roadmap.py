@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import functools
+import json
+import statistics
+import time
+
+from app.services import llm_gateway
+from app.services import roadmap_builder
+
+PROFILE = {
+    "current_class": "12th",
+    "archetype": "Strategic Builder",
+    "personality": "Ambivert",
+    "career_title": "Data Scientist",
+    "phase3_insight": "Prefers structured plans, enjoys leading small teams and turning data into decisions.",
+    "final_insight": "Strong analytical answers with an interest in business impact.",
+}
+
+# --simulate: time to first token plus output-bound generation, with typical answer sizes per prompt
+SIM_FIRST_TOKEN = 0.6
+SIM_TOKENS_PER_SECOND = 90
+SIM_OUTPUT_TOKENS = {"career_path": 2400, "roadmap_skeleton": 250, "roadmap_step": 320, "roadmap_insights": 380}
+
+
+def _simulated_answer(template_id):
+    step = {"step": 1, "action": "Start", "focus": "Basics", "timeline": "Months 1-3"}
+    detail = {"description": "...", "skills": ["a", "b", "c"], "courses": [{"name": "x", "url": "https://example.com"}], "project": "..."}
+    insights = {"internships": ["a", "b"], "career_outlook": {"salary_range": "...", "top_companies": [], "future_scope": "..."}, "reminders": []}
+    if template_id == "roadmap_skeleton":
+        return {"career_title": PROFILE["career_title"], "path_steps": [dict(step, step=n) for n in range(1, 7)]}
+    if template_id == "roadmap_step":
+        return detail
+    if template_id == "roadmap_insights":
+        return insights
+    return {"career_title": PROFILE["career_title"], "path_steps": [dict(step, **detail, step=n) for n in range(1, 7)], **insights}
+
+
+async def simulated_complete(prompt, **kwargs):
+    template_id = getattr(prompt, "template_id", "career_path")
+    await asyncio.sleep(SIM_FIRST_TOKEN + SIM_OUTPUT_TOKENS.get(template_id, 300) / SIM_TOKENS_PER_SECOND)
+    return json.dumps(_simulated_answer(template_id))
+
+
+def counting(complete, counter):
+    async def wrapper(prompt, **kwargs):
+        counter[0] += 1
+        return await complete(prompt, **kwargs)
+    return wrapper
+
+
+async def benchmark(runs, concurrency, simulate):
+    # Bypass the response cache so every run measures real generation
+    base = simulated_complete if simulate else functools.partial(llm_gateway.complete, use_cache=False)
+    modes = {
+        "single": lambda complete: roadmap_builder.build_single(PROFILE, complete=complete),
+        "fan-out": lambda complete: roadmap_builder.build_fanout(PROFILE, complete=complete, concurrency=concurrency),
+    }
+    print(f"Roadmap for '{PROFILE['career_title']}' ({'simulated' if simulate else 'live'} provider), "
+          f"{runs} run(s) per mode, fan-out concurrency {concurrency}\n")
+    for name, build in modes.items():
+        times = []
+        calls = [0]
+        for _ in range(runs):
+            started = time.perf_counter()
+            data = await build(counting(base, calls))
+            times.append(time.perf_counter() - started)
+        print(f"{name:>8}: mean {statistics.mean(times):6.2f}s  min {min(times):6.2f}s  "
+              f"max {max(times):6.2f}s  calls/run {calls[0] / runs:.0f}  steps {len(data.get('path_steps', []))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare single-call and fan-out roadmap generation wall time.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=roadmap_builder.ROADMAP_FANOUT_CONCURRENCY)
+    parser.add_argument("--simulate", action="store_true", help="use a latency model instead of the real providers")
+    args = parser.parse_args()
+    if not args.simulate and not llm_gateway.is_configured():
+        print("No AI provider configured (set GEMINI_API_KEY or GROQ_API_KEY), or run with --simulate")
+        sys.exit(1)
+    asyncio.run(benchmark(args.runs, args.concurrency, args.simulate))
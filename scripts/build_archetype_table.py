@@ -0,0 +1,38 @@
+import sys
+import os
+import json
+import itertools
+import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import archetype_table
+
+# Bump when the classification rules change so deployments can tell tables apart
+TABLE_VERSION = 1
+
+def build_table(path=archetype_table.TABLE_PATH):
+    """Classifies all 1024 Phase 2 answer vectors and writes the lookup table."""
+    entries = {}
+    for letters in itertools.product("AB", repeat=len(archetype_table.QUESTION_IDS)):
+        vector = "".join(letters)
+        entries[vector] = archetype_table.classify(vector)
+
+    data = {
+        "version": TABLE_VERSION,
+        "generated_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "questions": archetype_table.QUESTION_IDS,
+        "entries": entries,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+
+    counts = {}
+    for verdict in entries.values():
+        counts[verdict["phase_2_category"]] = counts.get(verdict["phase_2_category"], 0) + 1
+    print(f"Wrote {len(entries)} answer vectors to {path}")
+    for category, count in sorted(counts.items()):
+        print(f"  {category}: {count}")
+
+if __name__ == "__main__":
+    build_table(sys.argv[1] if len(sys.argv) > 1 else archetype_table.TABLE_PATH)
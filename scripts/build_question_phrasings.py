@@ -0,0 +1,79 @@
+import sys
+import os
+import json
+import asyncio
+import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import assessment_dialogue
+from data.questions_phase3 import CATEGORY_SCENARIOS_MAP
+from data.questions_final import all_questions
+from data.questions_12th import questions_12th
+from data.questions_above_12th import questions_above_12th
+
+VARIANTS_PER_QUESTION = 3
+
+PHRASING_PROMPT = """
+You write the one-sentence lead-in a warm career counsellor says right before asking a student a question.
+Write {count} different lead-ins (max 15 words each) for this question. Do not restate the question or its options.
+
+Question title: {title}
+Question: {text}
+
+Output ONLY valid JSON: {{"variants": ["...", "..."]}}
+"""
+
+def iter_questions():
+    """(id, short title, full text) for every question the assessment chats can present."""
+    for scenarios in CATEGORY_SCENARIOS_MAP.values():
+        for s in scenarios:
+            yield s["id"], s["title"], s["story"]
+    for section in all_questions.values():
+        for q in section["questions"]:
+            yield q["id"], section["title"].split(":", 1)[-1].strip(), q["question"]
+    for q in questions_12th:
+        yield q["id"], q.get("title"), q.get("question") or q.get("text")
+    for q in questions_above_12th:
+        yield q["id"], q.get("title"), q.get("text")
+
+def local_variants(title):
+    """Lead-ins built from the question's own title, no model needed."""
+    if not title:
+        return []
+    topic = title.lower()
+    return [
+        f"This one is about {topic}.",
+        f"Let's explore {topic} for a moment.",
+        f"Time to think about {topic}.",
+    ]
+
+async def llm_variants(title, text):
+    from app.services import llm_gateway
+    prompt = PHRASING_PROMPT.format(count=VARIANTS_PER_QUESTION, title=title or "", text=text)
+    data = json.loads(await llm_gateway.complete(prompt))
+    return [v.strip() for v in data.get("variants", []) if isinstance(v, str) and v.strip()][:VARIANTS_PER_QUESTION]
+
+async def build(use_llm=False, path=assessment_dialogue.PHRASINGS_PATH):
+    phrasings = {}
+    for qid, title, text in iter_questions():
+        variants = []
+        if use_llm:
+            try:
+                variants = await llm_variants(title, text)
+            except Exception as e:
+                print(f"{qid}: LLM phrasing failed ({e}); using local variants")
+        phrasings[qid] = variants or local_variants(title)
+
+    data = {
+        "generated_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "source": "llm" if use_llm else "local",
+        "questions": {qid: v for qid, v in phrasings.items() if v},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    print(f"Wrote phrasing variants for {len(data['questions'])} of {len(phrasings)} questions to {path}")
+
+if __name__ == "__main__":
+    # --llm asks the configured model for the lead-ins (one call per question, cached)
+    asyncio.run(build(use_llm="--llm" in sys.argv))
@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import or_
+
+from app.database import SessionLocal
+from app.models import AssessmentResult
+from app.services import archetype_table
+
+FIELDS = ("phase_2_category", "personality", "goal_status")
+
+def check_table(show=20):
+    """
+    Compares the precomputed archetype table with the verdicts the LLM gave for real
+    Phase 2 submissions. Rows saved before the table existed (archetype_source NULL)
+    were all classified by the LLM, so they count as logged verdicts too.
+    """
+    if not archetype_table.load():
+        print("No archetype table to check. Run scripts/build_archetype_table.py first.")
+        return
+
+    db = SessionLocal()
+    try:
+        rows = db.query(AssessmentResult).filter(
+            AssessmentResult.phase_2_category.isnot(None),
+            or_(AssessmentResult.archetype_source == "llm", AssessmentResult.archetype_source.is_(None)),
+        ).all()
+    finally:
+        db.close()
+
+    compared = 0
+    skipped = 0
+    agree = {field: 0 for field in FIELDS}
+    mismatches = []
+    for row in rows:
+        vector = archetype_table.vector_from_texts(row.raw_answers)
+        expected = archetype_table.lookup(vector)
+        if expected is None:
+            skipped += 1
+            continue
+        compared += 1
+        for field in FIELDS:
+            if (getattr(row, field) or "").strip().lower() == expected[field].lower():
+                agree[field] += 1
+        if (row.phase_2_category or "").strip().lower() != expected["phase_2_category"].lower():
+            mismatches.append((row.id, vector, row.phase_2_category, expected["phase_2_category"]))
+
+    print(f"LLM verdicts compared: {compared} (skipped {skipped} without a complete A/B answer set)")
+    if not compared:
+        return
+    for field in FIELDS:
+        print(f"  {field}: {agree[field]}/{compared} agree ({agree[field] / compared:.1%})")
+
+    if mismatches:
+        print(f"\nCategory mismatches (showing {min(show, len(mismatches))} of {len(mismatches)}):")
+        for result_id, vector, llm_category, table_category in mismatches[:show]:
+            print(f"  result {result_id} [{vector}]: LLM={llm_category} table={table_category}")
+
+if __name__ == "__main__":
+    check_table()
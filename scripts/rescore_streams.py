@@ -0,0 +1,26 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import SessionLocal
+from app.services.stream_scoring import stream_scorer
+
+def rescore(dry_run=False):
+    """
+    Recomputes the Class 10 stream scores of every stored final assessment with the
+    current question weights. Run it after changing options, streams or points in
+    data/questions_final.py or app/services/stream_scoring.py.
+    """
+    print(f"Weight matrix {stream_scorer.version}: {len(stream_scorer.features)} features x {len(stream_scorer.streams)} streams")
+    db = SessionLocal()
+    try:
+        summary = stream_scorer.rescore_all(db, dry_run=dry_run)
+    finally:
+        db.close()
+
+    print(f"Submissions scanned: {summary['scanned']} (Class 10: {summary['rescored']})")
+    verb = "Would update" if dry_run else "Updated"
+    print(f"{verb} {summary['changed']} rows; recommended stream changed for {summary['winner_changed']}")
+
+if __name__ == "__main__":
+    rescore(dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+from app.database import SessionLocal
+from app.models import ResourceRecommendation
+from app.data.career_keywords import career_keywords
+from app.services import llm_gateway
+from app.services import resource_store
+
+async def warm(force=False):
+    """
+    Precomputes AI resource recommendations for every career in career_keywords.
+    Careers with fresh stored resources are skipped unless --force is given.
+    """
+    if not llm_gateway.is_configured():
+        print("No AI provider configured (set GEMINI_API_KEY or GROQ_API_KEY).")
+        return
+
+    db = SessionLocal()
+    try:
+        stored = {row.career_key: row for row in db.query(ResourceRecommendation).all()}
+        done = 0
+        for career_title in career_keywords:
+            row = stored.get(resource_store.normalize_career(career_title))
+            if row is not None and not force and not resource_store.is_stale(row):
+                print(f"  {career_title}: fresh, skipped")
+                continue
+            resources = await resource_store.refresh(career_title, db=db)
+            if resources:
+                done += 1
+                print(f"  {career_title}: {len(resources)} resources stored")
+            else:
+                print(f"  {career_title}: generation failed, kept previous entry")
+    finally:
+        db.close()
+    print(f"\nWarmed {done} of {len(career_keywords)} careers.")
+
+if __name__ == "__main__":
+    asyncio.run(warm(force="--force" in sys.argv))